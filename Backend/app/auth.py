@@ -0,0 +1,174 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from pydantic import BaseModel
+
+from .cache import MemoryLRU
+from .concurrency import run_io
+from .metrics import span
+from .supabase_client import get_supabase_anon_client
+
+try:  # Optional: verification of asymmetric (RS256/ES256) Supabase tokens via JWKS
+    import jwt as pyjwt  # type: ignore
+except ImportError:  # pragma: no cover
+    pyjwt = None
+
+load_dotenv()
+
+# HS256 projects: the project's JWT secret. Asymmetric projects: the JWKS endpoint.
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL",
+    f"{os.getenv('SUPABASE_URL', '').rstrip('/')}/auth/v1/.well-known/jwks.json" if os.getenv("SUPABASE_URL") else "",
+)
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_CACHE_SECONDS = int(os.getenv("JWKS_CACHE_SECONDS", "600"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+CLOCK_SKEW_SECONDS = 30
+
+
+class AuthError(Exception):
+    pass
+
+
+class AuthenticatedUser(BaseModel):
+    id: str
+    email: Optional[str] = None
+    role: Optional[str] = None
+
+
+_token_cache = MemoryLRU(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+_jwks_client = None
+_stats = {"cache_hits": 0, "local_verified": 0, "remote_verified": 0, "local_failures": 0, "rejected": 0}
+
+
+def _b64decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+def _unverified_parts(token: str) -> Dict[str, Any]:
+    try:
+        header_b64, payload_b64, signature_b64 = token.split(".")
+        return {
+            "header": json.loads(_b64decode(header_b64)),
+            "payload": json.loads(_b64decode(payload_b64)),
+            "signing_input": f"{header_b64}.{payload_b64}".encode("ascii"),
+            "signature": _b64decode(signature_b64),
+        }
+    except Exception:
+        raise AuthError("Malformed token")
+
+
+def _check_claims(payload: Dict[str, Any]) -> None:
+    now = time.time()
+    exp = payload.get("exp")
+    if not isinstance(exp, (int, float)) or exp < now - CLOCK_SKEW_SECONDS:
+        raise AuthError("Token expired")
+    nbf = payload.get("nbf")
+    if isinstance(nbf, (int, float)) and nbf > now + CLOCK_SKEW_SECONDS:
+        raise AuthError("Token not yet valid")
+    aud = payload.get("aud")
+    if SUPABASE_JWT_AUDIENCE and SUPABASE_JWT_AUDIENCE not in (aud if isinstance(aud, list) else [aud]):
+        raise AuthError("Wrong audience")
+    if not payload.get("sub"):
+        raise AuthError("Missing subject")
+
+
+def _verify_locally(token: str) -> Optional[Dict[str, Any]]:
+    """Verified claims, or None when this token can't be checked locally (no key configured for its alg)."""
+    parts = _unverified_parts(token)
+    alg = parts["header"].get("alg")
+
+    if alg == "HS256" and SUPABASE_JWT_SECRET:
+        expected = hmac.new(SUPABASE_JWT_SECRET.encode("utf-8"), parts["signing_input"], hashlib.sha256).digest()
+        if not hmac.compare_digest(expected, parts["signature"]):
+            raise AuthError("Bad signature")
+        _check_claims(parts["payload"])
+        return parts["payload"]
+
+    if alg in ("RS256", "ES256") and SUPABASE_JWKS_URL and pyjwt is not None:
+        global _jwks_client
+        if _jwks_client is None:
+            _jwks_client = pyjwt.PyJWKClient(SUPABASE_JWKS_URL, cache_keys=True, lifespan=JWKS_CACHE_SECONDS)
+        try:
+            key = _jwks_client.get_signing_key_from_jwt(token).key
+            pyjwt.decode(token, key, algorithms=[alg], options={"verify_aud": False, "verify_exp": False})
+        except Exception:
+            raise AuthError("Bad signature")
+        _check_claims(parts["payload"])
+        return parts["payload"]
+
+    return None
+
+
+def _cache_ttl(exp: Optional[float]) -> float:
+    ttl = AUTH_CACHE_TTL_SECONDS
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    return ttl
+
+
+async def authenticate(token: str) -> AuthenticatedUser:
+    """
+    Resolve a bearer token to a user: cache first, then local signature/expiry
+    checks, and only then a round-trip to the Supabase auth server.
+    """
+    with span("auth"):
+        return await _authenticate(token)
+
+
+async def _authenticate(token: str) -> AuthenticatedUser:
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    user = _token_cache.get(key)
+    if user is not None:
+        _stats["cache_hits"] += 1
+        return user
+
+    claims = None
+    try:
+        # Signature checks against a fetched JWKS may block on first use
+        claims = await run_io(_verify_locally, token)
+    except AuthError:
+        _stats["local_failures"] += 1
+
+    if claims is not None:
+        _stats["local_verified"] += 1
+        user = AuthenticatedUser(id=claims["sub"], email=claims.get("email"), role=claims.get("role"))
+        _token_cache.put(key, user, ttl=_cache_ttl(claims.get("exp")))
+        return user
+
+    # Remote fallback
+    try:
+        supabase = get_supabase_anon_client()
+        response = await run_io(supabase.auth.get_user, token)
+    except Exception:
+        response = None
+    if not response or not response.user:
+        _stats["rejected"] += 1
+        raise AuthError("Invalid authentication token")
+    _stats["remote_verified"] += 1
+    user = AuthenticatedUser(id=str(response.user.id), email=response.user.email, role=getattr(response.user, "role", None))
+    try:
+        exp = _unverified_parts(token)["payload"].get("exp")
+    except AuthError:
+        exp = None
+    ttl = _cache_ttl(exp if isinstance(exp, (int, float)) else None)
+    if ttl > 0:
+        _token_cache.put(key, user, ttl=ttl)
+    return user
+
+
+def auth_stats() -> Dict[str, Any]:
+    lookups = _stats["cache_hits"] + _stats["local_verified"] + _stats["remote_verified"] + _stats["rejected"]
+    return {
+        **_stats,
+        "cache_hit_rate": round(_stats["cache_hits"] / lookups, 4) if lookups else 0.0,
+        "cached_tokens": len(_token_cache),
+    }
@@ -0,0 +1,162 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# In-memory tier: entry count and TTL bounds (per cache)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+# Optional on-disk tier shared by all caches; empty disables it
+CACHE_DB = os.getenv("CACHE_DB", "")
+CACHE_DB_MAX_ENTRIES = int(os.getenv("CACHE_DB_MAX_ENTRIES", "100000"))
+
+
+class MemoryLRU:
+    """Thread-safe LRU with per-entry TTL."""
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteStore:
+    """On-disk tier: JSON values in a single SQLite table, namespaced per cache."""
+
+    def __init__(self, path: str, max_entries: int = CACHE_DB_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache(accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl, now),
+            )
+            self._puts += 1
+            # Prune periodically rather than on every write
+            if self._puts % 100 == 0:
+                self._conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+
+
+_disk_store: Optional[SQLiteStore] = SQLiteStore(CACHE_DB) if CACHE_DB else None
+
+
+class TieredCache:
+    """Memory LRU in front of the optional shared SQLite tier, with hit/miss counters."""
+
+    def __init__(self, name: str, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.name = name
+        self.ttl = ttl
+        self.memory = MemoryLRU(max_entries, ttl)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+        if _disk_store is not None:
+            try:
+                value = _disk_store.get(self._disk_key(key))
+            except Exception:
+                value = None
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.put(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any) -> None:
+        self.memory.put(key, value)
+        if _disk_store is not None:
+            try:
+                _disk_store.put(self._disk_key(key), value, self.ttl)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "entries": len(self.memory),
+        }
+
+
+# Caches used by the processing pipeline
+extraction_cache = TieredCache("extraction", max_entries=int(os.getenv("EXTRACTION_CACHE_MAX_ENTRIES", "256")))
+summary_cache = TieredCache("summary")
+chunk_cache = TieredCache("chunk", max_entries=int(os.getenv("CHUNK_CACHE_SIZE", "1024")))
+
+
+def cache_stats() -> Dict[str, Any]:
+    return {c.name: c.stats() for c in (extraction_cache, summary_cache, chunk_cache)}
@@ -0,0 +1,65 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Pool sizes. IO_THREADS bounds concurrent blocking Supabase/storage calls,
+# CPU_WORKERS bounds concurrent extraction processes.
+IO_THREADS = int(os.getenv("IO_THREADS", "32"))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+# "spawn" avoids forking a process that already runs threads
+CPU_START_METHOD = os.getenv("CPU_START_METHOD", "spawn")
+
+T = TypeVar("T")
+
+_io_executor: Optional[ThreadPoolExecutor] = None
+_cpu_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Bounded thread pool for blocking I/O, created on first use."""
+    global _io_executor
+    if _io_executor is None:
+        _io_executor = ThreadPoolExecutor(max_workers=IO_THREADS, thread_name_prefix="io")
+    return _io_executor
+
+
+def get_cpu_executor() -> ProcessPoolExecutor:
+    """Process pool for CPU-bound work, created on first use."""
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ProcessPoolExecutor(
+            max_workers=CPU_WORKERS,
+            mp_context=multiprocessing.get_context(CPU_START_METHOD),
+        )
+    return _cpu_executor
+
+
+def discard_cpu_executor(executor: ProcessPoolExecutor) -> None:
+    """Drop a broken process pool (a worker died) so the next get_cpu_executor() starts a fresh one."""
+    global _cpu_executor
+    if _cpu_executor is executor:
+        _cpu_executor = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_io(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking I/O call (e.g. a Supabase `.execute`) on the bounded thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown() -> None:
+    global _io_executor, _cpu_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor = None
+    if _io_executor is not None:
+        _io_executor.shutdown(wait=False, cancel_futures=True)
+        _io_executor = None
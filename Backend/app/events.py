@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Seconds between keep-alive comments on idle event streams; each keep-alive
+# also re-reads the document row, so streams served by a process other than the
+# one running the job still see status changes.
+EVENTS_KEEPALIVE_SECONDS = float(os.getenv("EVENTS_KEEPALIVE_SECONDS", "15"))
+EVENTS_QUEUE_SIZE = 256
+
+TERMINAL_STATUSES = ("completed", "failed")
+
+
+class ProgressBroker:
+    """In-process fan-out of document progress events to subscribed streams."""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Remember the event loop so publish_threadsafe can be used from worker threads."""
+        self._loop = loop
+
+    def subscribe(self, document_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=EVENTS_QUEUE_SIZE)
+        self._subscribers.setdefault(document_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, document_id: str, queue: asyncio.Queue) -> None:
+        subscribers = self._subscribers.get(document_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[document_id]
+
+    def last_event(self, document_id: str) -> Optional[Dict[str, Any]]:
+        return self._last.get(document_id)
+
+    def publish(
+        self,
+        document_id: str,
+        stage: str,
+        progress: int,
+        status: str = "processing",
+        detail: Optional[str] = None,
+    ) -> None:
+        """Publish from the event loop. Slow subscribers drop their oldest events."""
+        event = {
+            "document_id": document_id,
+            "stage": stage,
+            "status": status,
+            "progress": max(0, min(100, int(progress))),
+            "detail": detail,
+            "timestamp": time.time(),
+        }
+        if status in TERMINAL_STATUSES:
+            self._last.pop(document_id, None)
+        else:
+            self._last[document_id] = event
+        for queue in list(self._subscribers.get(document_id, ())):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+    def publish_partial(self, document_id: str, kind: str, data: Dict[str, Any]) -> None:
+        """Publish a partial result (streamed title or key point). Not replayed to late subscribers."""
+        event = {"document_id": document_id, "event": kind, **data}
+        for queue in list(self._subscribers.get(document_id, ())):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+    def publish_threadsafe(self, document_id: str, stage: str, progress: int, detail: Optional[str] = None) -> None:
+        """Publish from a thread other than the event loop's."""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.publish, document_id, stage, progress, "processing", detail)
+
+
+progress_broker = ProgressBroker()
+
+
+def sse_event(event: Dict[str, Any], name: str = "progress") -> str:
+    return f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+
+def stage_progress(start: int, end: int, done: int, total: int) -> int:
+    """Map done/total within a stage onto the [start, end] slice of overall progress."""
+    if total <= 0:
+        return end
+    return start + (end - start) * min(done, total) // total
+
+
+# Overall progress ranges for each pipeline stage
+STAGES: Dict[str, List[int]] = {
+    "download": [0, 20],
+    "extract": [20, 40],
+    "summarize": [40, 90],
+    "persist": [90, 100],
+}
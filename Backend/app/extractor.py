@@ -1,36 +1,176 @@
 import io
-from typing import Optional
+import os
+import hashlib
+import tempfile
+import zipfile
+from concurrent.futures import Executor
+from typing import Callable, Iterator, List, Optional, Tuple
 
 # External libs
 from PyPDF2 import PdfReader  # type: ignore
-from docx import Document as DocxDocument  # type: ignore
 
+try:  # Optional: hardened XML parsing of uploaded DOCX parts
+    from defusedxml.ElementTree import iterparse  # type: ignore
+except ImportError:  # pragma: no cover
+    from xml.etree.ElementTree import iterparse
 
-MAX_CHARS = 15000  # safety cap before summarization
 
+MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", "1000000"))  # safety cap before summarization
+EXTRACTOR_VERSION = "3"  # bump when extraction output changes; part of cache keys
 
-def _extract_pdf(file_bytes: bytes) -> str:
+# PDFs with at least this many pages are split into page ranges across the process pool
+PARALLEL_PDF_MIN_PAGES = int(os.getenv("PARALLEL_PDF_MIN_PAGES", "64"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "32"))
+
+
+def extraction_cache_key(file_hash: str, content_type: Optional[str], filename: Optional[str]) -> str:
+    """Cache key for extracted text: file content hash, extractor version and dispatch inputs."""
+    ext = _extension(filename)
+    return hashlib.sha256(
+        f"{file_hash}\0{EXTRACTOR_VERSION}\0{MAX_CHARS}\0{(content_type or '').lower()}\0{ext}".encode("utf-8")
+    ).hexdigest()
+
+
+def _extension(filename: Optional[str]) -> str:
+    return ((filename or "").rsplit(".", 1)[-1] if filename and "." in filename else "").lower()
+
+
+def _is_pdf(content_type: Optional[str], filename: Optional[str]) -> bool:
+    return "pdf" in (content_type or "").lower() or _extension(filename) == "pdf"
+
+
+def iter_pdf_pages(file_bytes: bytes, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """Yield the text of each page in [start, stop), parsing pages only as they are consumed."""
     try:
         reader = PdfReader(io.BytesIO(file_bytes))
-        texts = []
-        for page in reader.pages:
-            try:
-                txt = page.extract_text() or ""
-            except Exception:
-                txt = ""
-            if txt:
-                texts.append(txt)
-        return "\n\n".join(texts)
+        pages = reader.pages
+        stop = len(pages) if stop is None else min(stop, len(pages))
     except Exception:
-        return ""
+        return
+    for i in range(start, stop):
+        try:
+            yield pages[i].extract_text() or ""
+        except Exception:
+            yield ""
+
+
+def _extract_pdf(file_bytes: bytes) -> str:
+    return "\n\n".join(txt for txt in iter_pdf_pages(file_bytes) if txt)
+
 
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_W_P, _W_TC, _W_TR, _W_T = _W + "p", _W + "tc", _W + "tr", _W + "t"
+_W_TEXT = {_W_T: None, _W + "tab": "\t", _W + "br": "\n", _W + "cr": "\n", _W + "noBreakHyphen": "-"}
 
-def _extract_docx(file_bytes: bytes) -> str:
+# DOCX parts read after the main document, identified by content type
+_DOCX_MAIN_SUFFIX = ".main+xml"
+_DOCX_EXTRA_SUFFIXES = ("footnotes+xml", "endnotes+xml", "header+xml", "footer+xml")
+
+
+def _docx_parts(archive: zipfile.ZipFile) -> List[str]:
+    """Main document part, then footnotes, endnotes, headers and footers, per [Content_Types].xml."""
+    by_type: List[Tuple[str, str]] = []
     try:
-        doc = DocxDocument(io.BytesIO(file_bytes))
-        return "\n".join(p.text for p in doc.paragraphs if p.text)
+        with archive.open("[Content_Types].xml") as f:
+            for _, elem in iterparse(f):
+                if elem.tag.endswith("Override"):
+                    by_type.append((elem.get("ContentType") or "", (elem.get("PartName") or "").lstrip("/")))
     except Exception:
-        return ""
+        pass
+    main = [name for ctype, name in by_type if ctype.endswith(_DOCX_MAIN_SUFFIX)] or ["word/document.xml"]
+    extra = [name for suffix in _DOCX_EXTRA_SUFFIXES for ctype, name in sorted(by_type, key=lambda t: t[1]) if ctype.endswith(suffix)]
+    return main[:1] + extra
+
+
+def _iter_wordml_blocks(stream) -> Iterator[str]:
+    """
+    Stream one WordprocessingML part: yields each non-empty paragraph, and each
+    table row as its cells joined by " | " (nested tables inline in their cell).
+    Finished elements are cleared as parsing goes, so memory stays bounded.
+    """
+    # Open containers: ["p", runs] / ["tc", paragraphs] / ["tr", cells]
+    stack: List[list] = []
+    open_elems = []
+    for event, elem in iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            open_elems.append(elem)
+            if tag == _W_P:
+                stack.append(["p", []])
+            elif tag == _W_TC:
+                stack.append(["tc", []])
+            elif tag == _W_TR:
+                stack.append(["tr", []])
+            continue
+
+        open_elems.pop()
+        if tag in _W_TEXT:
+            if stack and stack[-1][0] == "p":
+                stack[-1][1].append(elem.text or "" if tag == _W_T else _W_TEXT[tag])
+            continue
+        if tag not in (_W_P, _W_TC, _W_TR):
+            continue
+
+        _, items = stack.pop()
+        if tag == _W_P:
+            text = "".join(items).strip()
+        elif tag == _W_TC:
+            text = " ".join(p for p in items if p)
+        else:
+            text = " | ".join(items) if any(items) else ""
+
+        parent = stack[-1][0] if stack else None
+        if parent == "tc" or (parent == "tr" and tag == _W_TC):
+            stack[-1][1].append(text)
+        elif text:
+            # Top-level block, or a text box paragraph inside another paragraph
+            yield text
+        if not stack and open_elems:
+            open_elems[-1].clear()
+
+
+def iter_docx_blocks(file_bytes: bytes) -> Iterator[str]:
+    """
+    Lazily yield the text blocks of a DOCX (body paragraphs and table rows, then
+    footnotes, endnotes and distinct headers/footers), parsing XML straight from
+    the zip. Unreadable parts end the stream without raising.
+    """
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(file_bytes))
+    except Exception:
+        return
+    with archive:
+        seen_repeated = set()
+        for name in _docx_parts(archive):
+            repeated = "/header" in name or "/footer" in name
+            try:
+                with archive.open(name) as part:
+                    for block in _iter_wordml_blocks(part):
+                        # Headers and footers repeat per section; keep each text once
+                        if repeated:
+                            if block in seen_repeated:
+                                continue
+                            seen_repeated.add(block)
+                        yield block
+            except (KeyError, zipfile.BadZipFile, SyntaxError, ValueError, EOFError):
+                # Missing or corrupt part (XML ParseError is a SyntaxError); keep what was read
+                continue
+
+
+def _extract_docx(file_bytes: bytes, max_chars: Optional[int] = None) -> str:
+    """DOCX text, one block per line; stops reading once max_chars is reached."""
+    parts: List[str] = []
+    total = 0
+    blocks = iter_docx_blocks(file_bytes)
+    try:
+        for block in blocks:
+            parts.append(block)
+            total += len(block) + 1
+            if max_chars is not None and total >= max_chars:
+                break
+    finally:
+        blocks.close()
+    return "\n".join(parts)
 
 
 def _extract_text_like(file_bytes: bytes) -> str:
@@ -42,35 +182,204 @@ def _extract_text_like(file_bytes: bytes) -> str:
     return ""
 
 
-def extract_text(file_bytes: bytes, content_type: Optional[str], filename: Optional[str]) -> str:
+def _normalize(text: str) -> str:
+    return "\n".join(line.strip() for line in text.splitlines())
+
+
+def extractor_kind(content_type: Optional[str], filename: Optional[str]) -> str:
+    """Which extractor iter_text_blocks dispatches to: "pdf", "docx" or "text"."""
+    if _is_pdf(content_type, filename):
+        return "pdf"
+    if "word" in (content_type or "").lower() or _extension(filename) == "docx":
+        return "docx"
+    return "text"
+
+
+def iter_text_blocks(
+    file_bytes: bytes, content_type: Optional[str], filename: Optional[str], max_chars: Optional[int] = None
+) -> Iterator[str]:
     """
-    Best-effort text extraction by content type and file extension.
-    Returns a trimmed string suitable for summarization.
+    Lazily yield raw text blocks (PDF pages, or the whole text for other formats)
+    by content type and file extension. Empty PDF pages are yielded too, so block
+    i is page i. max_chars lets single-block formats stop reading early.
     """
     ct = (content_type or "").lower()
-    ext = ((filename or "").rsplit(".", 1)[-1] if filename and "." in filename else "").lower()
-
-    text = ""
+    ext = _extension(filename)
 
     # Prefer content-type, then extension
-    if "pdf" in ct or ext == "pdf":
-        text = _extract_pdf(file_bytes)
+    if _is_pdf(content_type, filename):
+        yield from iter_pdf_pages(file_bytes)
     elif "word" in ct or ext in {"docx"}:
-        text = _extract_docx(file_bytes)
+        yield _extract_docx(file_bytes, max_chars)
     elif ext == "doc":
         # Legacy .doc not directly supported; try best-effort text decode
-        text = _extract_text_like(file_bytes)
+        yield _extract_text_like(file_bytes)
     elif any(t in ct for t in ["text/", "json"]) or ext in {"txt", "md", "csv", "json"}:
-        text = _extract_text_like(file_bytes)
+        yield _extract_text_like(file_bytes)
+
+
+def _join_within_budget(
+    blocks: Iterator[str], max_chars: Optional[int], offsets: Optional[List[int]] = None
+) -> str:
+    """
+    Normalize and join blocks, stopping (and closing the generator) once max_chars is reached.
+    If given, `offsets` receives the start of every block in the result (empty blocks included).
+    """
+    parts: List[str] = []
+    total = 0
+    try:
+        for block in blocks:
+            if offsets is not None:
+                offsets.append(total)
+            if not block:
+                continue
+            block = _normalize(block)
+            parts.append(block)
+            total += len(block) + 2
+            if max_chars is not None and total >= max_chars:
+                break
+    finally:
+        close = getattr(blocks, "close", None)
+        if close:
+            close()
+    text = "\n\n".join(parts)
+    if max_chars is not None and len(text) > max_chars:
+        text = text[:max_chars]
+    return text
+
+
+def _strip_with_offsets(text: str, offsets: List[int]) -> Tuple[str, List[int]]:
+    """strip() the text and shift page offsets to match; pages starting past the end are dropped."""
+    lead = len(text) - len(text.lstrip())
+    text = text.strip()
+    return text, [min(max(0, o - lead), len(text)) for o in offsets if o - lead < len(text) or o == 0]
+
+
+def extract_text_with_offsets(
+    file_bytes: bytes,
+    content_type: Optional[str],
+    filename: Optional[str],
+    max_chars: Optional[int] = MAX_CHARS,
+) -> Tuple[str, List[int]]:
+    """extract_text plus the start offset of each page (a single 0 for formats without pages)."""
+    offsets: List[int] = []
+    text = _join_within_budget(iter_text_blocks(file_bytes, content_type, filename, max_chars), max_chars, offsets)
 
     # Fallback if none worked
     if not text:
-        text = _extract_text_like(file_bytes)
+        offsets = []
+        text = _join_within_budget(iter([_extract_text_like(file_bytes)]), max_chars, offsets)
+
+    return _strip_with_offsets(text, offsets)
+
+
+def extract_text(
+    file_bytes: bytes,
+    content_type: Optional[str],
+    filename: Optional[str],
+    max_chars: Optional[int] = MAX_CHARS,
+) -> str:
+    """
+    Best-effort text extraction by content type and file extension.
+    Stops parsing once max_chars of text has been collected.
+    Returns a trimmed string suitable for summarization.
+    """
+    return extract_text_with_offsets(file_bytes, content_type, filename, max_chars)[0]
+
 
-    # Normalize whitespace and cap size
-    text = "\n".join(line.strip() for line in text.splitlines())
-    if len(text) > MAX_CHARS:
-        text = text[:MAX_CHARS]
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
 
-    return text.strip()
 
+def _extract_pdf_range(path: str, start: int, stop: int) -> List[str]:
+    """Process-pool task: text of pages [start, stop) of the PDF at path."""
+    return list(iter_pdf_pages(_read_file(path), start, stop))
+
+
+def pdf_page_count(file_bytes: bytes) -> int:
+    try:
+        return len(PdfReader(io.BytesIO(file_bytes)).pages)
+    except Exception:
+        return 0
+
+
+def _extract_pdf_file(
+    path: str, content_type: Optional[str], filename: Optional[str], max_chars: Optional[int]
+) -> Tuple[int, Optional[Tuple[str, List[int]]]]:
+    """
+    Process-pool task: (page count, extract_text_with_offsets result) of the PDF
+    at path. The result is None for PDFs large enough to split by page range.
+    """
+    file_bytes = _read_file(path)
+    pages = pdf_page_count(file_bytes)
+    if pages >= PARALLEL_PDF_MIN_PAGES:
+        return pages, None
+    return pages, extract_text_with_offsets(file_bytes, content_type, filename, max_chars)
+
+
+def extract_text_parallel(
+    file_bytes: bytes,
+    content_type: Optional[str],
+    filename: Optional[str],
+    executor: Executor,
+    max_chars: Optional[int] = MAX_CHARS,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> Tuple[str, List[int]]:
+    """
+    Like extract_text_with_offsets, but large PDFs are split into page ranges
+    extracted on `executor` (a process pool) and reassembled in page order.
+    Ranges not yet started are cancelled once the pages before them fill max_chars.
+    on_progress(pages_done, total_pages) is called as ranges are assembled.
+    Blocks the calling thread until done. Returns (text, page offsets).
+    A PDF is written to a temp file once and the tasks get its path, so neither
+    the bytes are pickled per task nor the PDF parsed in this process.
+    """
+    if not _is_pdf(content_type, filename):
+        result = executor.submit(extract_text_with_offsets, file_bytes, content_type, filename, max_chars).result()
+        if on_progress:
+            on_progress(1, 1)
+        return result
+
+    with tempfile.NamedTemporaryFile(prefix="extract-", suffix=".pdf", delete=False) as f:
+        f.write(file_bytes)
+    try:
+        # Small PDFs are extracted whole by the task that counts the pages
+        pages, result = executor.submit(_extract_pdf_file, f.name, content_type, filename, max_chars).result()
+        if result is not None:
+            if on_progress:
+                on_progress(max(pages, 1), max(pages, 1))
+            return result
+        text, offsets = _extract_pdf_ranges(f.name, pages, executor, max_chars, on_progress)
+    finally:
+        os.unlink(f.name)
+    if not text:
+        offsets = []
+        text = _join_within_budget(iter([_extract_text_like(file_bytes)]), max_chars, offsets)
+        text, offsets = _strip_with_offsets(text, offsets)
+    return text, offsets
+
+
+def _extract_pdf_ranges(
+    path: str,
+    pages: int,
+    executor: Executor,
+    max_chars: Optional[int],
+    on_progress: Optional[Callable[[int, int], None]],
+) -> Tuple[str, List[int]]:
+    step = max(1, PDF_PAGES_PER_TASK)
+    futures = [executor.submit(_extract_pdf_range, path, i, min(i + step, pages)) for i in range(0, pages, step)]
+
+    def _in_order() -> Iterator[str]:
+        try:
+            for n, fut in enumerate(futures):
+                yield from fut.result()
+                if on_progress:
+                    on_progress(min((n + 1) * step, pages), pages)
+        finally:
+            for fut in futures:
+                fut.cancel()
+
+    offsets: List[int] = []
+    text = _join_within_budget(_in_order(), max_chars, offsets)
+    return _strip_with_offsets(text, offsets)
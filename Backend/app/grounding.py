@@ -0,0 +1,81 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class GroundingIndex:
+    """
+    Case-insensitive lookups against one document, built once and shared by every
+    key point checked against it:
+
+    - contains(quote): exact substring test. Words strictly inside the quote must
+      be whole words of the document, so only the occurrences of the rarest such
+      word are verified instead of scanning the whole text.
+    - has_token(token): the substring test used for overlap scoring. A token made
+      only of word characters can only occur inside a single word, so it is
+      answered from the vocabulary (a set lookup, then a search of the distinct
+      words) rather than the full text.
+
+    Answers are identical to `x.lower() in content.lower()`.
+    """
+
+    def __init__(self, content: str):
+        self.content_lower = content.lower()
+        positions: Dict[str, List[int]] = {}
+        get = positions.get
+        for m in _WORD_RE.finditer(self.content_lower):
+            word = m.group()
+            found = get(word)
+            if found is None:
+                positions[word] = [m.start()]
+            else:
+                found.append(m.start())
+        self._positions = positions
+        self._vocab_text: Optional[str] = None
+        self._memo: Dict[str, bool] = {}
+
+    def _scan(self, text: str, haystack: str) -> bool:
+        found = self._memo.get(text)
+        if found is None:
+            found = self._memo[text] = text in haystack
+        return found
+
+    def has_token(self, token: str) -> bool:
+        token = token.lower()
+        if token in self._positions:
+            return True
+        if not _WORD_RE.fullmatch(token):
+            return self._scan(token, self.content_lower)
+        # Part of a longer word: search the distinct words only
+        if self._vocab_text is None:
+            self._vocab_text = "\n".join(self._positions)
+        return self._scan(token, self._vocab_text)
+
+    def contains(self, quote: str) -> bool:
+        quote = quote.lower()
+        runs = list(_WORD_RE.finditer(quote))
+        if len(runs) < 3:
+            return self._scan(quote, self.content_lower)
+        # Interior words are whole words in any match; anchor on the rarest one
+        anchor = min(runs[1:-1], key=lambda m: len(self._positions.get(m.group(), ())))
+        positions = self._positions.get(anchor.group())
+        if not positions:
+            return False
+        offset = anchor.start()
+        return any(p >= offset and self.content_lower.startswith(quote, p - offset) for p in positions)
+
+    def overlap(self, point: str) -> Tuple[int, int]:
+        """(tokens found, tokens considered) for the words of a key point longer than 3 characters."""
+        tokens = [t for t in point.split() if len(t) > 3]
+        return sum(1 for t in tokens if self.has_token(t)), len(tokens)
+
+    def ground(self, point: str, quote: str) -> Tuple[bool, Optional[str]]:
+        """(keep, verified quote) for one key point."""
+        if not point:
+            return False, None
+        if quote and self.contains(quote):
+            return True, quote
+        # If no usable quote, attempt soft validation by checking word overlap
+        found, considered = self.overlap(point)
+        return found >= max(2, considered // 3), None
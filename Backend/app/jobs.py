@@ -0,0 +1,429 @@
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from .metrics import job_wait_seconds, jobs_rejected
+
+load_dotenv()
+
+# Queue configuration. ":memory:" keeps the queue in-process; point
+# JOB_QUEUE_DB at a file to survive restarts.
+JOB_QUEUE_DB = os.getenv("JOB_QUEUE_DB", ":memory:")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "2"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "60"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+# A claimed job is leased to the claiming process, which renews the lease while
+# it runs; jobs whose lease expired (their process died) go back to the queue.
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+# Completed and failed jobs are deleted this long after they finished (0: keep forever)
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+
+# Fair-share scheduling: claim() serves users in start-time fair queuing order
+# instead of FIFO, so one user's bulk import cannot hold every worker.
+JOB_FAIR_SHARE = os.getenv("JOB_FAIR_SHARE", "true").lower() == "true"
+# Jobs one user may have running at once while other users have ready jobs (0: no limit)
+JOB_USER_MAX_RUNNING = int(os.getenv("JOB_USER_MAX_RUNNING", str(max(1, JOB_WORKERS // 2))))
+# Queued + running jobs one user may have before enqueues get 429 (0: no limit)
+JOB_USER_MAX_ACTIVE = int(os.getenv("JOB_USER_MAX_ACTIVE", "1000"))
+# Active interactive jobs per user; further single enqueues are scheduled as bulk
+JOB_USER_MAX_INTERACTIVE = int(os.getenv("JOB_USER_MAX_INTERACTIVE", "5"))
+# Share of the workers a class gets while users compete: an interactive job is
+# charged 1/4 of a bulk one against its user's fair share
+JOB_CLASS_WEIGHTS = {
+    "interactive": float(os.getenv("JOB_INTERACTIVE_WEIGHT", "4")),
+    "bulk": float(os.getenv("JOB_BULK_WEIGHT", "1")),
+}
+
+ACTIVE_STATUSES = ("queued", "running", "retrying")
+PRIORITIES = ("normal", "low")
+JOB_CLASSES = ("interactive", "bulk")
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler when retrying cannot help (bad input, missing document)."""
+
+
+class QuotaExceeded(Exception):
+    """The user has too many active jobs; retry_after estimates when a slot frees up, in seconds."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """SQLite-backed job queue. Safe to share between the event loop and threads."""
+
+    def __init__(self, path: str = JOB_QUEUE_DB):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                document_id TEXT NOT NULL,
+                user_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                priority TEXT NOT NULL DEFAULT 'normal',
+                job_class TEXT NOT NULL DEFAULT 'interactive',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                run_after REAL NOT NULL,
+                error TEXT,
+                result TEXT,
+                lease_owner TEXT,
+                lease_until REAL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            )
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        if "priority" not in columns:
+            # Queue files created before priorities existed
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN priority TEXT NOT NULL DEFAULT 'normal'")
+        if "job_class" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN job_class TEXT NOT NULL DEFAULT 'interactive'")
+        if "lease_owner" not in columns:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_owner TEXT")
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN lease_until REAL")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_ready ON jobs(status, run_after)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_document ON jobs(document_id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs(user_id, status, job_class)")
+        # Fair-share state (in memory; a restart only resets the accounting):
+        # virtual time per user and the start tag of the last claimed job
+        self._vtime: Dict[str, float] = {}
+        self._vclock = 0.0
+        # Claim time per running job and a moving average of job duration, for Retry-After
+        self._claimed_at: Dict[str, float] = {}
+        self._avg_seconds = 10.0
+        # Lease owner id of this queue; other processes may share the database file
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def _row_to_job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def _active_count(self, user_id: str, job_class: Optional[str] = None) -> int:
+        query = f"SELECT COUNT(*) FROM jobs WHERE user_id = ? AND status IN ({','.join('?' * len(ACTIVE_STATUSES))})"
+        params: List[Any] = [user_id, *ACTIVE_STATUSES]
+        if job_class is not None:
+            query += " AND job_class = ?"
+            params.append(job_class)
+        return self._conn.execute(query, params).fetchone()[0]
+
+    def check_quota(self, user_id: str, count: int = 1) -> None:
+        """Raise QuotaExceeded if `count` more jobs would take the user past JOB_USER_MAX_ACTIVE."""
+        if JOB_USER_MAX_ACTIVE <= 0:
+            return
+        with self._lock:
+            active = self._active_count(user_id)
+            if active + count <= JOB_USER_MAX_ACTIVE:
+                return
+            excess = active + count - JOB_USER_MAX_ACTIVE
+            retry_after = excess * self._avg_seconds / max(1, JOB_USER_MAX_RUNNING or JOB_WORKERS)
+        jobs_rejected.inc()
+        raise QuotaExceeded(
+            f"Too many documents in processing ({active} active, limit {JOB_USER_MAX_ACTIVE})",
+            min(600.0, max(1.0, retry_after)),
+        )
+
+    def enqueue(
+        self,
+        document_id: str,
+        user_id: str,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        priority: str = "normal",
+        job_class: str = "interactive",
+    ) -> Dict[str, Any]:
+        """Queue a document for processing. An already active job for the document is returned as is."""
+        now = datetime.now().isoformat()
+        with self._lock:
+            existing = self._conn.execute(
+                f"SELECT * FROM jobs WHERE document_id = ? AND status IN ({','.join('?' * len(ACTIVE_STATUSES))})",
+                (document_id, *ACTIVE_STATUSES),
+            ).fetchone()
+            if existing:
+                return self._row_to_job(existing)
+            if (
+                job_class == "interactive" and JOB_USER_MAX_INTERACTIVE > 0
+                and self._active_count(user_id, "interactive") >= JOB_USER_MAX_INTERACTIVE
+            ):
+                # Hundreds of single calls are a bulk import too
+                job_class = "bulk"
+            job_id = str(uuid.uuid4())
+            self._conn.execute(
+                "INSERT INTO jobs (id, document_id, user_id, status, priority, job_class, attempts, max_attempts, run_after, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?, 0, ?, ?, ?, ?)",
+                (job_id, document_id, user_id, priority, job_class, max(1, max_attempts), time.time(), now, now),
+            )
+            return self._row_to_job(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def _next_fifo(self, now: float) -> Optional[sqlite3.Row]:
+        return self._conn.execute(
+            "SELECT * FROM jobs WHERE status IN ('queued', 'retrying') AND run_after <= ? "
+            "ORDER BY run_after, created_at LIMIT 1",
+            (now,),
+        ).fetchone()
+
+    def _next_fair(self, now: float) -> Optional[sqlite3.Row]:
+        """
+        Start-time fair queuing over users: each user's next job starts at
+        max(user virtual time, virtual clock); the smallest start wins, ties go to
+        interactive work, then to the job waiting longest. Users at
+        JOB_USER_MAX_RUNNING are skipped while another user has ready jobs, so a
+        lone user still gets every worker. Within a user, interactive jobs go first.
+        """
+        running = dict(self._conn.execute(
+            "SELECT user_id, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY user_id"
+        ).fetchall())
+        ready = self._conn.execute(
+            "SELECT user_id, MIN(job_class != 'interactive') AS bulk_only, MIN(run_after) AS oldest FROM jobs "
+            "WHERE status IN ('queued', 'retrying') AND run_after <= ? GROUP BY user_id",
+            (now,),
+        ).fetchall()
+        if JOB_USER_MAX_RUNNING > 0:
+            ready = [row for row in ready if running.get(row["user_id"], 0) < JOB_USER_MAX_RUNNING] or ready
+        best = None
+        for row in ready:
+            user_id = row["user_id"]
+            key = (max(self._vtime.get(user_id, 0.0), self._vclock), row["bulk_only"], row["oldest"])
+            if best is None or key < best[0]:
+                best = (key, user_id)
+        if best is None:
+            return None
+        return self._conn.execute(
+            "SELECT * FROM jobs WHERE user_id = ? AND status IN ('queued', 'retrying') AND run_after <= ? "
+            "ORDER BY job_class != 'interactive', run_after, created_at LIMIT 1",
+            (best[1], now),
+        ).fetchone()
+
+    def _charge(self, user_id: str, job_class: str) -> None:
+        start = max(self._vtime.get(user_id, 0.0), self._vclock)
+        self._vclock = start
+        self._vtime[user_id] = start + 1.0 / JOB_CLASS_WEIGHTS.get(job_class, 1.0)
+        if len(self._vtime) > 10000:
+            # Users at or behind the clock are indistinguishable from new ones
+            self._vtime = {u: t for u, t in self._vtime.items() if t > self._vclock}
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the next ready job (fair-share order, or oldest first) to 'running' and return it."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._next_fair(now) if JOB_FAIR_SHARE else self._next_fifo(now)
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_until = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (self.owner, now + JOB_LEASE_SECONDS, datetime.now().isoformat(), row["id"]),
+                )
+                job = self._row_to_job(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._charge(job["user_id"], job["job_class"])
+            self._claimed_at[job["id"]] = time.monotonic()
+        job_wait_seconds.observe(max(0.0, now - row["run_after"]), job_class=job["job_class"])
+        return job
+
+    def _finished(self, job_id: str) -> None:
+        claimed_at = self._claimed_at.pop(job_id, None)
+        if claimed_at is not None:
+            self._avg_seconds += 0.1 * (time.monotonic() - claimed_at - self._avg_seconds)
+
+    def complete(self, job_id: str, result: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._finished(job_id)
+            self._conn.execute(
+                "UPDATE jobs SET status = 'completed', error = NULL, result = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(result) if result is not None else None, datetime.now().isoformat(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str, retry: bool = True) -> Dict[str, Any]:
+        """Record a failed attempt. Schedules a retry with jittered exponential backoff while attempts remain."""
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                raise KeyError(job_id)
+            self._finished(job_id)
+            if retry and row["attempts"] < row["max_attempts"]:
+                delay = min(JOB_RETRY_MAX_SECONDS, JOB_RETRY_BASE_SECONDS * (2 ** (row["attempts"] - 1)))
+                delay *= random.uniform(0.5, 1.0)
+                status, run_after = "retrying", time.time() + delay
+            else:
+                status, run_after = "failed", row["run_after"]
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, run_after = ?, updated_at = ? WHERE id = ?",
+                (status, error[:1000], run_after, datetime.now().isoformat(), job_id),
+            )
+            return self._row_to_job(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._row_to_job(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status."""
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+    def renew_leases(self) -> int:
+        """Extend the leases of the jobs this queue has running."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE status = 'running' AND lease_owner = ?",
+                (time.time() + JOB_LEASE_SECONDS, self.owner),
+            )
+            return cur.rowcount
+
+    def requeue_running(self, own: bool = False) -> int:
+        """
+        Put 'running' jobs whose lease expired (left by a process that died) back
+        in the queue; with own=True, this queue's running jobs instead (shutdown).
+        Jobs other live processes are running are left alone.
+        """
+        now = time.time()
+        condition, params = ("lease_owner = ?", (self.owner,)) if own else ("(lease_until IS NULL OR lease_until < ?)", (now,))
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'queued', run_after = ?, lease_owner = NULL, lease_until = NULL, updated_at = ? "
+                f"WHERE status = 'running' AND {condition}",
+                (now, datetime.now().isoformat(), *params),
+            )
+            return cur.rowcount
+
+    def purge_finished(self, older_than: float = JOB_RETENTION_SECONDS) -> int:
+        """Delete completed and failed jobs last updated more than `older_than` seconds ago."""
+        cutoff = (datetime.now() - timedelta(seconds=older_than)).isoformat()
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('completed', 'failed') AND updated_at < ?", (cutoff,)
+            )
+            return cur.rowcount
+
+    def next_run_after(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(run_after) AS t FROM jobs WHERE status IN ('queued', 'retrying')"
+            ).fetchone()
+            return row["t"] if row else None
+
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+FailureHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class WorkerPool:
+    """A fixed number of asyncio workers draining a JobQueue."""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: JobHandler,
+        size: int = JOB_WORKERS,
+        on_failure: Optional[FailureHandler] = None,
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.on_failure = on_failure
+        self.size = max(1, size)
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self.queue.requeue_running()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.size)]
+        self._tasks.append(asyncio.create_task(self._heartbeat()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Interrupted jobs are picked up again right away on the next start (or by another process)
+        self.queue.requeue_running(own=True)
+
+    def notify(self) -> None:
+        """Wake idle workers after an enqueue instead of waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _wait_for_work(self) -> None:
+        timeout = JOB_POLL_INTERVAL
+        next_at = self.queue.next_run_after()
+        if next_at is not None:
+            timeout = max(0.0, min(timeout, next_at - time.time()))
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _heartbeat(self) -> None:
+        """Keep this process's leases alive, take back jobs of processes that died and drop old finished jobs."""
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                self.queue.renew_leases()
+                if self.queue.requeue_running():
+                    self.notify()
+                if JOB_RETENTION_SECONDS > 0:
+                    self.queue.purge_finished(JOB_RETENTION_SECONDS)
+            except Exception:
+                pass
+
+    async def _worker(self) -> None:
+        while True:
+            job = self.queue.claim()
+            if job is None:
+                await self._wait_for_work()
+                continue
+            try:
+                result = await self.handler(job)
+                self.queue.complete(job["id"], result)
+            except asyncio.CancelledError:
+                # Left as 'running'; stop() puts it back in the queue.
+                raise
+            except PermanentJobError as e:
+                updated = self.queue.fail(job["id"], str(e), retry=False)
+                await self._report_failure(updated)
+            except Exception as e:
+                updated = self.queue.fail(job["id"], str(e) or e.__class__.__name__, retry=True)
+                if updated["status"] == "failed":
+                    await self._report_failure(updated)
+                else:
+                    self.notify()
+
+    async def _report_failure(self, job: Dict[str, Any]) -> None:
+        if self.on_failure is None:
+            return
+        try:
+            await self.on_failure(job)
+        except Exception:
+            pass
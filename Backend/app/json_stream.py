@@ -0,0 +1,125 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Events produced by IncrementalJSONParser.feed:
+#   ("member", key, value)  a top-level object member is complete
+#   ("item", key, value)    an element of a top-level array member is complete
+ParseEvent = Tuple[str, Optional[str], Any]
+
+
+class IncrementalJSONParser:
+    """
+    Incremental scanner for a single JSON object arriving in pieces (e.g. LLM
+    token deltas). Reports each top-level member, and each element of top-level
+    arrays, as soon as its closing character has been seen. Text before the
+    first "{" (prose, code fences) is skipped. Values are decoded with json.loads,
+    so a value that turns out to be invalid is silently not reported.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []  # open containers, "{" or "["
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._key: Optional[str] = None
+        self._awaiting: Dict[int, bool] = {}  # depth -> next non-space char starts a tracked value
+        self._value_start: Dict[int, Optional[int]] = {}  # depth -> start offset of the tracked value
+        self.done = False
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def _tracked(self, depth: int) -> bool:
+        # Top-level members, and elements of arrays that are top-level members
+        return depth == 1 or (depth == 2 and self._stack[:2] == ["{", "["])
+
+    def _finish(self, depth: int, end: int, events: List[ParseEvent]) -> None:
+        start = self._value_start.get(depth)
+        if start is None:
+            return
+        self._value_start[depth] = None
+        try:
+            value = json.loads(self._text[start:end])
+        except ValueError:
+            return
+        events.append(("member" if depth == 1 else "item", self._key, value))
+
+    def feed(self, chunk: str) -> List[ParseEvent]:
+        events: List[ParseEvent] = []
+        self._text += chunk
+        text = self._text
+        i = self._pos
+        while i < len(text) and not self.done:
+            ch = text[i]
+            depth = len(self._stack)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if depth == 1 and self._expect_key:
+                        try:
+                            self._key = json.loads(text[self._string_start:i + 1])
+                        except ValueError:
+                            self._key = None
+                    elif self._value_start.get(depth) == self._string_start:
+                        self._finish(depth, i + 1, events)
+                i += 1
+                continue
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._stack.append("{")
+                    self._expect_key = True
+                i += 1
+                continue
+
+            if ch in " \t\r\n":
+                i += 1
+                continue
+
+            if self._awaiting.get(depth) and ch not in "]}":
+                self._awaiting[depth] = False
+                if self._tracked(depth):
+                    self._value_start[depth] = i
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch in "{[":
+                self._stack.append(ch)
+                if ch == "[":
+                    self._awaiting[depth + 1] = True
+            elif ch in "}]":
+                # A scalar ends at the closing bracket; a container value ends with it
+                if self._value_start.get(depth) is not None:
+                    self._finish(depth, i, events)
+                self._stack.pop()
+                self._awaiting[depth] = False
+                if not self._stack:
+                    self.done = True
+                elif self._value_start.get(depth - 1) is not None:
+                    self._finish(depth - 1, i + 1, events)
+            elif ch == ",":
+                if self._value_start.get(depth) is not None:
+                    self._finish(depth, i, events)
+                if depth == 1:
+                    self._expect_key = True
+                elif self._stack[-1] == "[":
+                    self._awaiting[depth] = True
+            elif ch == ":" and depth == 1:
+                self._expect_key = False
+                self._awaiting[1] = True
+            i += 1
+
+        self._pos = i
+        return events
@@ -0,0 +1,139 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request, Response
+
+from .cache import MemoryLRU
+from .repository import Repository
+from .responses import dumps, encoded_response, ndjson_response, wants_ndjson
+
+load_dotenv()
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+# How long a remembered ETag may answer If-None-Match without asking the database.
+# Writes made by this process invalidate immediately; the TTL bounds staleness
+# for writes made by other workers.
+LIST_ETAG_TTL_SECONDS = float(os.getenv("LIST_ETAG_TTL_SECONDS", "30"))
+
+DOCUMENT_FIELDS = ("id", "name", "size_bytes", "file_type", "status", "progress", "upload_date", "file_url")
+SUMMARY_FIELDS = (
+    "id", "document_id", "title", "key_points", "word_count", "reading_time",
+    "sentiment", "categories", "full_summary", "created_at",
+)
+
+
+def select_columns(
+    fields: Optional[str], allowed: Sequence[str], sort_key: str, exclude: Sequence[str] = ()
+) -> List[str]:
+    """Columns to select for a ?fields=a,b projection; id and the sort key are always included."""
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        requested = [f for f in allowed if f not in exclude]
+    columns = ["id", sort_key] + [f for f in requested if f not in ("id", sort_key)]
+    return columns
+
+
+def encode_cursor(row: Dict[str, Any], sort_key: str) -> str:
+    raw = json.dumps([row[sort_key], row["id"]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return str(sort_value), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class ListETags:
+    """Per-user data versions plus the last ETag served for each (user, query)."""
+
+    def __init__(self, max_entries: int = 10000):
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._etags = MemoryLRU(max_entries, LIST_ETAG_TTL_SECONDS)
+
+    def invalidate(self, user_id: str) -> None:
+        """Call after any write that can change a user's lists."""
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+
+    def version(self, user_id: str) -> int:
+        return self._versions.get(user_id, 0)
+
+    def remember(self, key: Tuple, etag: str, version: int) -> None:
+        """Store the ETag computed from data read while the user was at `version`."""
+        self._etags.put(repr(key), (etag, version))
+
+    def fresh_etag(self, key: Tuple, user_id: str) -> Optional[str]:
+        entry = self._etags.get(repr(key))
+        if entry is None:
+            return None
+        etag, version = entry
+        return etag if version == self.version(user_id) else None
+
+
+list_etags = ListETags()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip() for c in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+async def paginated_list(
+    request: Request,
+    repo: Repository,
+    table: str,
+    user_id: str,
+    columns: List[str],
+    sort_key: str,
+    limit: int,
+    cursor: Optional[str],
+) -> Response:
+    """
+    One keyset-paginated page of a user's rows as a JSON response with ETag and
+    X-Next-Cursor headers. A matching If-None-Match for unchanged data returns
+    304, without a database query when the ETag is still remembered.
+    Rows are passed through as stored (no model validation) and compressed per
+    Accept-Encoding. With "Accept: application/x-ndjson" the page is streamed as
+    one JSON object per line instead, without an ETag.
+    """
+    key = (user_id, table, tuple(columns), limit, cursor)
+    headers = {"Cache-Control": "private, no-cache", "Vary": "Accept"}
+    ndjson = wants_ndjson(request)
+
+    known = None if ndjson else list_etags.fresh_etag(key, user_id)
+    if known and etag_matches(request, known):
+        return Response(status_code=304, headers={**headers, "ETag": known})
+
+    version = list_etags.version(user_id)
+    after = decode_cursor(cursor) if cursor else None
+    rows = await repo.list_page(table, user_id, columns, sort_key, limit + 1, after)
+    if len(rows) > limit:
+        headers["X-Next-Cursor"] = encode_cursor(rows[limit - 1], sort_key)
+        rows = rows[:limit]
+    if ndjson:
+        return ndjson_response(request, rows, headers)
+
+    body = dumps(rows)
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    list_etags.remember(key, etag, version)
+    headers["ETag"] = etag
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return await encoded_response(request, body, headers)
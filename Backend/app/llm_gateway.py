@@ -0,0 +1,374 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import openai
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from .metrics import span
+from .tokens import count_message_tokens
+
+load_dotenv()
+
+# Every completion request goes through one gateway: a global concurrency cap,
+# RPM/TPM token buckets matched to the account quota (0 disables a bucket),
+# per-attempt timeouts, jittered exponential retries for transient errors and a
+# circuit breaker that fails fast once the API keeps failing.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Requests one user's jobs may have in flight at once, so a bulk import of long
+# documents (many map-reduce chunks) leaves capacity for others (0: no limit)
+LLM_USER_MAX_CONCURRENCY = int(os.getenv("LLM_USER_MAX_CONCURRENCY", str(max(1, LLM_MAX_CONCURRENCY // 2))))
+LLM_RPM = float(os.getenv("LLM_RPM", "0"))
+LLM_TPM = float(os.getenv("LLM_TPM", "0"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "90"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "30"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+
+# Retries are the gateway's job, so the SDK's own are turned off. Without an API
+# key there is no client (the SDK refuses to build one) and summaries stay local.
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+async_client: Optional[AsyncOpenAI] = AsyncOpenAI(api_key=OPENAI_API_KEY, max_retries=0) if OPENAI_API_KEY else None
+
+# User the current task's requests are charged to; set by the job handler
+llm_user: ContextVar[Optional[str]] = ContextVar("llm_user", default=None)
+
+
+class LLMUnavailableError(Exception):
+    """Transient failure (rate limited, timeouts, 5xx, circuit open) that outlasted the retries; try again later."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"LLM unavailable: {reason}")
+        self.reason = reason
+
+
+class LLMRequestError(Exception):
+    """The request itself was rejected (bad request, auth); retrying cannot help."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"LLM request failed: {reason}")
+        self.reason = reason
+
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Any] = {
+    "requests": 0,
+    "succeeded": 0,
+    "in_flight": 0,
+    "rate_limit_waits": 0,
+    "rate_limit_wait_seconds": 0.0,
+    "circuit_opened": 0,
+    "circuit_rejected": 0,
+    "retries": {},
+    "failures": {},
+    "fallbacks": {},
+}
+
+
+def _count(key: str, amount: float = 1, reason: Optional[str] = None) -> None:
+    with _stats_lock:
+        if reason is None:
+            _stats[key] += amount
+        else:
+            _stats[key][reason] = _stats[key].get(reason, 0) + amount
+
+
+def record_fallback(reason: str) -> None:
+    """Count a degraded (extractive) summary and why it happened."""
+    _count("fallbacks", reason=reason)
+
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute, bursting up to the same amount.
+    reserve() takes the units immediately (the level may go negative) and returns
+    how long the caller must wait, so concurrent callers queue up in order.
+    Thread-safe and not tied to an event loop. per_minute <= 0 disables it.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self._level = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        if self.capacity <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+            self._updated = now
+            self._level -= min(amount, self.capacity)
+            return 0.0 if self._level >= 0 else -self._level / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Give back units reserved but not used (negative amounts charge extra)."""
+        if self.capacity <= 0:
+            return
+        with self._lock:
+            self._level = min(self.capacity, self._level + amount)
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive transient failures; while open, requests
+    are rejected without calling the API. After `cooldown` seconds one trial
+    request is let through: success closes the circuit, failure re-opens it.
+    A trial that ends without an answer either way (cancelled, or failed before
+    reaching the API) is handed back with release(), which re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int = LLM_BREAKER_THRESHOLD, cooldown: float = LLM_BREAKER_COOLDOWN_SECONDS):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> Optional[str]:
+        """"closed" or "trial" if the request may go ahead, None if the circuit rejects it."""
+        if self.threshold <= 0:
+            return "closed"
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+            if self.state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return "trial"
+            return "closed" if self.state == "closed" else None
+
+    def release(self, permit: Optional[str]) -> None:
+        """End a request that neither succeeded nor failed transiently; a trial re-opens the circuit."""
+        if permit != "trial":
+            return
+        with self._lock:
+            if self.state == "half_open" and self._trial_running:
+                self._trial_running = False
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_running = False
+            if self.state == "half_open" or (self.threshold > 0 and self._failures >= self.threshold):
+                if self.state != "open":
+                    _count("circuit_opened")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def _classify(error: BaseException) -> Tuple[str, bool]:
+    """(reason, transient) for an exception raised by one attempt."""
+    if isinstance(error, (asyncio.TimeoutError, openai.APITimeoutError)):
+        return "timeout", True
+    if isinstance(error, openai.RateLimitError):
+        return "rate_limited", True
+    if isinstance(error, openai.APIConnectionError):
+        return "connection", True
+    if isinstance(error, openai.APIStatusError):
+        if error.status_code >= 500 or error.status_code in (408, 409):
+            return "server_error", True
+        if error.status_code in (401, 403):
+            return "auth", False
+        return "bad_request", False
+    return "error", False
+
+
+def _retry_after(error: BaseException) -> float:
+    """Server-suggested delay in seconds (Retry-After / retry-after-ms headers), or 0."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        return float(headers.get("retry-after") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class LLMGateway:
+    """Shared entry point for chat completions; see the configuration above."""
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI],
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        rpm: float = LLM_RPM,
+        tpm: float = LLM_TPM,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        max_user_concurrency: int = LLM_USER_MAX_CONCURRENCY,
+    ):
+        self.client = client
+        self.max_concurrency = max(1, max_concurrency)
+        self.requests_bucket = TokenBucket(rpm)
+        self.tokens_bucket = TokenBucket(tpm)
+        self.timeout = timeout
+        self.max_retries = max(0, max_retries)
+        self.max_user_concurrency = max_user_concurrency
+        self.breaker = CircuitBreaker()
+        # asyncio primitives belong to one event loop; the API server has one,
+        # but synchronous callers run their own
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        # Per loop: user -> [semaphore, tasks holding or waiting for it]
+        self._user_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, list]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    @asynccontextmanager
+    async def _user_slot(self):
+        """Hold one of the current user's LLM_USER_MAX_CONCURRENCY slots (no-op outside a job)."""
+        user_id = llm_user.get()
+        if user_id is None or self.max_user_concurrency <= 0:
+            yield
+            return
+        slots = self._user_slots.setdefault(asyncio.get_running_loop(), {})
+        entry = slots.get(user_id)
+        if entry is None:
+            entry = slots[user_id] = [asyncio.Semaphore(self.max_user_concurrency), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del slots[user_id]
+
+    async def _stream_once(self, request: Dict[str, Any], on_delta: Callable[[str], None]) -> Tuple[str, Any]:
+        stream = await self.client.chat.completions.create(
+            **request, stream=True, stream_options={"include_usage": True}
+        )
+        parts = []
+        usage = None
+        async for part in stream:
+            if getattr(part, "usage", None):
+                usage = part.usage
+            delta = part.choices[0].delta.content if part.choices else None
+            if delta:
+                parts.append(delta)
+                on_delta(delta)
+        return "".join(parts), usage
+
+    async def stream_chat(
+        self,
+        request: Dict[str, Any],
+        on_delta: Callable[[str], None],
+        on_reset: Optional[Callable[[], None]] = None,
+    ) -> Tuple[str, Any]:
+        """
+        Run a streamed chat completion, passing each text delta to on_delta.
+        Returns (full text, usage or None). If an attempt fails after deltas were
+        delivered, on_reset() is called before the retry starts over.
+        Raises LLMUnavailableError or LLMRequestError.
+        """
+        if self.client is None:
+            raise LLMRequestError("no_api_key")
+        cost = count_message_tokens(request["messages"], request["model"]) + int(request.get("max_tokens") or 0)
+        delivered = False
+
+        def _on_delta(delta: str) -> None:
+            nonlocal delivered
+            delivered = True
+            on_delta(delta)
+
+        _count("requests")
+        attempt = 0
+        while True:
+            permit = self.breaker.allow()
+            if not permit:
+                _count("circuit_rejected")
+                _count("failures", reason="circuit_open")
+                raise LLMUnavailableError("circuit_open")
+
+            # Every way out of the attempt settles the breaker, so a half-open
+            # trial cannot be left running (cancellation included)
+            settled = False
+            try:
+                wait = max(self.requests_bucket.reserve(1), self.tokens_bucket.reserve(cost))
+                if wait > 0:
+                    _count("rate_limit_waits")
+                    _count("rate_limit_wait_seconds", wait)
+                    await asyncio.sleep(wait)
+
+                async with self._user_slot(), self._semaphore():
+                    _count("in_flight")
+                    try:
+                        with span("llm"):
+                            text, usage = await asyncio.wait_for(self._stream_once(request, _on_delta), self.timeout)
+                    except Exception as e:
+                        error = e
+                    else:
+                        self.breaker.record_success()
+                        settled = True
+                        _count("succeeded")
+                        if usage is not None:
+                            self.tokens_bucket.refund(cost - usage.prompt_tokens - usage.completion_tokens)
+                        return text, usage
+                    finally:
+                        _count("in_flight", -1)
+
+                reason, transient = _classify(error)
+                if not transient:
+                    if isinstance(error, openai.APIStatusError):
+                        # The API answered; the request itself was at fault
+                        self.breaker.record_success()
+                        settled = True
+                    _count("failures", reason=reason)
+                    raise LLMRequestError(reason) from error
+                self.breaker.record_failure()
+                settled = True
+            finally:
+                if not settled:
+                    self.breaker.release(permit)
+            if attempt >= self.max_retries:
+                _count("failures", reason=reason)
+                raise LLMUnavailableError(reason) from error
+
+            delay = random.uniform(0, min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * (2 ** attempt)))
+            delay = min(LLM_RETRY_MAX_SECONDS, max(delay, _retry_after(error)))
+            _count("retries", reason=reason)
+            if delivered and on_reset:
+                on_reset()
+                delivered = False
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+gateway = LLMGateway(async_client)
+
+
+def llm_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        stats = {k: (dict(v) if isinstance(v, dict) else v) for k, v in _stats.items()}
+    stats["rate_limit_wait_seconds"] = round(stats["rate_limit_wait_seconds"], 3)
+    stats["circuit_state"] = gateway.breaker.state
+    return stats
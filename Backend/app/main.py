@@ -1,28 +1,69 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
+import asyncio
 import openai
 from dotenv import load_dotenv
-import uuid
-from datetime import datetime
-from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from typing import Optional, List, Dict, Any, Literal
 from pydantic import BaseModel
-import json
+import secrets
 
-from .supabase_client import get_supabase_client, get_supabase_anon_client
-from .extractor import extract_text
-from .summarizer_client import summarize_text
+from .repository import get_repository
+from .jobs import JobQueue, QuotaExceeded, WorkerPool
+from .pipeline import run_process_job, mark_document_failed
+from .concurrency import shutdown as shutdown_executors
+from .cache import MemoryLRU, cache_stats
+from .uploads import UploadSizeLimitMiddleware, store_upload
+from .auth import authenticate, auth_stats
+from .llm_gateway import llm_stats
+from .metrics import METRICS_TOKEN, MetricsMiddleware, register_collector, render as render_metrics
+from .search import (
+    SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, SEARCH_RERANK, search_summaries,
+    decode_cursor as decode_search_cursor, encode_cursor as encode_search_cursor,
+)
+from .text_store import load_text, page_text, remove_text
+from .near_duplicates import NEAR_DUP_SIMILAR_THRESHOLD, find_similar
+from .events import EVENTS_KEEPALIVE_SECONDS, TERMINAL_STATUSES, progress_broker, sse_event
+from .listing import (
+    DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, DOCUMENT_FIELDS, SUMMARY_FIELDS,
+    list_etags, paginated_list, select_columns,
+)
 
 # Load environment variables
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
-app = FastAPI(title="Document Processing API", version="1.0.0")
+# Batch endpoint limits
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Queued documents show as processing from the start; the worker sets the rest when it picks them up
+QUEUED_DOCUMENT_FIELDS = {"status": "processing", "progress": 0}
+
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "10"))
+analytics_cache = MemoryLRU(max_entries=10000, ttl=ANALYTICS_CACHE_TTL_SECONDS)
+
+# Background processing: /api/process enqueues, the worker pool drains the queue
+job_queue = JobQueue()
+worker_pool = WorkerPool(job_queue, run_process_job, on_failure=mark_document_failed)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    progress_broker.bind_loop(asyncio.get_running_loop())
+    await worker_pool.start()
+    yield
+    await worker_pool.stop()
+    shutdown_executors()
+
+app = FastAPI(title="Document Processing API", version="1.0.0", lifespan=lifespan)
 
 # Security
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # Enable CORS for frontend
 frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
@@ -32,13 +73,46 @@ origins = [
     frontend_url
 ]
 
+# Inside CORS, so 413s for oversized uploads still carry the CORS headers
+app.add_middleware(UploadSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware)
+
+def _stats_metrics():
+    """Counters the cache, LLM gateway, auth and job queue already keep, exported at scrape time."""
+    caches = cache_stats()
+    yield ("cache_lookups_total", "counter", "Pipeline cache lookups", [
+        ({"cache": name, "result": result}, stats[key])
+        for name, stats in caches.items()
+        for result, key in (("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses"))
+    ])
+    yield ("cache_hit_ratio", "gauge", "Pipeline cache hit rate", [({"cache": n}, s["hit_rate"]) for n, s in caches.items()])
+    yield ("cache_entries", "gauge", "Entries in the in-memory cache tier", [({"cache": n}, s["entries"]) for n, s in caches.items()])
+
+    llm = llm_stats()
+    yield ("llm_requests_total", "counter", "Completion requests", [({}, llm["requests"])])
+    yield ("llm_requests_in_flight", "gauge", "Completion attempts in progress", [({}, llm["in_flight"])])
+    yield ("llm_rate_limit_wait_seconds_total", "counter", "Time spent waiting for RPM/TPM capacity", [({}, llm["rate_limit_wait_seconds"])])
+    yield ("llm_retries_total", "counter", "Retried completion attempts", [({"reason": r}, n) for r, n in llm["retries"].items()])
+    yield ("llm_failures_total", "counter", "Completion requests that failed", [({"reason": r}, n) for r, n in llm["failures"].items()])
+    yield ("llm_fallbacks_total", "counter", "Extractive fallback summaries", [({"reason": r}, n) for r, n in llm["fallbacks"].items()])
+    yield ("llm_circuit_open", "gauge", "1 while the LLM circuit breaker is not closed", [({}, int(llm["circuit_state"] != "closed"))])
+
+    auth = auth_stats()
+    yield ("auth_lookups_total", "counter", "Token lookups by outcome", [
+        ({"result": result}, auth[result]) for result in ("cache_hits", "local_verified", "remote_verified", "rejected")
+    ])
+
+    yield ("jobs", "gauge", "Processing jobs by status", [({"status": s}, n) for s, n in job_queue.counts().items()])
+
+register_collector(_stats_metrics)
 
 # Pydantic models
 class DocumentResponse(BaseModel):
@@ -70,20 +144,129 @@ class AnalyticsResponse(BaseModel):
     documents_today: int
     success_rate: float
 
+class SearchResult(BaseModel):
+    id: str
+    document_id: str
+    title: str
+    categories: List[str]
+    key_points: List[str]
+    created_at: str
+    rank: float
+    title_highlight: str
+    summary_highlight: str
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+    next_cursor: Optional[str] = None
+
+class DocumentTextResponse(BaseModel):
+    document_id: str
+    page_count: int
+    page: Optional[int] = None
+    text: str
+
+class SimilarDocument(BaseModel):
+    id: str
+    name: str
+    status: str
+    upload_date: str
+    similarity: float
+
+class SimilarDocumentsResponse(BaseModel):
+    document_id: str
+    results: List[SimilarDocument]
+
 class ProcessDocumentRequest(BaseModel):
     document_id: str
+    # "low" lets SUMMARY_ENGINE=auto summarize locally instead of calling OpenAI
+    priority: Literal["normal", "low"] = "normal"
+
+class JobResponse(BaseModel):
+    id: str
+    document_id: str
+    status: str
+    priority: str = "normal"
+    # "interactive" for single /api/process calls, "bulk" for batches (scheduled behind interactive work)
+    job_class: str = "interactive"
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    summary_id: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+class BatchUploadItem(BaseModel):
+    filename: Optional[str] = None
+    status: str
+    document: Optional[DocumentResponse] = None
+    error: Optional[str] = None
+
+class BatchUploadResponse(BaseModel):
+    uploaded: int
+    failed: int
+    items: List[BatchUploadItem]
+
+class BatchProcessRequest(BaseModel):
+    document_ids: List[str]
+    priority: Literal["normal", "low"] = "normal"
+
+class BatchProcessItem(BaseModel):
+    document_id: str
+    status: str
+    job: Optional[JobResponse] = None
+
+class BatchProcessResponse(BaseModel):
+    queued: int
+    not_found: int
+    items: List[BatchProcessItem]
+
+def _document_response(document: Dict[str, Any]) -> DocumentResponse:
+    return DocumentResponse(
+        id=document["id"],
+        name=document["name"],
+        size_bytes=document["size_bytes"],
+        file_type=document["file_type"],
+        status=document["status"],
+        progress=document["progress"],
+        upload_date=document["upload_date"],
+        file_url=document["file_url"]
+    )
+
+def _job_response(job: Dict[str, Any]) -> JobResponse:
+    return JobResponse(
+        id=job["id"],
+        document_id=job["document_id"],
+        status=job["status"],
+        priority=job["priority"],
+        job_class=job["job_class"],
+        attempts=job["attempts"],
+        max_attempts=job["max_attempts"],
+        error=job["error"],
+        summary_id=(job["result"] or {}).get("summary_id"),
+        created_at=job["created_at"],
+        updated_at=job["updated_at"]
+    )
 
 # Authentication helper
 async def get_current_user(authorization: HTTPAuthorizationCredentials = Depends(security)):
-    """Extract user from JWT token"""
+    """Extract user from JWT token (verified locally and cached; see auth.py)"""
     try:
-        supabase = get_supabase_anon_client()
-        # Verify the JWT token
-        user = supabase.auth.get_user(authorization.credentials)
-        if not user or not user.user:
-            raise HTTPException(status_code=401, detail="Invalid authentication token")
-        return user.user
-    except Exception as e:
+        return await authenticate(authorization.credentials)
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid authentication token")
+
+async def get_current_user_from_header_or_query(
+    authorization: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token: Optional[str] = Query(None, description="For clients like EventSource that cannot set headers"),
+):
+    """Like get_current_user, but also accepts the token as ?access_token="""
+    token = authorization.credentials if authorization else access_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    try:
+        return await authenticate(token)
+    except Exception:
         raise HTTPException(status_code=401, detail="Invalid authentication token")
 
 @app.get("/")
@@ -93,7 +276,14 @@ def root():
 # Health check endpoint
 @app.get("/health")
 def health_check():
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(), "cache": cache_stats(), "auth": auth_stats(), "llm": llm_stats()}
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics(authorization: Optional[str] = Header(None)):
+    if METRICS_TOKEN and not secrets.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
 # Upload endpoint
 @app.post("/api/upload", response_model=DocumentResponse)
@@ -102,214 +292,273 @@ async def upload_document(
     current_user = Depends(get_current_user)
 ):
     try:
-        supabase = get_supabase_client()
-        
-        # Read file content
-        content = await file.read()
-        file_size = len(content)
+        repo = get_repository()
         
-        # Upload file to Supabase Storage
-        file_path = f"{current_user.id}/{uuid.uuid4()}_{file.filename}"
-        storage_response = supabase.storage.from_("documents").upload(file_path, content)
+        # Stream the file to storage and build the document record
+        document_data = await store_upload(repo, current_user.id, file)
         
-        if storage_response.get("error"):
-            raise HTTPException(status_code=500, detail="Failed to upload file to storage")
+        inserted = await repo.insert_documents([document_data])
         
-        # Get public URL
-        file_url = supabase.storage.from_("documents").get_public_url(file_path)
-        
-        # Insert document record
-        document_data = {
-            "user_id": current_user.id,
-            "name": file.filename,
-            "size_bytes": file_size,
-            "file_type": file.content_type or "application/octet-stream",
-            "status": "uploading",
-            "progress": 100,
-            "file_path": file_path,
-            "file_url": file_url["publicURL"] if file_url else None
-        }
+        if not inserted:
+            raise HTTPException(status_code=500, detail="Failed to create document record")
         
-        result = supabase.table("documents").insert(document_data).execute()
+        document = inserted[0]
+        list_etags.invalidate(current_user.id)
         
-        if not result.data:
-            raise HTTPException(status_code=500, detail="Failed to create document record")
+        return _document_response(document)
         
-        document = result.data[0]
-        
-        return DocumentResponse(
-            id=document["id"],
-            name=document["name"],
-            size_bytes=document["size_bytes"],
-            file_type=document["file_type"],
-            status=document["status"],
-            progress=document["progress"],
-            upload_date=document["upload_date"],
-            file_url=document["file_url"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+# Batch upload: one auth check, bounded concurrent storage uploads, one bulk insert
+@app.post("/api/upload/batch", response_model=BatchUploadResponse)
+async def upload_documents_batch(
+    files: List[UploadFile] = File(...),
+    current_user = Depends(get_current_user)
+):
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} files per batch")
+    try:
+        repo = get_repository()
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+        
+        async def _store(file: UploadFile):
+            async with semaphore:
+                try:
+                    return await store_upload(repo, current_user.id, file), None
+                except HTTPException as e:
+                    return None, str(e.detail)
+                except Exception as e:
+                    return None, str(e)
+        
+        stored = await asyncio.gather(*(_store(f) for f in files))
+        
+        # Single bulk insert for every file that reached storage
+        to_insert = [data for data, _ in stored if data is not None]
+        inserted = []
+        if to_insert:
+            inserted = await repo.insert_documents(to_insert)
+            list_etags.invalidate(current_user.id)
+        by_path = {doc["file_path"]: doc for doc in inserted}
+        
+        items = []
+        for file, (data, error) in zip(files, stored):
+            document = by_path.get(data["file_path"]) if data else None
+            if document:
+                items.append(BatchUploadItem(filename=file.filename, status="uploaded", document=_document_response(document)))
+            else:
+                items.append(BatchUploadItem(filename=file.filename, status="failed", error=error or "Failed to create document record"))
+        
+        return BatchUploadResponse(
+            uploaded=sum(1 for i in items if i.status == "uploaded"),
+            failed=sum(1 for i in items if i.status == "failed"),
+            items=items
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch upload failed: {str(e)}")
 
-# Process document endpoint
-@app.post("/api/process")
+# Process document endpoint: queues the work and returns immediately
+@app.post("/api/process", status_code=202, response_model=JobResponse)
 async def process_document(
     request: ProcessDocumentRequest,
     current_user = Depends(get_current_user)
 ):
     try:
-        supabase = get_supabase_client()
+        repo = get_repository()
         
-        # Get document
-        doc_result = supabase.table("documents").select("*").eq("id", request.document_id).eq("user_id", current_user.id).execute()
+        # Check the document exists and belongs to the user before queueing
+        document = await repo.get_document(request.document_id, current_user.id, ("id",))
         
-        if not doc_result.data:
+        if document is None:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        document = doc_result.data[0]
-        
-        supabase.table("documents").update({
-            "status": "processing",
-            "processing_started_at": datetime.now().isoformat()
-        }).eq("id", request.document_id).execute()
-        
-        # Download file bytes for processing using stored file_path
-        file_bytes = supabase.storage.from_("documents").download(document["file_path"])
-        if not file_bytes:
-            raise HTTPException(status_code=500, detail="Failed to download file for processing")
-
-        # Ensure bytes type
-        if isinstance(file_bytes, str):
-            file_bytes = file_bytes.encode("utf-8", errors="ignore")
-
-        # Extract text from file
-        content = extract_text(file_bytes, document.get("file_type"), document.get("name"))
-        if not content:
-            raise HTTPException(status_code=400, detail="Unable to extract text from file")
-
-        # Summarize content
-        summary_struct = summarize_text(content, title_hint=document["name"].split(".")[0])
-
-        # Insert summary record
-        summary_data = {
-            "document_id": request.document_id,
-            "user_id": current_user.id,
-            "title": summary_struct.get("title"),
-            "key_points": summary_struct.get("key_points", []),
-            "word_count": summary_struct.get("word_count", len(content.split())),
-            "reading_time": summary_struct.get("reading_time", "1 min"),
-            "sentiment": summary_struct.get("sentiment", "neutral"),
-            "categories": summary_struct.get("categories", ["Document", "Analysis"]),
-            "full_summary": summary_struct.get("full_summary", "")
-        }
-        summary_result = supabase.table("document_summaries").insert(summary_data).execute()
-
-        # Update document status to completed
-        supabase.table("documents").update({
-            "status": "completed",
-            "processing_completed_at": datetime.now().isoformat()
-        }).eq("id", request.document_id).execute()
-
-        if summary_result.data:
-            summary = summary_result.data[0]
-            return SummaryResponse(
-                id=summary["id"],
-                document_id=summary["document_id"],
-                title=summary["title"],
-                key_points=summary["key_points"],
-                word_count=summary["word_count"],
-                reading_time=summary["reading_time"],
-                sentiment=summary["sentiment"],
-                categories=summary["categories"],
-                full_summary=summary["full_summary"],
-                created_at=summary["created_at"]
-            )
-        else:
-            raise HTTPException(status_code=500, detail="Failed to save summary")
+        job_queue.check_quota(current_user.id)
+        job = job_queue.enqueue(request.document_id, current_user.id, priority=request.priority)
+        if job["status"] == "queued":
+            await repo.update_document(request.document_id, QUEUED_DOCUMENT_FIELDS)
+            list_etags.invalidate(current_user.id)
+        _publish_queued(job)
+        worker_pool.notify()
+        
+        return _job_response(job)
+        
+    except HTTPException:
+        raise
+    except QuotaExceeded as e:
+        raise _quota_exceeded(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to queue document: {str(e)}")
+
+def _quota_exceeded(error: QuotaExceeded) -> HTTPException:
+    return HTTPException(
+        status_code=429, detail=str(error), headers={"Retry-After": str(int(error.retry_after + 0.999))}
+    )
+
+def _publish_queued(job: Dict[str, Any]) -> None:
+    # Only for fresh jobs; re-enqueueing a running document returns the existing job
+    if job["status"] == "queued" and progress_broker.last_event(job["document_id"]) is None:
+        progress_broker.publish(job["document_id"], "queued", 0, status="queued")
+
+# Batch process endpoint: one ownership query, one job per document
+@app.post("/api/process/batch", status_code=202, response_model=BatchProcessResponse)
+async def process_documents_batch(
+    request: BatchProcessRequest,
+    current_user = Depends(get_current_user)
+):
+    document_ids = list(dict.fromkeys(request.document_ids))
+    if len(document_ids) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_FILES} documents per batch")
+    try:
+        repo = get_repository()
+        
+        owned = await repo.owned_document_ids(current_user.id, document_ids) if document_ids else set()
+        
+        # All or nothing: a batch that does not fit the user's quota queues no jobs
+        if owned:
+            job_queue.check_quota(current_user.id, len(owned))
+        
+        items = []
+        for document_id in document_ids:
+            if document_id not in owned:
+                items.append(BatchProcessItem(document_id=document_id, status="not_found"))
+                continue
+            job = job_queue.enqueue(document_id, current_user.id, priority=request.priority, job_class="bulk")
+            _publish_queued(job)
+            items.append(BatchProcessItem(document_id=document_id, status="queued", job=_job_response(job)))
+        
+        # One status update for every document whose job is waiting to run
+        waiting = [i.document_id for i in items if i.job and i.job.status == "queued"]
+        if waiting:
+            await repo.update_documents(waiting, QUEUED_DOCUMENT_FIELDS)
+            list_etags.invalidate(current_user.id)
+        worker_pool.notify()
+        
+        return BatchProcessResponse(
+            queued=sum(1 for i in items if i.status == "queued"),
+            not_found=sum(1 for i in items if i.status == "not_found"),
+            items=items
+        )
         
     except HTTPException:
         raise
+    except QuotaExceeded as e:
+        raise _quota_exceeded(e)
     except Exception as e:
-        # Update document status to failed
-        supabase = get_supabase_client()
-        supabase.table("documents").update({"status": "failed"}).eq("id", request.document_id).execute()
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue documents: {str(e)}")
+
+# Job status endpoint
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str, current_user = Depends(get_current_user)):
+    job = job_queue.get(job_id)
+    if not job or job["user_id"] != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
 
-# Get user documents
+# Get user documents (keyset-paginated; next page cursor in X-Next-Cursor)
 @app.get("/api/documents", response_model=List[DocumentResponse])
-async def get_documents(current_user = Depends(get_current_user)):
+async def get_documents(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    current_user = Depends(get_current_user)
+):
     try:
-        supabase = get_supabase_client()
-        result = supabase.table("documents").select("*").eq("user_id", current_user.id).order("upload_date", desc=True).execute()
-        
-        documents = []
-        for doc in result.data:
-            documents.append(DocumentResponse(
-                id=doc["id"],
-                name=doc["name"],
-                size_bytes=doc["size_bytes"],
-                file_type=doc["file_type"],
-                status=doc["status"],
-                progress=doc["progress"],
-                upload_date=doc["upload_date"],
-                file_url=doc["file_url"]
-            ))
-        
-        return documents
+        columns = select_columns(fields, DOCUMENT_FIELDS, "upload_date")
+        return await paginated_list(request, get_repository(), "documents", current_user.id, columns, "upload_date", limit, cursor)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch documents: {str(e)}")
 
-# Get summaries
+# Get summaries (keyset-paginated; lite=true omits full_summary)
 @app.get("/api/summaries", response_model=List[SummaryResponse])
-async def get_summaries(current_user = Depends(get_current_user)):
+async def get_summaries(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+    lite: bool = False,
+    current_user = Depends(get_current_user)
+):
     try:
-        supabase = get_supabase_client()
-        result = supabase.table("document_summaries").select("*").eq("user_id", current_user.id).order("created_at", desc=True).execute()
-        
-        summaries = []
-        for summary in result.data:
-            summaries.append(SummaryResponse(
-                id=summary["id"],
-                document_id=summary["document_id"],
-                title=summary["title"],
-                key_points=summary["key_points"],
-                word_count=summary["word_count"],
-                reading_time=summary["reading_time"],
-                sentiment=summary["sentiment"],
-                categories=summary["categories"],
-                full_summary=summary["full_summary"],
-                created_at=summary["created_at"]
-            ))
-        
-        return summaries
+        columns = select_columns(fields, SUMMARY_FIELDS, "created_at", exclude=("full_summary",) if lite else ())
+        return await paginated_list(request, get_repository(), "document_summaries", current_user.id, columns, "created_at", limit, cursor)
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch summaries: {str(e)}")
 
-# Analytics endpoint
+# Full-text search over the user's summaries (ranked, paginated, highlighted)
+@app.get("/api/search", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT),
+    cursor: Optional[str] = None,
+    rerank: bool = Query(SEARCH_RERANK, description="Re-order top hits by local embedding similarity"),
+    current_user = Depends(get_current_user)
+):
+    offset = decode_search_cursor(cursor) if cursor else 0
+    try:
+        rows, next_offset = await search_summaries(get_repository(), current_user.id, q, limit, offset, rerank)
+        
+        return SearchResponse(
+            query=q,
+            results=[
+                SearchResult(
+                    id=row["id"],
+                    document_id=row["document_id"],
+                    title=row["title"],
+                    categories=row.get("categories") or [],
+                    key_points=row.get("key_points") or [],
+                    created_at=row["created_at"],
+                    rank=round(float(row["rank"]), 6),
+                    title_highlight=row.get("title_highlight") or row["title"],
+                    summary_highlight=row.get("summary_highlight") or ""
+                )
+                for row in rows
+            ],
+            next_cursor=encode_search_cursor(next_offset) if next_offset is not None else None
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
+
+# Analytics endpoint (short in-process cache so dashboard polling doesn't hit the DB)
 @app.get("/api/analytics", response_model=AnalyticsResponse)
 async def get_analytics(current_user = Depends(get_current_user)):
     try:
-        supabase = get_supabase_client()
+        cached = analytics_cache.get(current_user.id)
+        if cached is not None:
+            return cached
         
         # Get user analytics
-        analytics_result = supabase.table("user_analytics").select("*").eq("user_id", current_user.id).execute()
-        
-        if analytics_result.data:
-            analytics = analytics_result.data[0]
-            return AnalyticsResponse(
+        analytics = await get_repository().get_analytics(current_user.id, (
+            "total_documents", "total_summaries", "total_time_saved", "documents_today", "documents_today_date", "success_rate"
+        ))
+        
+        if analytics:
+            # documents_today is only reset on the user's first change of a new day
+            is_today = analytics.get("documents_today_date") == date.today().isoformat()
+            response = AnalyticsResponse(
                 total_documents=analytics["total_documents"],
                 total_summaries=analytics["total_summaries"],
                 total_time_saved=analytics["total_time_saved"],
-                documents_today=analytics["documents_today"],
+                documents_today=analytics["documents_today"] if is_today else 0,
                 success_rate=float(analytics["success_rate"])
             )
         else:
             # Return default analytics if none exist
-            return AnalyticsResponse(
+            response = AnalyticsResponse(
                 total_documents=0,
                 total_summaries=0,
                 total_time_saved=0,
@@ -317,29 +566,148 @@ async def get_analytics(current_user = Depends(get_current_user)):
                 success_rate=100.0
             )
         
+        analytics_cache.put(current_user.id, response)
+        return response
+        
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch analytics: {str(e)}")
 
+# Extracted text (whole document or one page), read from the stored text
+@app.get("/api/documents/{document_id}/text", response_model=DocumentTextResponse)
+async def get_document_text(
+    document_id: str,
+    page: Optional[int] = Query(None, ge=1),
+    current_user = Depends(get_current_user)
+):
+    try:
+        repo = get_repository()
+        document = await repo.get_document(document_id, current_user.id, ("id", "extracted_text_path"))
+        if document is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        stored = await load_text(repo, document.get("extracted_text_path"))
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Extracted text not available; process the document first")
+        text, page_offsets = stored
+
+        if page is not None:
+            text = page_text(text, page_offsets, page)
+            if text is None:
+                raise HTTPException(status_code=404, detail="Page not found")
+        return DocumentTextResponse(document_id=document_id, page_count=len(page_offsets), page=page, text=text)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to fetch document text: {str(e)}")
+
+# Near-duplicates of a processed document among the user's documents (MinHash/LSH estimate)
+@app.get("/api/documents/{document_id}/similar", response_model=SimilarDocumentsResponse)
+async def get_similar_documents(
+    document_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    min_similarity: float = Query(NEAR_DUP_SIMILAR_THRESHOLD, ge=0.0, le=1.0),
+    current_user = Depends(get_current_user)
+):
+    try:
+        repo = get_repository()
+        document = await repo.get_document(document_id, current_user.id, ("id", "minhash"))
+        if document is None:
+            raise HTTPException(status_code=404, detail="Document not found")
+
+        # No signature until the document has been processed
+        matches = []
+        if document.get("minhash"):
+            matches = await find_similar(
+                repo, current_user.id, document["minhash"], ("id", "name", "status", "upload_date"),
+                exclude_id=document_id, threshold=min_similarity, limit=limit,
+            )
+        return SimilarDocumentsResponse(
+            document_id=document_id,
+            results=[SimilarDocument(**row, similarity=round(score, 4)) for score, row in matches]
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to find similar documents: {str(e)}")
+
+# Processing progress stream (server-sent events)
+@app.get("/api/documents/{document_id}/events")
+async def document_events(
+    document_id: str,
+    request: Request,
+    current_user = Depends(get_current_user_from_header_or_query)
+):
+    repo = get_repository()
+    
+    async def _read_document():
+        return await repo.get_document(document_id, current_user.id, ("id", "status", "progress"))
+    
+    document = await _read_document()
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+    
+    def _snapshot(doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {"document_id": document_id, "stage": doc["status"], "status": doc["status"], "progress": doc["progress"], "detail": None}
+    
+    async def _stream():
+        queue = progress_broker.subscribe(document_id)
+        try:
+            # Current state first: the last in-process event, else the DB row
+            first = progress_broker.last_event(document_id) or _snapshot(document)
+            yield sse_event(first)
+            if first["status"] in TERMINAL_STATUSES:
+                return
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENTS_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keep-alive; also catches jobs run by another worker process
+                    doc = await _read_document()
+                    if not doc:
+                        return
+                    if doc["status"] in TERMINAL_STATUSES:
+                        yield sse_event(_snapshot(doc))
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield sse_event(event, name=event.get("event", "progress"))
+                if event.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            progress_broker.unsubscribe(document_id, queue)
+    
+    return StreamingResponse(
+        _stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # Delete document
 @app.delete("/api/documents/{document_id}")
 async def delete_document(document_id: str, current_user = Depends(get_current_user)):
     try:
-        supabase = get_supabase_client()
+        repo = get_repository()
         
         # Get document to check ownership and get file path
-        doc_result = supabase.table("documents").select("*").eq("id", document_id).eq("user_id", current_user.id).execute()
+        document = await repo.get_document(document_id, current_user.id, ("id", "file_path", "extracted_text_path"))
         
-        if not doc_result.data:
+        if document is None:
             raise HTTPException(status_code=404, detail="Document not found")
         
-        document = doc_result.data[0]
-        
         # Delete file from storage using stored file_path
         if document.get("file_path"):
-            supabase.storage.from_("documents").remove([document["file_path"]])
+            await repo.remove("documents", [document["file_path"]])
         
         # Delete document record (this will cascade delete summaries)
-        supabase.table("documents").delete().eq("id", document_id).execute()
+        await repo.delete_document(document_id)
+
+        # Stored text is shared by the user's copies of the same file; drop it with the last one
+        path = document.get("extracted_text_path")
+        if path and not await repo.has_document(current_user.id, extracted_text_path=path):
+            await remove_text(repo, path)
+        list_etags.invalidate(current_user.id)
         
         return {"message": "Document deleted successfully"}
         
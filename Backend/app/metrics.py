@@ -0,0 +1,228 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Prometheus text exposition without a client library. Observations cost a lock
+# and a few additions, so instrumentation stays on in production.
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# When set, GET /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+LabelValues = Tuple[str, ...]
+# (name, type, help, [(labels, value)]) produced by a collector at scrape time
+Family = Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [count per bucket (+Inf last), sum, count]
+        self._values: Dict[LabelValues, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = [(k, list(v[0]), v[1], v[2]) for k, v in self._values.items()]
+        lines = self._header()
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+_registry: List[_Metric] = []
+_collectors: List[Callable[[], Iterable[Family]]] = []
+
+
+def register_collector(collector: Callable[[], Iterable[Family]]) -> None:
+    """Add a callable read at scrape time, for values other modules already keep (caches, LLM, jobs)."""
+    _collectors.append(collector)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            families = list(collector())
+        except Exception:
+            continue
+        for name, kind, help, samples in families:
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            lines += [f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}" for labels, value in samples]
+    return "\n".join(lines) + "\n"
+
+
+# Hot-path metrics
+# "auth" is observed per request, outside any document's processing, so it appears
+# here but not in the per-document breakdown written to processing_logs.stages
+stage_seconds = Histogram(
+    "document_stage_seconds",
+    "Time spent per processing stage (download, extract_*, near_duplicate, llm, grounding, db_write) and per request in auth",
+    ("stage",),
+)
+processing_seconds = Histogram(
+    "document_processing_seconds", "End-to-end document processing time", ("status",),
+)
+documents_in_progress = Gauge("documents_in_progress", "Documents currently being processed")
+http_requests = Counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+http_request_seconds = Histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served")
+job_wait_seconds = Histogram("job_queue_wait_seconds", "Time a job waited in the queue before a worker claimed it", ("job_class",))
+jobs_rejected = Counter("jobs_rejected_total", "Enqueues refused because the user was over quota")
+
+# Per-document stage totals; set by the pipeline, shared by the tasks it spawns
+_stages: ContextVar[Optional[Dict[str, float]]] = ContextVar("stages", default=None)
+
+
+def start_stages() -> Dict[str, float]:
+    """Begin collecting a stage breakdown (seconds per stage) for the current task and its subtasks."""
+    stages: Dict[str, float] = {}
+    _stages.set(stages)
+    return stages
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    if not METRICS_ENABLED:
+        return
+    stage_seconds.observe(seconds, stage=stage)
+    stages = _stages.get()
+    if stages is not None:
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block (sync or around an await) as one `stage` observation."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def stage_breakdown(stages: Dict[str, float]) -> Dict[str, int]:
+    """Stage totals in whole milliseconds, as stored in processing_logs.stages."""
+    return {stage: int(seconds * 1000) for stage, seconds in stages.items()}
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and their latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            http_in_flight.dec()
+            # Templates ("/api/jobs/{job_id}") keep the label set bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            http_request_seconds.observe(time.perf_counter() - started, method=scope["method"], route=route)
+            http_requests.inc(method=scope["method"], route=route, status=status)
@@ -0,0 +1,111 @@
+import hashlib
+import os
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from .repository import Repository
+
+load_dotenv()
+
+# Near-duplicate detection for revisions of the same document: word shingles ->
+# MinHash signature (stored on the document) -> LSH band keys (an indexed array
+# column), so lookups only compare against documents sharing at least one band.
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+NEAR_DUP_SHINGLE_WORDS = int(os.getenv("NEAR_DUP_SHINGLE_WORDS", "5"))
+NEAR_DUP_PERMUTATIONS = int(os.getenv("NEAR_DUP_PERMUTATIONS", "128"))
+# PERMUTATIONS / BANDS rows per band; 32 x 4 finds pairs above ~0.5 similarity almost surely
+NEAR_DUP_BANDS = int(os.getenv("NEAR_DUP_BANDS", "32"))
+# Estimated Jaccard similarity at which an existing summary is reused instead of calling the model
+NEAR_DUP_REUSE_THRESHOLD = float(os.getenv("NEAR_DUP_REUSE_THRESHOLD", "0.9"))
+# Default cut-off for the "similar documents" endpoint
+NEAR_DUP_SIMILAR_THRESHOLD = float(os.getenv("NEAR_DUP_SIMILAR_THRESHOLD", "0.5"))
+NEAR_DUP_MAX_CANDIDATES = int(os.getenv("NEAR_DUP_MAX_CANDIDATES", "100"))
+
+MINHASH_VERSION = "1"  # bump when shingling or hashing changes; part of the band keys
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_SHINGLE_BASE = np.uint64(1000003)
+_BLOCK = 4096  # shingles hashed per step, bounding memory to PERMUTATIONS x BLOCK
+
+# Fixed seed: signatures are stored and compared across processes and restarts
+_rng = np.random.RandomState(0x5EED)
+_A = _rng.randint(1, 1 << 32, size=NEAR_DUP_PERMUTATIONS, dtype=np.uint64)
+_B = _rng.randint(0, 1 << 32, size=NEAR_DUP_PERMUTATIONS, dtype=np.uint64)
+_BAND_PERSON = f"mh{MINHASH_VERSION}.{NEAR_DUP_SHINGLE_WORDS}.{NEAR_DUP_PERMUTATIONS}".encode("ascii")[:16]
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """Distinct 32-bit hashes of the lowercased word k-grams of text."""
+    words = _WORD_RE.findall(text.lower())
+    if not words:
+        return np.empty(0, dtype=np.uint64)
+    ids = np.fromiter((zlib.crc32(w.encode("utf-8")) for w in words), dtype=np.uint64, count=len(words))
+    k = min(NEAR_DUP_SHINGLE_WORDS, len(ids))
+    n = len(ids) - k + 1
+    hashes = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        hashes = hashes * _SHINGLE_BASE + ids[j:j + n]  # wraps modulo 2**64
+    return np.unique(hashes & _MAX_HASH)
+
+
+def minhash_signature(text: str) -> Optional[List[int]]:
+    """MinHash signature (NEAR_DUP_PERMUTATIONS ints), or None for text without words."""
+    shingles = _shingle_hashes(text)
+    if shingles.size == 0:
+        return None
+    signature = np.full(NEAR_DUP_PERMUTATIONS, _MAX_HASH, dtype=np.uint64)
+    for start in range(0, shingles.size, _BLOCK):
+        block = shingles[start:start + _BLOCK]
+        hashed = ((np.outer(_A, block) + _B[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+        np.minimum(signature, hashed.min(axis=1), out=signature)
+    return signature.astype(np.int64).tolist()
+
+
+def lsh_buckets(signature: Sequence[int]) -> List[str]:
+    """One key per band: band number plus a hash of the band's rows (hex only, safe in array filters)."""
+    values = np.asarray(signature, dtype=np.uint64)
+    rows = max(1, len(values) // NEAR_DUP_BANDS)
+    return [
+        f"{band:02x}" + hashlib.blake2b(
+            values[band * rows:(band + 1) * rows].tobytes(), digest_size=8, person=_BAND_PERSON
+        ).hexdigest()
+        for band in range(NEAR_DUP_BANDS)
+    ]
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures; 0.0 if they were made with different settings."""
+    if not a or len(a) != len(b):
+        return 0.0
+    return float(np.mean(np.asarray(a, dtype=np.int64) == np.asarray(b, dtype=np.int64)))
+
+
+async def find_similar(
+    repo: Repository,
+    user_id: str,
+    signature: Sequence[int],
+    columns: Sequence[str],
+    exclude_id: Optional[str] = None,
+    threshold: float = NEAR_DUP_SIMILAR_THRESHOLD,
+    limit: Optional[int] = None,
+) -> List[Tuple[float, Dict[str, Any]]]:
+    """The user's documents sharing an LSH band with `signature`, as (similarity, row), most similar first."""
+    rows = await repo.documents_in_buckets(
+        user_id, lsh_buckets(signature), tuple(dict.fromkeys((*columns, "id", "minhash"))), NEAR_DUP_MAX_CANDIDATES
+    )
+    scored = []
+    for row in rows:
+        if row["id"] == exclude_id:
+            continue
+        score = similarity(signature, row.pop("minhash", None) or ())
+        if score >= threshold:
+            scored.append((score, row))
+    scored.sort(key=lambda item: -item[0])
+    return scored[:limit] if limit is not None else scored
@@ -0,0 +1,337 @@
+import hashlib
+import time
+from datetime import datetime
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional, Tuple
+
+from .repository import Repository, get_repository
+from .extractor import extract_text_parallel, extraction_cache_key, extractor_kind
+from .cache import extraction_cache
+from .summarizer_client import choose_engine, summarize_text_stream, get_cached_summary, summary_version
+from .jobs import PermanentJobError
+from .llm_gateway import llm_user
+from .concurrency import run_io, discard_cpu_executor, get_cpu_executor
+from .listing import list_etags
+from .events import STAGES, progress_broker, stage_progress
+from .search import summary_embedding
+from .text_store import EXTRACTED_TEXT_BUCKET, load_text, save_text, text_path
+from .metrics import documents_in_progress, processing_seconds, span, stage_breakdown, start_stages
+from .near_duplicates import (
+    NEAR_DUP_ENABLED, NEAR_DUP_REUSE_THRESHOLD, find_similar, lsh_buckets, minhash_signature,
+)
+
+
+# Columns of the documents row the pipeline reads
+PIPELINE_DOCUMENT_FIELDS = ("id", "user_id", "name", "file_type", "file_path", "content_hash", "extracted_text_path")
+# Summary columns copied when a near-duplicate's summary is reused
+SUMMARY_REUSE_FIELDS = ("title", "key_points", "reading_time", "sentiment", "categories", "full_summary")
+
+
+async def _set_progress(repo: Repository, document_id: str, user_id: str, progress: int, **fields: Any) -> None:
+    with span("db_write"):
+        await repo.update_document(document_id, {"progress": progress, **fields})
+    list_etags.invalidate(user_id)
+
+
+def _title_hint(document: Dict[str, Any]) -> str:
+    return document["name"].split(".")[0]
+
+
+def _publish(document_id: str, stage: str, done: int = 1, total: int = 1, detail: Optional[str] = None) -> None:
+    start, end = STAGES[stage]
+    progress_broker.publish(document_id, stage, stage_progress(start, end, done, total), detail=detail)
+
+
+async def process_document(
+    document_id: str, user_id: str, priority: str = "normal", allow_fallback: bool = True
+) -> Dict[str, Any]:
+    """
+    Extract (or reuse stored text) and summarize one document, driving documents.status/progress.
+    Blocking Supabase calls go to the I/O thread pool and extraction to the
+    process pool, so the event loop stays free. Returns the inserted summary row.
+    Without allow_fallback, an unreachable model raises instead of producing an
+    extractive summary, so the job is retried later.
+    Time per stage is collected for the processing_logs row and /metrics.
+    """
+    repo = get_repository()
+    started = time.monotonic()
+    stages = start_stages()
+
+    document = await repo.get_document(document_id, user_id, PIPELINE_DOCUMENT_FIELDS)
+    if document is None:
+        raise PermanentJobError("Document not found")
+
+    await _set_progress(
+        repo, document_id, user_id, 0,
+        status="processing",
+        processing_started_at=datetime.now().isoformat(),
+    )
+    _publish(document_id, "download", 0)
+
+    # A known file (same content hash) skips download, extraction and the LLM
+    if document.get("content_hash"):
+        engine = choose_engine(priority=priority)
+        summary_struct = get_cached_summary(document["content_hash"], engine, _title_hint(document))
+        if summary_struct is not None:
+            _publish(document_id, "persist", 0, detail="cached summary")
+            # Only full-quality summaries are cached
+            return await _save_summary(
+                repo, document_id, user_id, summary_struct, started, stages=stages, version=summary_version(engine),
+            )
+
+    content, file_hash = await extract_document(repo, document)
+    if not content:
+        raise PermanentJobError("Unable to extract text from file")
+
+    # A near-identical revision that is already summarized lends its summary instead of a new model call
+    engine = choose_engine(len(content), priority)
+    version = summary_version(engine)
+    reused = await _near_duplicate_summary(repo, document, content, version) if NEAR_DUP_ENABLED else None
+    if reused is not None:
+        summary_struct, source_id, score = reused
+        _publish(document_id, "persist", 0, detail="near-duplicate summary")
+        return await _save_summary(
+            repo, document_id, user_id, summary_struct, started, stages=stages, version=version,
+            message=f"Summary reused from near-duplicate {source_id} (similarity {score:.2f})",
+        )
+
+    await _set_progress(repo, document_id, user_id, STAGES["summarize"][0])
+    _publish(document_id, "summarize", 0)
+
+    # Summarize content, forwarding the title and key points to event streams as the model writes them
+    summary_struct: Dict[str, Any] = {}
+    usage: Optional[Dict[str, Any]] = None
+    # Wall time; the "llm" stage sums concurrent chunk requests
+    with span("summarize"):
+        async for event in summarize_text_stream(
+            content, title_hint=_title_hint(document), doc_hash=file_hash, engine=engine,
+            allow_fallback=allow_fallback,
+        ):
+            kind = event["type"]
+            if kind == "chunk":
+                _publish(document_id, "summarize", event["done"], event["total"], f"{event['done']}/{event['total']} chunks")
+            elif kind == "summary":
+                summary_struct, usage, version = event["summary"], event.get("usage"), event.get("version")
+            else:
+                progress_broker.publish_partial(document_id, kind, {k: v for k, v in event.items() if k != "type"})
+    await _set_progress(repo, document_id, user_id, STAGES["persist"][0])
+    _publish(document_id, "persist", 0)
+    summary_struct.setdefault("word_count", len(content.split()))
+    return await _save_summary(repo, document_id, user_id, summary_struct, started, usage, stages, version=version)
+
+
+async def extract_document(repo: Repository, document: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Extraction stage: (normalized text, content hash) for a document row.
+    Uses the extraction cache or the stored text for the document's content hash
+    when available; otherwise downloads and parses the original and stores the
+    result (with page offsets) for later runs such as re-summarization.
+    """
+    document_id, user_id = document["id"], document["user_id"]
+    file_type, name = document.get("file_type"), document.get("name")
+
+    file_hash = document.get("content_hash")
+    if file_hash:
+        text_key = extraction_cache_key(file_hash, file_type, name)
+        path = text_path(user_id, file_hash, text_key)
+        content = extraction_cache.get(text_key)
+        if content and (document.get("extracted_text_path") == path or not EXTRACTED_TEXT_BUCKET):
+            _publish(document_id, "extract", 1, detail="cached text")
+            return content, file_hash
+        stored = await load_text(repo, path)
+        if stored is not None:
+            extraction_cache.put(text_key, stored[0])
+            if document.get("extracted_text_path") != path:
+                # Stored by another copy of the same file; point this row at it too
+                with span("db_write"):
+                    await repo.update_document(document_id, {"extracted_text_path": path})
+            _publish(document_id, "extract", 1, detail="stored text")
+            return stored[0], file_hash
+        # Not stored yet: extract again so the text is kept with its page offsets
+
+    # Download file bytes for processing using stored file_path
+    with span("download"):
+        file_bytes = await repo.download("documents", document["file_path"])
+    if not file_bytes:
+        raise RuntimeError("Failed to download file for processing")
+
+    # Ensure bytes type
+    if isinstance(file_bytes, str):
+        file_bytes = file_bytes.encode("utf-8", errors="ignore")
+    await _set_progress(repo, document_id, user_id, STAGES["extract"][0])
+    _publish(document_id, "extract", 0)
+
+    # Runs on the process pool; large PDFs are split across it by page range
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
+    text_key = extraction_cache_key(file_hash, file_type, name)
+    with span(f"extract_{extractor_kind(file_type, name)}"):
+        content, page_offsets = await _extract_on_pool(
+            file_bytes, file_type, name,
+            on_progress=lambda done, total: progress_broker.publish_threadsafe(
+                document_id, "extract", stage_progress(*STAGES["extract"], done, total), f"{done}/{total} pages"
+            ),
+        )
+    if content:
+        extraction_cache.put(text_key, content)
+        # Rows from before content hashing get their hash filled in as well
+        path = text_path(user_id, file_hash, text_key)
+        if await save_text(repo, path, content, page_offsets):
+            with span("db_write"):
+                await repo.update_document(document_id, {"extracted_text_path": path, "content_hash": file_hash})
+    return content, file_hash
+
+
+async def _extract_on_pool(
+    file_bytes: bytes, file_type: Optional[str], name: Optional[str], on_progress=None
+) -> Tuple[str, List[int]]:
+    """
+    extract_text_parallel on the shared process pool. A pool broken by a dying
+    worker (OOM, parser crash) is replaced for everyone and the file retried once.
+    """
+    for attempt in range(2):
+        executor = get_cpu_executor()
+        try:
+            return await run_io(extract_text_parallel, file_bytes, file_type, name, executor, on_progress=on_progress)
+        except BrokenProcessPool:
+            discard_cpu_executor(executor)
+            if attempt:
+                raise
+
+
+async def _near_duplicate_summary(
+    repo: Repository, document: Dict[str, Any], content: str, version: Optional[str]
+) -> Optional[Tuple[Dict[str, Any], str, float]]:
+    """
+    Store the document's MinHash signature and LSH keys, then look for a completed
+    document of the same user at least NEAR_DUP_REUSE_THRESHOLD similar whose
+    latest summary has summary version `version` (same engine and settings; no
+    reuse when None, as in verbatim mode).
+    Returns (summary to reuse, that document's id, similarity) or None.
+    """
+    with span("near_duplicate"):
+        signature = await run_io(minhash_signature, content)
+        if signature is None:
+            return None
+        await repo.update_document(document["id"], {"minhash": signature, "lsh_buckets": lsh_buckets(signature)})
+        if version is None:
+            return None
+        matches = await find_similar(
+            repo, document["user_id"], signature, ("status",),
+            exclude_id=document["id"], threshold=NEAR_DUP_REUSE_THRESHOLD,
+        )
+        for score, row in matches:
+            if row.get("status") != "completed":
+                continue
+            summary = await repo.latest_summary(row["id"], (*SUMMARY_REUSE_FIELDS, "summary_version"))
+            if summary and summary.pop("summary_version", None) == version:
+                summary["word_count"] = len(content.split())
+                return summary, row["id"], score
+    return None
+
+
+async def _log_processing(
+    repo: Repository,
+    document_id: str,
+    user_id: str,
+    status: str,
+    message: str,
+    started: Optional[float] = None,
+    usage: Optional[Dict[str, Any]] = None,
+    stages: Optional[Dict[str, float]] = None,
+) -> None:
+    """
+    Write a processing_logs row; terminal rows feed the analytics triggers. Best effort.
+    usage (from summarize_text_stream) adds the model token and latency accounting,
+    stages (from metrics.start_stages) the time per stage.
+    """
+    elapsed = time.monotonic() - started if started is not None else None
+    row = {
+        "document_id": document_id,
+        "user_id": user_id,
+        "status": status,
+        "message": message[:1000],
+        "processing_time_ms": int(elapsed * 1000) if elapsed is not None else None,
+        "stages": stage_breakdown(stages) if stages else None,
+    }
+    if elapsed is not None:
+        processing_seconds.observe(elapsed, status=status)
+    if usage:
+        row.update({
+            "model": usage["model"],
+            "prompt_tokens": usage["prompt_tokens"],
+            "completion_tokens": usage["completion_tokens"],
+            "llm_latency_ms": usage["latency_ms"],
+            "llm_calls": usage["calls"],
+        })
+    try:
+        await repo.insert_logs([row])
+    except Exception:
+        pass
+
+
+async def _save_summary(
+    repo: Repository,
+    document_id: str,
+    user_id: str,
+    summary_struct: Dict[str, Any],
+    started: float,
+    usage: Optional[Dict[str, Any]] = None,
+    stages: Optional[Dict[str, float]] = None,
+    message: str = "Summary created",
+    version: Optional[str] = None,
+) -> Dict[str, Any]:
+    # Insert summary record
+    summary_data = {
+        "document_id": document_id,
+        "user_id": user_id,
+        "title": summary_struct.get("title"),
+        "key_points": summary_struct.get("key_points", []),
+        "word_count": summary_struct.get("word_count", 0),
+        "reading_time": summary_struct.get("reading_time", "1 min"),
+        "sentiment": summary_struct.get("sentiment", "neutral"),
+        "categories": summary_struct.get("categories", ["Document", "Analysis"]),
+        "full_summary": summary_struct.get("full_summary", ""),
+        # summary_version() of the engine that produced it; None for degraded or verbatim summaries
+        "summary_version": version,
+    }
+    # Stored for search reranking; the full-text vector is maintained by a database trigger
+    summary_data["embedding"] = await run_io(summary_embedding, summary_data)
+    with span("db_write"):
+        summary = await repo.insert_summary(summary_data)
+    if not summary:
+        raise RuntimeError("Failed to save summary")
+
+    # Update document status to completed
+    await _set_progress(
+        repo, document_id, user_id, 100,
+        status="completed",
+        processing_completed_at=datetime.now().isoformat(),
+    )
+    await _log_processing(repo, document_id, user_id, "completed", message, started, usage, stages)
+    progress_broker.publish(document_id, "persist", 100, status="completed")
+    return summary
+
+
+async def run_process_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler for the worker pool. Only the last attempt may settle for an extractive summary."""
+    documents_in_progress.inc()
+    token = llm_user.set(job["user_id"])
+    try:
+        summary = await process_document(
+            job["document_id"], job["user_id"], job.get("priority") or "normal",
+            allow_fallback=job["attempts"] >= job["max_attempts"],
+        )
+    finally:
+        llm_user.reset(token)
+        documents_in_progress.dec()
+    return {"summary_id": summary["id"]}
+
+
+async def mark_document_failed(job: Dict[str, Any]) -> None:
+    """Called once a job has exhausted its retries."""
+    repo = get_repository()
+    await repo.update_document(job["document_id"], {"status": "failed"})
+    list_etags.invalidate(job["user_id"])
+    last = progress_broker.last_event(job["document_id"]) or {}
+    progress_broker.publish(job["document_id"], "failed", last.get("progress", 0), status="failed", detail=job.get("error"))
+    await _log_processing(repo, job["document_id"], job["user_id"], "failed", job.get("error") or "Processing failed")
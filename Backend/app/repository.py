@@ -0,0 +1,543 @@
+import asyncio
+import html
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from datetime import date, datetime
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from dotenv import load_dotenv
+
+from .concurrency import run_io
+
+load_dotenv()
+
+# "supabase" (default) or "sqlite": a self-contained stand-in (tables, file
+# storage, search and analytics) for local runs, tests and load tests.
+DATA_BACKEND = os.getenv("DATA_BACKEND", "supabase").lower()
+DATA_SQLITE_PATH = os.getenv("DATA_SQLITE_PATH", ":memory:")
+DATA_SQLITE_PUBLIC_URL = os.getenv("DATA_SQLITE_PUBLIC_URL", "http://localhost:8000/storage")
+# Deadline for one data call; storage transfers get their own
+DATA_TIMEOUT_SECONDS = float(os.getenv("DATA_TIMEOUT_SECONDS", "15"))
+DATA_STORAGE_TIMEOUT_SECONDS = float(os.getenv("DATA_STORAGE_TIMEOUT_SECONDS", "120"))
+
+# Bytes, a file path, or an open binary file (streamed by the storage client)
+Blob = Union[bytes, str, BinaryIO]
+
+
+class RepositoryTimeout(Exception):
+    """A data call did not finish within its timeout."""
+
+
+async def _with_timeout(fn: Callable, *args: Any, timeout: float = DATA_TIMEOUT_SECONDS) -> Any:
+    """Run a blocking call on the I/O pool with a deadline (the thread itself is bounded by the HTTP timeouts)."""
+    try:
+        return await asyncio.wait_for(run_io(fn, *args), timeout)
+    except asyncio.TimeoutError:
+        raise RepositoryTimeout(f"Data call timed out after {timeout:g}s")
+
+
+class Repository(ABC):
+    """
+    Data access for documents, document_summaries, processing_logs, user_analytics
+    and file storage. Rows are plain dicts and every read names its columns.
+    """
+
+    # documents
+    @abstractmethod
+    async def insert_documents(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def get_document(self, document_id: str, user_id: str, columns: Sequence[str]) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def owned_document_ids(self, user_id: str, document_ids: Sequence[str]) -> Set[str]:
+        ...
+
+    @abstractmethod
+    async def has_document(self, user_id: str, **equals: Any) -> bool:
+        ...
+
+    @abstractmethod
+    async def update_document(self, document_id: str, fields: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def update_documents(self, document_ids: Sequence[str], fields: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def delete_document(self, document_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def documents_in_buckets(
+        self, user_id: str, buckets: Sequence[str], columns: Sequence[str], limit: int
+    ) -> List[Dict[str, Any]]:
+        """Up to `limit` of a user's documents whose lsh_buckets share at least one key with `buckets`."""
+
+    @abstractmethod
+    async def list_page(
+        self,
+        table: str,
+        user_id: str,
+        columns: Sequence[str],
+        sort_key: str,
+        limit: int,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Up to `limit` of a user's rows in (sort_key desc, id desc) order, after the (sort value, id) keyset."""
+
+    # document_summaries
+    @abstractmethod
+    async def insert_summary(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def search_summaries(self, user_id: str, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def latest_summary(self, document_id: str, columns: Sequence[str]) -> Optional[Dict[str, Any]]:
+        ...
+
+    # processing_logs
+    @abstractmethod
+    async def insert_logs(self, rows: List[Dict[str, Any]]) -> None:
+        ...
+
+    # user_analytics
+    @abstractmethod
+    async def get_analytics(self, user_id: str, columns: Sequence[str]) -> Optional[Dict[str, Any]]:
+        ...
+
+    # file storage
+    @abstractmethod
+    async def upload(self, bucket: str, path: str, data: Blob, content_type: Optional[str] = None, upsert: bool = False) -> None:
+        ...
+
+    @abstractmethod
+    async def download(self, bucket: str, path: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def remove(self, bucket: str, paths: List[str]) -> None:
+        ...
+
+    @abstractmethod
+    async def public_url(self, bucket: str, path: str) -> Optional[str]:
+        ...
+
+
+def _quote(value: str) -> str:
+    # PostgREST filter values with reserved characters must be double-quoted
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+class SupabaseRepository(Repository):
+    """PostgREST tables, the search_summaries RPC and Supabase Storage, over the shared pooled client."""
+
+    def __init__(self, client_factory: Optional[Callable[[], Any]] = None):
+        if client_factory is None:
+            from .supabase_client import get_supabase_client
+            client_factory = get_supabase_client
+        self._client_factory = client_factory
+
+    @property
+    def client(self):
+        return self._client_factory()
+
+    async def _rows(self, query, timeout: float = DATA_TIMEOUT_SECONDS) -> List[Dict[str, Any]]:
+        result = await _with_timeout(query.execute, timeout=timeout)
+        return result.data or []
+
+    async def insert_documents(self, rows):
+        if not rows:
+            return []
+        return await self._rows(self.client.table("documents").insert(list(rows)))
+
+    async def get_document(self, document_id, user_id, columns):
+        rows = await self._rows(
+            self.client.table("documents").select(",".join(columns)).eq("id", document_id).eq("user_id", user_id).limit(1)
+        )
+        return rows[0] if rows else None
+
+    async def owned_document_ids(self, user_id, document_ids):
+        if not document_ids:
+            return set()
+        rows = await self._rows(
+            self.client.table("documents").select("id").in_("id", list(document_ids)).eq("user_id", user_id)
+        )
+        return {row["id"] for row in rows}
+
+    async def has_document(self, user_id, **equals):
+        query = self.client.table("documents").select("id").eq("user_id", user_id)
+        for column, value in equals.items():
+            query = query.eq(column, value)
+        return bool(await self._rows(query.limit(1)))
+
+    async def update_document(self, document_id, fields):
+        await self._rows(self.client.table("documents").update(fields).eq("id", document_id))
+
+    async def update_documents(self, document_ids, fields):
+        if document_ids:
+            await self._rows(self.client.table("documents").update(fields).in_("id", list(document_ids)))
+
+    async def delete_document(self, document_id):
+        # Summaries and logs go with it (ON DELETE CASCADE)
+        await self._rows(self.client.table("documents").delete().eq("id", document_id))
+
+    async def documents_in_buckets(self, user_id, buckets, columns, limit):
+        if not buckets:
+            return []
+        return await self._rows(
+            self.client.table("documents").select(",".join(columns)).eq("user_id", user_id)
+            .ov("lsh_buckets", list(buckets)).limit(limit)
+        )
+
+    async def list_page(self, table, user_id, columns, sort_key, limit, after=None):
+        query = self.client.table(table).select(",".join(columns)).eq("user_id", user_id)
+        if after:
+            sort_value, row_id = after
+            query = query.or_(
+                f"{sort_key}.lt.{_quote(sort_value)},"
+                f"and({sort_key}.eq.{_quote(sort_value)},id.lt.{_quote(row_id)})"
+            )
+        return await self._rows(query.order(sort_key, desc=True).order("id", desc=True).limit(limit))
+
+    async def insert_summary(self, row):
+        rows = await self._rows(self.client.table("document_summaries").insert(row))
+        return rows[0] if rows else None
+
+    async def search_summaries(self, user_id, query, limit, offset):
+        return await self._rows(
+            self.client.rpc(
+                "search_summaries",
+                {"p_user_id": user_id, "p_query": query, "p_limit": limit, "p_offset": offset},
+            )
+        )
+
+    async def latest_summary(self, document_id, columns):
+        rows = await self._rows(
+            self.client.table("document_summaries").select(",".join(columns)).eq("document_id", document_id)
+            .order("created_at", desc=True).limit(1)
+        )
+        return rows[0] if rows else None
+
+    async def insert_logs(self, rows):
+        if rows:
+            await self._rows(self.client.table("processing_logs").insert(list(rows)))
+
+    async def get_analytics(self, user_id, columns):
+        rows = await self._rows(
+            self.client.table("user_analytics").select(",".join(columns)).eq("user_id", user_id).limit(1)
+        )
+        return rows[0] if rows else None
+
+    async def upload(self, bucket, path, data, content_type=None, upsert=False):
+        options = {"upsert": "true" if upsert else "false"}
+        if content_type:
+            options["content-type"] = content_type
+        response = await _with_timeout(
+            self.client.storage.from_(bucket).upload, path, data, options, timeout=DATA_STORAGE_TIMEOUT_SECONDS
+        )
+        # Older storage clients report errors in the response instead of raising
+        if isinstance(response, dict) and response.get("error"):
+            raise RuntimeError(f"Failed to upload file to storage: {response['error']}")
+
+    async def download(self, bucket, path):
+        return await _with_timeout(self.client.storage.from_(bucket).download, path, timeout=DATA_STORAGE_TIMEOUT_SECONDS)
+
+    async def remove(self, bucket, paths):
+        if paths:
+            await _with_timeout(self.client.storage.from_(bucket).remove, list(paths))
+
+    async def public_url(self, bucket, path):
+        url = await _with_timeout(self.client.storage.from_(bucket).get_public_url, path)
+        if isinstance(url, dict):
+            return url.get("publicURL") or url.get("publicUrl")
+        return url or None
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class SQLiteRepository(Repository):
+    """
+    Stand-in backend: rows are JSON documents in one SQLite table (":memory:" by
+    default), files live in a blobs table. Mirrors the database defaults, the
+    cascade on document delete, the analytics counters and a simple version of
+    the search RPC. Not meant for production data volumes.
+    """
+
+    _DEFAULTS: Dict[str, Dict[str, Any]] = {
+        "documents": {"status": "uploading", "progress": 0},
+        "document_summaries": {"key_points": [], "word_count": 0, "reading_time": "0 min",
+                               "sentiment": "neutral", "categories": []},
+        "processing_logs": {},
+    }
+    _TIMESTAMPS: Dict[str, Tuple[str, ...]] = {
+        "documents": ("upload_date", "created_at", "updated_at"),
+        "document_summaries": ("created_at", "updated_at"),
+        "processing_logs": ("created_at",),
+    }
+
+    def __init__(self, path: str = DATA_SQLITE_PATH):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows (tbl TEXT NOT NULL, id TEXT NOT NULL, user_id TEXT, "
+            "data TEXT NOT NULL, PRIMARY KEY (tbl, id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS rows_user ON rows (tbl, user_id)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (bucket TEXT NOT NULL, path TEXT NOT NULL, data BLOB NOT NULL, "
+            "PRIMARY KEY (bucket, path))"
+        )
+
+    # Blocking helpers, run on the I/O pool
+
+    def _select(self, tbl: str, user_id: Optional[str] = None, ids: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        sql, params = "SELECT data FROM rows WHERE tbl = ?", [tbl]
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            params.append(user_id)
+        if ids is not None:
+            sql += f" AND id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        with self._lock:
+            return [json.loads(r[0]) for r in self._conn.execute(sql, params).fetchall()]
+
+    def _insert(self, tbl: str, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        now = datetime.now().isoformat()
+        out = []
+        for row in rows:
+            full = {"id": str(uuid.uuid4()), **self._DEFAULTS.get(tbl, {})}
+            full.update({column: now for column in self._TIMESTAMPS.get(tbl, ())})
+            full.update(row)
+            out.append(full)
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO rows (tbl, id, user_id, data) VALUES (?, ?, ?, ?)",
+                [(tbl, r["id"], r.get("user_id"), json.dumps(r, default=str)) for r in out],
+            )
+        return out
+
+    def _update(self, tbl: str, ids: Sequence[str], fields: Dict[str, Any]) -> None:
+        if not ids:
+            return
+        rows = self._select(tbl, ids=ids)
+        for row in rows:
+            row.update(fields)
+            if "updated_at" in self._TIMESTAMPS.get(tbl, ()):
+                row["updated_at"] = datetime.now().isoformat()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE rows SET data = ? WHERE tbl = ? AND id = ?",
+                [(json.dumps(r, default=str), tbl, r["id"]) for r in rows],
+            )
+
+    def _delete_document(self, document_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rows WHERE tbl = 'documents' AND id = ?", (document_id,))
+            self._conn.execute(
+                "DELETE FROM rows WHERE tbl IN ('document_summaries', 'processing_logs') "
+                "AND json_extract(data, '$.document_id') = ?",
+                (document_id,),
+            )
+
+    @staticmethod
+    def _project(row: Dict[str, Any], columns: Sequence[str]) -> Dict[str, Any]:
+        if "*" in columns:
+            return dict(row)
+        return {c: row.get(c) for c in columns}
+
+    def _page(self, table, user_id, columns, sort_key, limit, after):
+        rows = sorted(self._select(table, user_id), key=lambda r: (str(r.get(sort_key) or ""), r["id"]), reverse=True)
+        if after:
+            rows = [r for r in rows if (str(r.get(sort_key) or ""), r["id"]) < after]
+        return [self._project(r, columns) for r in rows[:limit]]
+
+    def _in_buckets(self, user_id: str, buckets: Sequence[str], columns: Sequence[str], limit: int) -> List[Dict[str, Any]]:
+        wanted = set(buckets)
+        rows = [r for r in self._select("documents", user_id) if wanted.intersection(r.get("lsh_buckets") or ())]
+        return [self._project(r, columns) for r in rows[:limit]]
+
+    def _latest_summary(self, document_id: str, columns: Sequence[str]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            rows = [json.loads(r[0]) for r in self._conn.execute(
+                "SELECT data FROM rows WHERE tbl = 'document_summaries' AND json_extract(data, '$.document_id') = ?",
+                (document_id,),
+            ).fetchall()]
+        if not rows:
+            return None
+        return self._project(max(rows, key=lambda r: r.get("created_at") or ""), columns)
+
+    def _search(self, user_id: str, query: str, limit: int, offset: int) -> List[Dict[str, Any]]:
+        terms = [t for t in _WORD_RE.findall(query.lower()) if t]
+        if not terms:
+            return []
+        marker = re.compile("(" + "|".join(re.escape(t) for t in terms) + ")", re.IGNORECASE)
+
+        def highlight(text: str) -> str:
+            return marker.sub(r"<mark>\1</mark>", html.escape(text))
+
+        hits = []
+        for row in self._select("document_summaries", user_id):
+            body = " ".join([row.get("full_summary") or ""] + list(row.get("key_points") or []))
+            haystack = f"{row.get('title') or ''} {' '.join(row.get('categories') or [])} {body}".lower()
+            if all(t in haystack for t in terms):
+                rank = sum(haystack.count(t) for t in terms)
+                hits.append((rank / (rank + 1.0), row, body))
+        hits.sort(key=lambda h: (-h[0], h[1].get("created_at") or ""))
+        return [
+            {
+                **{k: row.get(k) for k in ("id", "document_id", "title", "categories", "key_points", "created_at", "embedding")},
+                "rank": rank,
+                "title_highlight": highlight(row.get("title") or ""),
+                "summary_highlight": highlight(body[:300]),
+            }
+            for rank, row, body in hits[offset:offset + limit]
+        ]
+
+    def _analytics(self, user_id: str) -> Optional[Dict[str, Any]]:
+        documents = self._select("documents", user_id)
+        summaries = self._select("document_summaries", user_id)
+        logs = self._select("processing_logs", user_id)
+        if not documents and not summaries and not logs:
+            return None
+        today = date.today().isoformat()
+        words = {}
+        for s in sorted(summaries, key=lambda s: s.get("created_at") or ""):
+            words[s.get("document_id")] = s.get("word_count") or 0
+        completed = [l for l in logs if l.get("status") == "completed"]
+        failed = sum(1 for l in logs if l.get("status") == "failed")
+        saved = sum(
+            max(math.ceil(words.get(l.get("document_id"), 0) / 250.0) - (l.get("processing_time_ms") or 0) // 60000, 0)
+            for l in completed
+        )
+        return {
+            "user_id": user_id,
+            "total_documents": len(documents),
+            "total_summaries": len(summaries),
+            "total_time_saved": saved,
+            "documents_today": sum(1 for d in documents if str(d.get("upload_date", "")).startswith(today)),
+            "documents_today_date": today,
+            "completed_documents": len(completed),
+            "failed_documents": failed,
+            "success_rate": round(100.0 * len(completed) / (len(completed) + failed), 2) if completed or failed else 100.0,
+        }
+
+    def _put_blob(self, bucket: str, path: str, data: Blob, upsert: bool) -> None:
+        if isinstance(data, str):
+            with open(data, "rb") as f:
+                data = f.read()
+        elif not isinstance(data, bytes):
+            data = data.read()
+        verb = "INSERT OR REPLACE" if upsert else "INSERT"
+        with self._lock:
+            try:
+                self._conn.execute(f"{verb} INTO blobs (bucket, path, data) VALUES (?, ?, ?)", (bucket, path, data))
+            except sqlite3.IntegrityError:
+                raise RuntimeError("Failed to upload file to storage: the object already exists")
+
+    def _get_blob(self, bucket: str, path: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM blobs WHERE bucket = ? AND path = ?", (bucket, path)).fetchone()
+        return bytes(row[0]) if row else None
+
+    def _remove_blobs(self, bucket: str, paths: List[str]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM blobs WHERE bucket = ? AND path = ?", [(bucket, p) for p in paths])
+
+    # Repository interface
+
+    async def insert_documents(self, rows):
+        return await _with_timeout(self._insert, "documents", list(rows)) if rows else []
+
+    async def get_document(self, document_id, user_id, columns):
+        rows = await _with_timeout(self._select, "documents", user_id, [document_id])
+        return self._project(rows[0], columns) if rows else None
+
+    async def owned_document_ids(self, user_id, document_ids):
+        if not document_ids:
+            return set()
+        return {r["id"] for r in await _with_timeout(self._select, "documents", user_id, list(document_ids))}
+
+    async def has_document(self, user_id, **equals):
+        rows = await _with_timeout(self._select, "documents", user_id)
+        return any(all(r.get(k) == v for k, v in equals.items()) for r in rows)
+
+    async def update_document(self, document_id, fields):
+        await _with_timeout(self._update, "documents", [document_id], fields)
+
+    async def update_documents(self, document_ids, fields):
+        await _with_timeout(self._update, "documents", list(document_ids), fields)
+
+    async def delete_document(self, document_id):
+        await _with_timeout(self._delete_document, document_id)
+
+    async def documents_in_buckets(self, user_id, buckets, columns, limit):
+        return await _with_timeout(self._in_buckets, user_id, list(buckets), columns, limit) if buckets else []
+
+    async def list_page(self, table, user_id, columns, sort_key, limit, after=None):
+        return await _with_timeout(self._page, table, user_id, columns, sort_key, limit, after)
+
+    async def insert_summary(self, row):
+        return (await _with_timeout(self._insert, "document_summaries", [row]))[0]
+
+    async def search_summaries(self, user_id, query, limit, offset):
+        return await _with_timeout(self._search, user_id, query, limit, offset)
+
+    async def latest_summary(self, document_id, columns):
+        return await _with_timeout(self._latest_summary, document_id, columns)
+
+    async def insert_logs(self, rows):
+        if rows:
+            await _with_timeout(self._insert, "processing_logs", list(rows))
+
+    async def get_analytics(self, user_id, columns):
+        row = await _with_timeout(self._analytics, user_id)
+        return self._project(row, columns) if row else None
+
+    async def upload(self, bucket, path, data, content_type=None, upsert=False):
+        await _with_timeout(self._put_blob, bucket, path, data, upsert, timeout=DATA_STORAGE_TIMEOUT_SECONDS)
+
+    async def download(self, bucket, path):
+        return await _with_timeout(self._get_blob, bucket, path)
+
+    async def remove(self, bucket, paths):
+        if paths:
+            await _with_timeout(self._remove_blobs, bucket, list(paths))
+
+    async def public_url(self, bucket, path):
+        return f"{DATA_SQLITE_PUBLIC_URL.rstrip('/')}/{bucket}/{path}"
+
+
+_repository: Optional[Repository] = None
+_repository_lock = threading.Lock()
+
+
+def get_repository() -> Repository:
+    """The process-wide repository for DATA_BACKEND, created on first use."""
+    global _repository
+    if _repository is None:
+        with _repository_lock:
+            if _repository is None:
+                _repository = SQLiteRepository() if DATA_BACKEND == "sqlite" else SupabaseRepository()
+    return _repository
+
+
+def set_repository(repository: Optional[Repository]) -> None:
+    """Swap the backend (tests, benchmarks); None goes back to DATA_BACKEND on next use."""
+    global _repository
+    _repository = repository
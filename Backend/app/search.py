@@ -0,0 +1,105 @@
+import base64
+import json
+import os
+import re
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from .repository import Repository
+
+load_dotenv()
+
+SEARCH_DEFAULT_LIMIT = int(os.getenv("SEARCH_DEFAULT_LIMIT", "20"))
+SEARCH_MAX_LIMIT = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+# Reranking: the top SEARCH_RERANK_CANDIDATES full-text hits are re-ordered by a
+# blend of the full-text rank and embedding similarity to the query.
+SEARCH_RERANK = os.getenv("SEARCH_RERANK", "false").lower() == "true"
+SEARCH_RERANK_CANDIDATES = int(os.getenv("SEARCH_RERANK_CANDIDATES", "100"))
+SEARCH_RERANK_WEIGHT = float(os.getenv("SEARCH_RERANK_WEIGHT", "0.5"))
+
+# Local embeddings: hashed word and character-trigram features, so similar word
+# forms ("summarize" / "summaries") land near each other. No model download.
+EMBEDDING_DIM = 256
+EMBEDDING_MAX_CHARS = 20000
+_WORD_RE = re.compile(r"\w+")
+
+
+def embed_text(text: str) -> np.ndarray:
+    """Unit-length EMBEDDING_DIM vector of hashed word and trigram features."""
+    indices: List[int] = []
+    weights: List[float] = []
+    for word in _WORD_RE.findall(text[:EMBEDDING_MAX_CHARS].lower()):
+        h = zlib.crc32(word.encode("utf-8"))
+        indices.append(h % EMBEDDING_DIM)
+        weights.append(1.0 if h & 0x80000000 else -1.0)
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            h = zlib.crc32(padded[i:i + 3].encode("utf-8"))
+            indices.append(h % EMBEDDING_DIM)
+            weights.append(0.5 if h & 0x80000000 else -0.5)
+    vector = np.bincount(np.array(indices, dtype=np.int64), weights=weights, minlength=EMBEDDING_DIM)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _summary_text(summary: Dict[str, Any]) -> str:
+    return " ".join([
+        summary.get("title") or "",
+        " ".join(summary.get("categories") or []),
+        " ".join(summary.get("key_points") or []),
+        summary.get("full_summary") or "",
+    ])
+
+
+def summary_embedding(summary: Dict[str, Any]) -> List[float]:
+    """Embedding stored with a summary row when it is saved (document_summaries.embedding)."""
+    return [round(float(x), 5) for x in embed_text(_summary_text(summary))]
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        offset = int(json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["o"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+
+def _rerank(rows: List[Dict[str, Any]], query: str) -> List[Dict[str, Any]]:
+    query_vector = embed_text(query)
+    for row in rows:
+        embedding = row.get("embedding")
+        vector = np.asarray(embedding, dtype=float) if embedding else embed_text(_summary_text(row))
+        similarity = float(vector @ query_vector) if len(vector) == EMBEDDING_DIM else 0.0
+        # ts_rank_cd with normalization 32 is already in [0, 1)
+        row["rank"] = (1 - SEARCH_RERANK_WEIGHT) * float(row["rank"]) + SEARCH_RERANK_WEIGHT * max(similarity, 0.0)
+    return sorted(rows, key=lambda r: -r["rank"])
+
+
+async def search_summaries(
+    repo: Repository, user_id: str, query: str, limit: int, offset: int = 0, rerank: bool = SEARCH_RERANK
+) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    One page of a user's summaries matching `query` (web search syntax: quotes,
+    OR, -exclude), best first, with <mark> highlights. Returns (rows, next offset).
+    """
+    if rerank and offset < SEARCH_RERANK_CANDIDATES:
+        # Re-order the whole candidate pool, then page through it; past the pool
+        # results continue in full-text order.
+        pool = _rerank(await repo.search_summaries(user_id, query, SEARCH_RERANK_CANDIDATES, 0), query)
+        rows = pool[offset:offset + limit]
+        more = offset + limit < len(pool) or len(pool) == SEARCH_RERANK_CANDIDATES
+    else:
+        rows = await repo.search_summaries(user_id, query, limit + 1, offset)
+        more = len(rows) > limit
+        rows = rows[:limit]
+    return rows, (offset + limit if more else None)
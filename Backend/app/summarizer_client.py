@@ -1,16 +1,54 @@
 import os
+import re
 import json
-from typing import Dict, Any
+import asyncio
+import hashlib
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from .cache import chunk_cache, summary_cache
+from .concurrency import run_io
+from .grounding import GroundingIndex
+from .json_stream import IncrementalJSONParser
+from .llm_gateway import LLMRequestError, LLMUnavailableError, async_client, gateway, record_fallback
+from .metrics import span
+from .textrank import TEXTRANK_VERSION, textrank_summary
+from .tokens import CHARS_PER_TOKEN, count_message_tokens, count_tokens, exact_counts, model_limits
 
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
 VERBATIM_SUMMARY = os.getenv("VERBATIM_SUMMARY", "false").lower() == "true"
 
+# Bump whenever the prompt or the response handling changes; part of cache keys
+PROMPT_VERSION = "3"
+
+# Model routing by document size in tokens: up to SUMMARY_SMALL_MAX_TOKENS goes to
+# the cheaper/faster small model in one request, up to SUMMARY_SINGLE_CALL_MAX_TOKENS
+# to the large-context model in one request. Longer documents are split into
+# chunks of at most SUMMARY_CHUNK_TOKENS, summarized concurrently on the small
+# model (at most SUMMARY_CHUNK_CONCURRENCY at a time) and then merged.
+SUMMARY_SMALL_MODEL = os.getenv("SUMMARY_SMALL_MODEL", OPENAI_MODEL)
+SUMMARY_LARGE_MODEL = os.getenv("SUMMARY_LARGE_MODEL", OPENAI_MODEL)
+SUMMARY_SMALL_MAX_TOKENS = int(os.getenv("SUMMARY_SMALL_MAX_TOKENS", "4000"))
+SUMMARY_SINGLE_CALL_MAX_TOKENS = int(os.getenv("SUMMARY_SINGLE_CALL_MAX_TOKENS", "32000"))
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "2000"))
+SUMMARY_CHUNK_CONCURRENCY = int(os.getenv("SUMMARY_CHUNK_CONCURRENCY", "4"))
+# Completion budget grows with the input: SUMMARY_MIN_OUTPUT_TOKENS plus one token
+# per 10 input tokens, capped at SUMMARY_MAX_OUTPUT_TOKENS and the model's limits.
+SUMMARY_MIN_OUTPUT_TOKENS = int(os.getenv("SUMMARY_MIN_OUTPUT_TOKENS", "400"))
+SUMMARY_MAX_OUTPUT_TOKENS = int(os.getenv("SUMMARY_MAX_OUTPUT_TOKENS", "1500"))
+# Merged full_summary of a chunked document longer than this is condensed with TextRank
+SUMMARY_MERGED_MAX_CHARS = int(os.getenv("SUMMARY_MERGED_MAX_CHARS", "6000"))
+
+# Summary engine: "openai", "textrank" (local, no API calls) or "auto", which
+# sends low-priority documents and documents of at least SUMMARY_LOCAL_MIN_CHARS
+# to TextRank. Without an API key TextRank is always used.
+SUMMARY_ENGINE = os.getenv("SUMMARY_ENGINE", "openai").lower()
+SUMMARY_LOCAL_MIN_CHARS = int(os.getenv("SUMMARY_LOCAL_MIN_CHARS", "400000"))
+
 
 def _default_summary(title: str, content: str) -> Dict[str, Any]:
     words = len(content.split())
@@ -30,56 +68,33 @@ def _default_summary(title: str, content: str) -> Dict[str, Any]:
 
 
 def _extractive_summary(title: str, content: str) -> Dict[str, Any]:
-    """Very simple extractive summary: pick first N informative sentences.
-    This is used as a safe fallback to avoid hallucinations.
+    """Local TextRank summary: only sentences from the content, so nothing can be hallucinated.
+    This is used as a safe fallback when the model output fails grounding or the call fails.
     """
-    import re
+    return textrank_summary(content, title)
+
 
-    # Split into sentences (naive)
-    sentences = re.split(r"(?<=[.!?])\s+", content.strip())
-    # Keep non-empty sentences and cap
-    sentences = [s.strip() for s in sentences if s.strip()]
-    top = sentences[:5]
+def _verbatim_summary(title_hint: str, content: str) -> Dict[str, Any]:
     words = len(content.split())
     return {
-        "title": title or "Document Summary",
-        "key_points": [s[:200] for s in top][:6] or [content[:200]],
+        "title": title_hint or "Document Content",
+        "key_points": [],
         "word_count": words,
         "reading_time": f"{max(1, words // 250)} min",
-        "sentiment": "neutral",
-        "categories": ["Document", "Analysis"],
-        "full_summary": " ".join(top)[:1500] + ("..." if len(" ".join(top)) > 1500 else ""),
+        "sentiment": "unknown",
+        "categories": ["Document"],
+        "full_summary": content,
     }
 
 
-def summarize_text(content: str, title_hint: str = "") -> Dict[str, Any]:
-    """
-    Use OpenAI to summarize content and return a structured dict.
-    """
-    # Verbatim mode: return the original extracted text "as is" and no key points
-    if VERBATIM_SUMMARY:
-        words = len(content.split())
-        return {
-            "title": title_hint or "Document Content",
-            "key_points": [],
-            "word_count": words,
-            "reading_time": f"{max(1, words // 250)} min",
-            "sentiment": "unknown",
-            "categories": ["Document"],
-            "full_summary": content,
-        }
-
-    if not client.api_key:
-        # Fallback if no API key
-        return _default_summary(title_hint, content)
-
+def _messages(content: str, title_hint: str) -> List[Dict[str, str]]:
     system_prompt = (
         "You are an expert document summarizer. Your outputs must be strictly grounded in the provided content. "
         "NEVER invent facts, numbers, names, dates, or claims not explicitly present in the content. If unsure, use 'unknown'.\n\n"
-        "Return ONLY a compact JSON object with keys: "
-        "title (string), key_points (array of 3-6 strings), word_count (int), "
-        "reading_time (string like '3 min'), sentiment (positive|neutral|negative|unknown), "
-        "categories (array of strings), full_summary (string), citations (array of objects with fields 'point' and 'quote' where 'quote' is an exact substring from the content that supports the point)."
+        "Return ONLY a compact JSON object with keys in this order: "
+        "title (string), key_points (array of 3-6 objects with fields 'point' and 'quote' where 'quote' is an exact substring from the content that supports the point), "
+        "word_count (int), reading_time (string like '3 min'), sentiment (positive|neutral|negative|unknown), "
+        "categories (array of strings), full_summary (string)."
     )
 
     user_prompt = (
@@ -88,97 +103,567 @@ def summarize_text(content: str, title_hint: str = "") -> Dict[str, Any]:
         f"CONTENT:\n{content}"
     )
 
-    try:
-        # Truncate content if too long to avoid token limits
-        max_content_length = 8000  # Conservative limit for GPT-3.5-turbo
-        if len(content) > max_content_length:
-            content = content[:max_content_length] + "..."
-            user_prompt = (
-                f"Title hint: {title_hint}\n\n"
-                "Summarize the following document content. Focus on clarity and key insights.\n\n"
-                f"CONTENT:\n{content}"
-            )
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
 
-        resp = client.chat.completions.create(
-            model=OPENAI_MODEL,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.0,
-            max_tokens=1000,  # Limit response length
-        )
-        raw = resp.choices[0].message.content.strip()
-
-        # Extract JSON from response
-        json_text = raw
-        if "{" in raw and "}" in raw:
-            json_text = raw[raw.find("{") : raw.rfind("}") + 1]
-
-        data = json.loads(json_text)
-
-        # Validate fields and fill fallbacks
-        title = str(data.get("title") or title_hint or "Document Summary")
-        key_points_raw = data.get("key_points") or []
-        if not isinstance(key_points_raw, list):
-            key_points_raw = [str(key_points_raw)]
-        key_points_raw = [str(x).strip() for x in key_points_raw][:6]
-
-        # Citations for grounding (optional field from model)
-        citations = data.get("citations") or []
-        if not isinstance(citations, list):
-            citations = []
-
-        # Validate each key point has supporting quote within content
-        validated_points = []
-        content_lower = content.lower()
-        for kp in key_points_raw:
-            # Try to find supporting quote from citations
-            quote = None
+
+# Room kept for the title hint when sizing chunks
+TITLE_HINT_TOKENS = 64
+
+
+@lru_cache(maxsize=None)
+def _prompt_base_tokens(model: str) -> int:
+    """Prompt tokens besides the content and title hint (instructions, chat framing)."""
+    return count_message_tokens(_messages("", ""), model)
+
+
+def output_budget(input_tokens: int, model: str) -> int:
+    """Completion tokens to allow for a chunk of input_tokens content tokens."""
+    _, max_output = model_limits(model)
+    wanted = SUMMARY_MIN_OUTPUT_TOKENS + input_tokens // 10
+    return max(1, min(wanted, SUMMARY_MAX_OUTPUT_TOKENS, max_output))
+
+
+def input_budget(model: str) -> int:
+    """Most content tokens one request to `model` can carry next to the prompt and a full completion."""
+    context, max_output = model_limits(model)
+    overhead = _prompt_base_tokens(model) + TITLE_HINT_TOKENS
+    return max(1, context - overhead - min(SUMMARY_MAX_OUTPUT_TOKENS, max_output))
+
+
+def route_model(content_tokens: int) -> Tuple[str, int]:
+    """
+    Routing policy: (model, chunk size in tokens) for a document of content_tokens.
+    A chunk size of at least content_tokens means a single request.
+    """
+    if content_tokens <= min(SUMMARY_SMALL_MAX_TOKENS, input_budget(SUMMARY_SMALL_MODEL)):
+        return SUMMARY_SMALL_MODEL, content_tokens
+    if content_tokens <= min(SUMMARY_SINGLE_CALL_MAX_TOKENS, input_budget(SUMMARY_LARGE_MODEL)):
+        return SUMMARY_LARGE_MODEL, content_tokens
+    return SUMMARY_SMALL_MODEL, min(SUMMARY_CHUNK_TOKENS, input_budget(SUMMARY_SMALL_MODEL))
+
+
+def plan_chunks(content: str) -> Tuple[str, List[str]]:
+    """(model, chunks) for a document. Chunk sizes use the document's own characters-per-token ratio."""
+    content_tokens = count_tokens(content, SUMMARY_SMALL_MODEL)
+    model, chunk_tokens = route_model(content_tokens)
+    if chunk_tokens >= content_tokens:
+        return model, [content.strip()] if content.strip() else []
+    # A little headroom for chunks denser than the document average
+    chars_per_token = len(content) / max(1, content_tokens) * 0.95
+    return model, split_into_chunks(content, chunk_tokens, chars_per_token)
+
+
+def _build_request(content: str, title_hint: str, model: str) -> Dict[str, Any]:
+    """Return the chat.completions.create kwargs for one chunk of content, sized to the model."""
+    messages = _messages(content, title_hint)
+    context, _ = model_limits(model)
+    prompt_tokens = count_message_tokens(messages, model)
+    wanted = output_budget(max(0, prompt_tokens - _prompt_base_tokens(model)), model)
+    return {
+        "model": model,
+        "messages": messages,
+        "temperature": 0.0,
+        "max_tokens": max(1, min(wanted, context - prompt_tokens)),
+    }
+
+
+def _point_and_quote(item: Any) -> Tuple[str, str]:
+    """Key points come as {"point", "quote"} objects; plain strings are accepted too."""
+    if isinstance(item, dict):
+        return str(item.get("point") or "").strip(), str(item.get("quote") or "").strip()
+    return str(item).strip(), ""
+
+
+class UngroundedResponse(ValueError):
+    """Fewer than 3 of the model's key points are supported by the content."""
+
+
+def _parse_response(
+    raw: str, content: str, title_hint: str, index: Optional[GroundingIndex] = None
+) -> Dict[str, Any]:
+    """Parse the model's JSON and keep only key points grounded in the content.
+    Supporting quotes of the kept points are returned under "citations".
+    `index` may be a prebuilt GroundingIndex of the whole document.
+    Raises UngroundedResponse when fewer than 3 key points are grounded.
+    """
+    # Extract JSON from response
+    json_text = raw
+    if "{" in raw and "}" in raw:
+        json_text = raw[raw.find("{") : raw.rfind("}") + 1]
+
+    data = json.loads(json_text)
+
+    # Validate fields and fill fallbacks
+    title = str(data.get("title") or title_hint or "Document Summary")
+    key_points_raw = data.get("key_points") or []
+    if not isinstance(key_points_raw, list):
+        key_points_raw = [str(key_points_raw)]
+    key_points_raw = [_point_and_quote(x) for x in key_points_raw][:6]
+
+    # Separate citations list (older response format)
+    citations = data.get("citations") or []
+    if not isinstance(citations, list):
+        citations = []
+
+    # Validate each key point has supporting quote within content
+    validated_points = []
+    grounded_citations = []
+    index = index or GroundingIndex(content)
+    for kp, quote in key_points_raw:
+        if not quote:
             for c in citations:
-                try:
-                    if isinstance(c, dict) and str(c.get("point", "")).strip() == kp:
-                        q = str(c.get("quote", "")).strip()
-                        if q and q.lower() in content_lower:
-                            quote = q
-                            break
-                except Exception:
-                    continue
-            # If no citation provided, attempt soft validation by checking overlap
-            if not quote:
-                # Require at least 8-character overlap with content to keep the point
-                tokens = [t for t in kp.split() if len(t) > 3]
-                overlap = sum(1 for t in tokens if t.lower() in content_lower)
-                if overlap >= max(2, len(tokens) // 3):
-                    validated_points.append(kp)
-                continue
-            validated_points.append(kp)
-
-        # Ensure we have at least 3 grounded points; otherwise fall back to extractive
-        if len(validated_points) < 3:
-            return _extractive_summary(title, content)
-
-        word_count = int(data.get("word_count") or len(content.split()))
-        reading_time = str(data.get("reading_time") or f"{max(1, word_count // 250)} min")
-        sentiment = str(data.get("sentiment") or "neutral")
-        categories = data.get("categories") or ["Document", "Analysis"]
-        if not isinstance(categories, list):
-            categories = [str(categories)]
-        categories = [str(x) for x in categories][:6]
-        full_summary = str(data.get("full_summary") or "")
-        if not full_summary:
-            full_summary = raw[:1500]
-
-        return {
-            "title": title,
-            "key_points": validated_points[:6],
-            "word_count": word_count,
-            "reading_time": reading_time,
-            "sentiment": sentiment if sentiment in {"positive", "neutral", "negative", "unknown"} else "neutral",
-            "categories": categories,
-            "full_summary": full_summary,
-        }
+                if isinstance(c, dict) and str(c.get("point", "")).strip() == kp:
+                    quote = str(c.get("quote", "")).strip()
+                    break
+        keep, quote = index.ground(kp, quote)
+        if not keep:
+            continue
+        validated_points.append(kp)
+        if quote:
+            grounded_citations.append({"point": kp, "quote": quote})
+
+    # Ensure we have at least 3 grounded points; otherwise the caller falls back to extractive
+    if len(validated_points) < 3:
+        raise UngroundedResponse(f"only {len(validated_points)} grounded key points")
+
+    word_count = int(data.get("word_count") or len(content.split()))
+    reading_time = str(data.get("reading_time") or f"{max(1, word_count // 250)} min")
+    sentiment = str(data.get("sentiment") or "neutral")
+    categories = data.get("categories") or ["Document", "Analysis"]
+    if not isinstance(categories, list):
+        categories = [str(categories)]
+    categories = [str(x) for x in categories][:6]
+    full_summary = str(data.get("full_summary") or "")
+    if not full_summary:
+        full_summary = raw[:1500]
+
+    return {
+        "title": title,
+        "key_points": validated_points[:6],
+        "word_count": word_count,
+        "reading_time": reading_time,
+        "sentiment": sentiment if sentiment in {"positive", "neutral", "negative", "unknown"} else "neutral",
+        "categories": categories,
+        "full_summary": full_summary,
+        "citations": grounded_citations,
+    }
+
+
+def _split_long(text: str, max_chars: int) -> List[str]:
+    """Split an oversized paragraph on sentence boundaries, hard-cutting only single huge sentences."""
+    pieces: List[str] = []
+    current = ""
+    for sentence in re.split(r"(?<=[.!?])\s+", text):
+        while len(sentence) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            pieces.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(
+    content: str, max_tokens: int = SUMMARY_CHUNK_TOKENS, chars_per_token: float = CHARS_PER_TOKEN
+) -> List[str]:
+    """Split text on paragraph (then sentence) boundaries into chunks of at most max_tokens."""
+    max_chars = max(1, int(max_tokens * chars_per_token))
+    chunks: List[str] = []
+    current = ""
+    for para in re.split(r"\n\s*\n", content):
+        para = para.strip()
+        if not para:
+            continue
+        for piece in ([para] if len(para) <= max_chars else _split_long(para, max_chars)):
+            if current and len(current) + 2 + len(piece) > max_chars:
+                chunks.append(current)
+                current = piece
+            else:
+                current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _chunk_key(chunk: str, title_hint: str, model: str) -> str:
+    h = hashlib.sha256(f"{PROMPT_VERSION}\0{model}\0{title_hint}\0".encode("utf-8"))
+    h.update(chunk.encode("utf-8"))
+    return h.hexdigest()
+
+
+def choose_engine(chars: Optional[int] = None, priority: str = "normal") -> str:
+    """Engine for a document of `chars` characters (None when not known yet) under SUMMARY_ENGINE."""
+    if SUMMARY_ENGINE == "textrank" or async_client is None:
+        return "textrank"
+    if SUMMARY_ENGINE == "auto" and (priority == "low" or (chars is not None and chars >= SUMMARY_LOCAL_MIN_CHARS)):
+        return "textrank"
+    return "openai"
+
+
+def _engine_settings(engine: str) -> str:
+    if engine == "openai":
+        return (
+            f"{SUMMARY_SMALL_MODEL}\0{SUMMARY_LARGE_MODEL}\0{SUMMARY_SMALL_MAX_TOKENS}\0"
+            f"{SUMMARY_SINGLE_CALL_MAX_TOKENS}\0{SUMMARY_CHUNK_TOKENS}\0{SUMMARY_MERGED_MAX_CHARS}\0{PROMPT_VERSION}"
+        )
+    return f"textrank\0{TEXTRANK_VERSION}"
+
+
+def summary_cache_key(doc_hash: str, engine: str = "openai", title_hint: str = "") -> str:
+    """
+    Cache key for a whole-document summary: content hash, title hint (the summary
+    title is built from it, so users uploading the same bytes under other names
+    never see each other's) and every setting that changes the output.
+    """
+    return hashlib.sha256(
+        f"{doc_hash}\0{title_hint}\0{_engine_settings(engine)}\0{VERBATIM_SUMMARY}".encode("utf-8")
+    ).hexdigest()
+
+
+def summary_version(engine: str = "openai") -> Optional[str]:
+    """
+    Short id of the engine and settings a full-quality summary was made with,
+    stored with the summary so it is only reused under the same ones. None in
+    verbatim mode, where the "summary" is the document text itself.
+    """
+    if VERBATIM_SUMMARY:
+        return None
+    return hashlib.sha256(_engine_settings(engine).encode("utf-8")).hexdigest()[:16]
+
+
+def _partial_events(partial: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Title and key point events replayed from an already finished (cached) summary."""
+    quotes = {c["point"]: c["quote"] for c in partial.get("citations") or []}
+    events = [{"type": "title", "title": partial.get("title")}]
+    events += [{"type": "key_point", "point": kp, "quote": quotes.get(kp)} for kp in partial.get("key_points") or []]
+    return events
+
+
+async def _summarize_chunk_stream(
+    chunk: str,
+    title_hint: str,
+    model: str,
+    semaphore: asyncio.Semaphore,
+    index: GroundingIndex,
+    emit: Callable[[Dict[str, Any]], None],
+    calls: List[Dict[str, Any]],
+    allow_fallback: bool = True,
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Summarize one chunk from a streamed completion. emit() receives the title and
+    each grounded key point as soon as the model has finished writing it.
+    Token usage and latency of the request are appended to `calls`.
+    Returns (partial, ok); ok is False when the extractive fallback was used.
+    LLMUnavailableError propagates unless allow_fallback is set.
+    """
+    key = _chunk_key(chunk, title_hint, model)
+    cached = chunk_cache.get(key)
+    if cached is not None:
+        for event in _partial_events(cached):
+            emit(event)
+        return cached, True
+
+    parser = IncrementalJSONParser()
+    emitted = 0
+
+    def on_delta(delta: str) -> None:
+        nonlocal emitted
+        for kind, name, value in parser.feed(delta):
+            if kind == "member" and name == "title" and isinstance(value, str):
+                emit({"type": "title", "title": value})
+            elif kind == "item" and name == "key_points" and emitted < 6:
+                point, quote = _point_and_quote(value)
+                keep, quote = index.ground(point, quote)
+                if keep:
+                    emitted += 1
+                    emit({"type": "key_point", "point": point, "quote": quote})
+
+    def on_reset() -> None:
+        # A retry starts the completion over; points already sent are de-duplicated downstream
+        nonlocal parser, emitted
+        parser, emitted = IncrementalJSONParser(), 0
+
+    request = _build_request(chunk, title_hint, model)
+    try:
+        async with semaphore:
+            started = time.monotonic()
+            text, usage = await gateway.stream_chat(request, on_delta, on_reset)
+    except LLMUnavailableError as e:
+        if not allow_fallback:
+            raise
+        record_fallback(e.reason)
+        return _extractive_summary(title_hint, chunk), False
+    except LLMRequestError as e:
+        # Not cached, so the next attempt retries this chunk
+        record_fallback(e.reason)
+        return _extractive_summary(title_hint, chunk), False
+    calls.append(_call_record(model, request, text, usage, started))
+
+    try:
+        with span("grounding"):
+            partial = _parse_response(text.strip(), chunk, title_hint, index)
+    except UngroundedResponse:
+        # A fallback like any other: neither cached nor counted as a complete summary
+        record_fallback("ungrounded")
+        return _extractive_summary(title_hint, chunk), False
     except Exception:
-        # Safe fallback
-        return _extractive_summary(title_hint, content)
+        record_fallback("invalid_response")
+        return _extractive_summary(title_hint, chunk), False
+    chunk_cache.put(key, partial)
+    return partial, True
+
+
+def _call_record(model: str, request: Dict[str, Any], completion: str, usage: Any, started: float) -> Dict[str, Any]:
+    """Accounting for one completion request; counted locally when the API did not report usage."""
+    if usage is not None:
+        prompt_tokens, completion_tokens, estimated = usage.prompt_tokens, usage.completion_tokens, False
+    else:
+        prompt_tokens = count_message_tokens(request["messages"], model)
+        completion_tokens = count_tokens(completion, model)
+        estimated = not exact_counts(model)
+    return {
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "max_tokens": request["max_tokens"],
+        "latency_ms": int((time.monotonic() - started) * 1000),
+        "estimated": estimated,
+    }
+
+
+def usage_totals(calls: List[Dict[str, Any]], latency_ms: int) -> Optional[Dict[str, Any]]:
+    """Per-document accounting written to processing_logs; None when no request was made."""
+    if not calls:
+        return None
+    return {
+        "model": ",".join(sorted({c["model"] for c in calls})),
+        "prompt_tokens": sum(c["prompt_tokens"] for c in calls),
+        "completion_tokens": sum(c["completion_tokens"] for c in calls),
+        "latency_ms": latency_ms,
+        "calls": calls,
+    }
+
+
+def _merge_partials(partials: List[Dict[str, Any]], content: str, title_hint: str) -> Dict[str, Any]:
+    """Reduce step: merge per-chunk summaries into the single-summary dict shape."""
+    if len(partials) == 1:
+        result = dict(partials[0])
+        result.pop("citations", None)
+        return result
+
+    # Key points are spread evenly over all chunks so the whole document is
+    # represented: each round takes the next point of chunks evenly spaced among
+    # those that still have one. Points backed by a verified quote go first
+    # within each chunk; the result is in document order.
+    per_chunk: List[List[str]] = []
+    for p in partials:
+        cited = [c["point"] for c in p.get("citations") or []]
+        rest = [kp for kp in p.get("key_points") or [] if kp not in cited]
+        per_chunk.append(cited + rest)
+    picked: List[Tuple[int, int, str]] = []
+    seen = set()
+    depth = 0
+    while len(picked) < 6:
+        candidates = [i for i, pts in enumerate(per_chunk) if depth < len(pts)]
+        if not candidates:
+            break
+        slots = 6 - len(picked)
+        if len(candidates) > slots:
+            candidates = [candidates[(2 * k + 1) * len(candidates) // (2 * slots)] for k in range(slots)]
+        for i in candidates:
+            point = per_chunk[i][depth]
+            if point.lower() not in seen:
+                seen.add(point.lower())
+                picked.append((i, depth, point))
+        depth += 1
+    key_points = [point for _, _, point in sorted(picked)]
+
+    category_counts: Dict[str, int] = {}
+    for p in partials:
+        for c in p.get("categories") or []:
+            category_counts[c] = category_counts.get(c, 0) + 1
+    categories = sorted(category_counts, key=lambda c: -category_counts[c])[:6] or ["Document", "Analysis"]
+
+    sentiments = [p.get("sentiment") for p in partials if p.get("sentiment") not in (None, "unknown")]
+    sentiment = max(set(sentiments), key=sentiments.count) if sentiments else "neutral"
+
+    words = len(content.split())
+    return {
+        "title": partials[0].get("title") or title_hint or "Document Summary",
+        "key_points": key_points,
+        "word_count": words,
+        "reading_time": f"{max(1, words // 250)} min",
+        "sentiment": sentiment,
+        "categories": categories,
+        "full_summary": _condense("\n\n".join(p.get("full_summary", "") for p in partials if p.get("full_summary"))),
+    }
+
+
+def _condense(text: str, max_chars: int = SUMMARY_MERGED_MAX_CHARS) -> str:
+    """Text of at most max_chars: its highest ranked sentences in order when longer (local reduce, no API call)."""
+    if len(text) <= max_chars:
+        return text
+    sentences = len(re.split(r"(?<=[.!?])\s+", text))
+    keep = max(1, sentences * max_chars // len(text))
+    condensed = textrank_summary(text, summary_sentences=keep, max_chars=len(text))["full_summary"] or text
+    return _split_long(condensed, max_chars)[0] if len(condensed) > max_chars else condensed
+
+
+def get_cached_summary(doc_hash: str, engine: str = "openai", title_hint: str = "") -> Optional[Dict[str, Any]]:
+    """Cached summary for a document hash and title hint under the current settings, if any."""
+    cached = summary_cache.get(summary_cache_key(doc_hash, engine, title_hint))
+    return dict(cached) if cached is not None else None
+
+
+def summarize_text(
+    content: str, title_hint: str = "", doc_hash: Optional[str] = None, engine: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Use OpenAI to summarize content and return a structured dict.
+    Long content is summarized chunk by chunk and the partial results merged.
+    engine overrides choose_engine(); "textrank" summarizes locally without API calls.
+    Results are cached by doc_hash (SHA-256 of the file bytes; defaults to a hash of content).
+    Blocking: runs summarize_text_async on its own event loop, so it must not be
+    called from a running loop.
+    """
+    return asyncio.run(summarize_text_async(content, title_hint, doc_hash, engine=engine))
+
+
+async def summarize_text_stream(
+    content: str,
+    title_hint: str = "",
+    doc_hash: Optional[str] = None,
+    engine: Optional[str] = None,
+    allow_fallback: bool = True,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Streaming variant of summarize_text. Yields events as the model writes them:
+      {"type": "title", "title"}              title of the first chunk
+      {"type": "key_point", "point", "quote"} each key point that passes grounding
+      {"type": "chunk", "done", "total"}      a chunk has finished
+      {"type": "summary", "summary", "usage", "version"}
+                                              the final merged result, always last;
+                                              usage is the usage_totals of the model requests,
+                                              version the summary_version() of a full-quality
+                                              result (None for degraded or verbatim ones)
+    Key points of multi-chunk documents are provisional; the final summary keeps
+    at most 6 of them, picked across chunks.
+    With allow_fallback=False, chunks that cannot reach the model (rate limits,
+    outages) raise LLMUnavailableError instead of degrading to an extractive summary.
+    """
+    engine = engine or choose_engine(len(content))
+    cache_key = summary_cache_key(doc_hash or hashlib.sha256(content.encode("utf-8")).hexdigest(), engine, title_hint)
+    cached = summary_cache.get(cache_key)
+    if cached is not None:
+        for event in _partial_events(cached):
+            yield event
+        yield {"type": "summary", "summary": dict(cached), "usage": None, "version": summary_version(engine)}
+        return
+
+    if VERBATIM_SUMMARY:
+        yield {"type": "summary", "summary": _verbatim_summary(title_hint, content), "usage": None, "version": None}
+        return
+
+    if not content.strip():
+        yield {"type": "summary", "summary": _default_summary(title_hint, content), "usage": None, "version": None}
+        return
+
+    if engine == "textrank" or async_client is None:
+        # NumPy work, off the event loop
+        with span("textrank"):
+            result = await run_io(textrank_summary, content, title_hint)
+        summary_cache.put(cache_key, result)
+        for event in _partial_events(result):
+            yield event
+        yield {"type": "chunk", "done": 1, "total": 1}
+        yield {"type": "summary", "summary": result, "usage": None, "version": summary_version(engine)}
+        return
+
+    started = time.monotonic()
+    model, chunks = await run_io(plan_chunks, content)
+    calls: List[Dict[str, Any]] = []
+
+    semaphore = asyncio.Semaphore(max(1, SUMMARY_CHUNK_CONCURRENCY))
+    queue: asyncio.Queue = asyncio.Queue()
+    # Key points of every chunk are grounded against one index of the whole document
+    with span("grounding"):
+        grounding = await run_io(GroundingIndex, content)
+
+    async def _run(index: int, chunk: str) -> None:
+        try:
+            result = await _summarize_chunk_stream(
+                chunk, title_hint, model, semaphore, grounding,
+                lambda event: queue.put_nowait((index, event)), calls, allow_fallback,
+            )
+        except Exception as e:
+            queue.put_nowait((index, {"type": "_error", "error": e}))
+            return
+        queue.put_nowait((index, {"type": "_done", "result": result}))
+
+    tasks = [asyncio.create_task(_run(i, c)) for i, c in enumerate(chunks)]
+    results: List[Tuple[Dict[str, Any], bool]] = [None] * len(chunks)  # type: ignore
+    done = 0
+    seen = set()
+    title_sent = None
+    try:
+        while done < len(chunks):
+            index, event = await queue.get()
+            if event["type"] == "_error":
+                raise event["error"]
+            if event["type"] == "_done":
+                results[index] = event["result"]
+                done += 1
+                yield {"type": "chunk", "done": done, "total": len(chunks)}
+            elif event["type"] == "title":
+                # Retried completions write the title again
+                if index == 0 and event["title"] != title_sent:
+                    title_sent = event["title"]
+                    yield event
+            elif event["point"].lower() not in seen:
+                seen.add(event["point"].lower())
+                yield event
+    finally:
+        # Consumer went away early: stop the remaining completions
+        for task in tasks:
+            task.cancel()
+
+    result = _merge_partials([p for p, _ in results], content, title_hint)
+    complete = all(ok for _, ok in results)
+    if complete:
+        summary_cache.put(cache_key, result)
+    yield {
+        "type": "summary", "summary": result,
+        "usage": usage_totals(calls, int((time.monotonic() - started) * 1000)),
+        "version": summary_version(engine) if complete else None,
+    }
+
 
+async def summarize_text_async(
+    content: str,
+    title_hint: str = "",
+    doc_hash: Optional[str] = None,
+    on_chunk: Optional[Callable[[int, int], None]] = None,
+    engine: Optional[str] = None,
+    allow_fallback: bool = True,
+) -> Dict[str, Any]:
+    """
+    Async variant of summarize_text: the OpenAI calls do not block the event loop.
+    on_chunk(chunks_done, total_chunks) is called as each chunk finishes.
+    """
+    result: Dict[str, Any] = {}
+    async for event in summarize_text_stream(content, title_hint, doc_hash, engine, allow_fallback):
+        if event["type"] == "chunk" and on_chunk:
+            on_chunk(event["done"], event["total"])
+        elif event["type"] == "summary":
+            result = event["summary"]
+    return result
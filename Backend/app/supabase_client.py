@@ -1,5 +1,10 @@
 import os
-from supabase import create_client, Client
+import threading
+from dataclasses import fields
+from typing import Optional
+
+import httpx
+from supabase import create_client, Client, ClientOptions
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -9,19 +14,57 @@ SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_SERVICE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY")
 
-if not SUPABASE_URL or not SUPABASE_SERVICE_KEY:
-    raise ValueError("Missing Supabase configuration. Please check your .env file.")
+# Shared HTTP connection pool for PostgREST calls (HTTP/2 when the h2 package is installed)
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "32"))
+SUPABASE_MAX_KEEPALIVE = int(os.getenv("SUPABASE_MAX_KEEPALIVE", "16"))
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "15"))
+SUPABASE_CONNECT_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_CONNECT_TIMEOUT_SECONDS", "5"))
+SUPABASE_STORAGE_TIMEOUT_SECONDS = int(os.getenv("SUPABASE_STORAGE_TIMEOUT_SECONDS", "120"))
+
+try:
+    import h2  # type: ignore  # noqa: F401
+    HTTP2 = True
+except ImportError:  # pragma: no cover
+    HTTP2 = False
+
+# Clients are created on first use, so importing this module needs no configuration
+_lock = threading.Lock()
+_clients: dict = {}
+
 
-# Create Supabase client with service role key for backend operations
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_KEY)
+def _options() -> ClientOptions:
+    timeout = httpx.Timeout(SUPABASE_TIMEOUT_SECONDS, connect=SUPABASE_CONNECT_TIMEOUT_SECONDS)
+    options = {"postgrest_client_timeout": timeout, "storage_client_timeout": SUPABASE_STORAGE_TIMEOUT_SECONDS}
+    # Older supabase-py versions build their own HTTP client
+    if "httpx_client" in {f.name for f in fields(ClientOptions)}:
+        options["httpx_client"] = httpx.Client(
+            http2=HTTP2,
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=SUPABASE_MAX_CONNECTIONS, max_keepalive_connections=SUPABASE_MAX_KEEPALIVE
+            ),
+        )
+    return ClientOptions(**options)
+
+
+def _client(name: str, key: Optional[str]) -> Client:
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                if not SUPABASE_URL or not key:
+                    raise ValueError("Missing Supabase configuration. Please check your .env file.")
+                client = _clients[name] = create_client(SUPABASE_URL, key, options=_options())
+    return client
 
-# Create client with anon key for user operations
-supabase_anon: Client = create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
 
 def get_supabase_client() -> Client:
     """Get Supabase client with service role key"""
-    return supabase
+    return _client("service", SUPABASE_SERVICE_KEY)
+
 
 def get_supabase_anon_client() -> Client:
     """Get Supabase client with anonymous key"""
-    return supabase_anon
\ No newline at end of file
+    return _client("anon", SUPABASE_ANON_KEY)
@@ -0,0 +1,83 @@
+import gzip
+import json
+import os
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from .concurrency import run_io
+from .extractor import EXTRACTOR_VERSION, MAX_CHARS
+from .repository import Repository
+
+load_dotenv()
+
+# Private bucket holding normalized extracted text, so re-processing skips the
+# original download and parse. Empty disables the store.
+EXTRACTED_TEXT_BUCKET = os.getenv("EXTRACTED_TEXT_BUCKET", "extracted")
+TEXT_STORE_COMPRESSLEVEL = int(os.getenv("TEXT_STORE_COMPRESSLEVEL", "6"))
+
+
+def text_path(user_id: str, content_hash: str, text_key: str) -> str:
+    """
+    Object path of the stored text: one folder per file content, one object per
+    extractor version and extraction inputs (text_key is the extraction cache key).
+    """
+    return f"{user_id}/{content_hash}/v{EXTRACTOR_VERSION}-{text_key[:16]}.json.gz"
+
+
+def pack_text(text: str, page_offsets: List[int]) -> bytes:
+    payload = {"version": EXTRACTOR_VERSION, "max_chars": MAX_CHARS, "page_offsets": page_offsets, "text": text}
+    return gzip.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"), TEXT_STORE_COMPRESSLEVEL)
+
+
+def unpack_text(data: bytes) -> Optional[Tuple[str, List[int]]]:
+    """(text, page offsets), or None for unreadable or outdated objects."""
+    try:
+        payload = json.loads(gzip.decompress(data))
+    except Exception:
+        return None
+    if payload.get("version") != EXTRACTOR_VERSION or not payload.get("text"):
+        return None
+    return payload["text"], payload.get("page_offsets") or [0]
+
+
+def page_text(text: str, page_offsets: List[int], page: int) -> Optional[str]:
+    """Text of 1-based page `page`, or None if out of range."""
+    if page < 1 or page > len(page_offsets):
+        return None
+    end = page_offsets[page] if page < len(page_offsets) else len(text)
+    return text[page_offsets[page - 1]:end].strip()
+
+
+async def load_text(repo: Repository, path: str) -> Optional[Tuple[str, List[int]]]:
+    """Stored (text, page offsets) at `path`; None if missing, outdated or the store is disabled."""
+    if not EXTRACTED_TEXT_BUCKET or not path:
+        return None
+    try:
+        data = await repo.download(EXTRACTED_TEXT_BUCKET, path)
+    except Exception:
+        return None
+    if not data:
+        return None
+    return await run_io(unpack_text, data)
+
+
+async def save_text(repo: Repository, path: str, text: str, page_offsets: List[int]) -> bool:
+    """Best effort: a failed upload only means the next run extracts again."""
+    if not EXTRACTED_TEXT_BUCKET or not text:
+        return False
+    try:
+        data = await run_io(pack_text, text, page_offsets)
+        await repo.upload(EXTRACTED_TEXT_BUCKET, path, data, "application/gzip", upsert=True)
+        return True
+    except Exception:
+        return False
+
+
+async def remove_text(repo: Repository, path: Optional[str]) -> None:
+    if not EXTRACTED_TEXT_BUCKET or not path:
+        return
+    try:
+        await repo.remove(EXTRACTED_TEXT_BUCKET, [path])
+    except Exception:
+        pass
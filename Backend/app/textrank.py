@@ -0,0 +1,246 @@
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Bump when scoring or output changes; part of summary cache keys
+TEXTRANK_VERSION = "2"
+
+STOPWORDS = frozenset(
+    """
+    a about above after again against all also am an and any are as at be because been before being below
+    between both but by can could did do does doing down during each few for from further had has have having
+    he her here hers herself him himself his how i if in into is it its itself just me more most my myself no
+    nor not now of off on once only or other our ours ourselves out over own same she should so some such than
+    that the their theirs them themselves then there these they this those through to too under until up very
+    was we were what when where which while who whom why will with would you your yours yourself yourselves
+    may might must shall one two new use used using however within without upon per via etc
+    """.split()
+)
+
+# Text is processed as UTF-8 bytes with NumPy; no per-token Python code runs.
+# Word bytes: ASCII letters, digits, "_" and every non-ASCII byte (so UTF-8
+# letters stay inside words). Only ASCII is case-folded.
+_WORD_BYTES = np.zeros(256, dtype=bool)
+for _lo, _hi in ((48, 58), (65, 91), (97, 123), (128, 256)):
+    _WORD_BYTES[_lo:_hi] = True
+_WORD_BYTES[ord("_")] = True
+_LOWER = np.arange(256, dtype=np.uint8)
+_LOWER[65:91] += 32
+_END_PUNCT = np.zeros(256, dtype=bool)
+_END_PUNCT[[ord(c) for c in ".!?"]] = True
+_SPACE = np.zeros(256, dtype=bool)
+_SPACE[[ord(c) for c in " \t\r\n\f\v"]] = True
+
+# Terms are keyed by a 40-bit hash of their first MAX_TERM_BYTES bytes, packed
+# with a 24-bit sentence number so one sort groups tokens by (term, sentence).
+MAX_TERM_BYTES = 24
+_HASH_PRIME = np.uint64(1099511628211)
+_SENT_BITS = np.uint64(24)
+MAX_SENTENCES = 1 << 24
+
+# Longer documents are ranked on this many sentences spread evenly through the
+# text, which keeps large inputs well under a second
+MAX_GRAPH_SENTENCES = 20_000
+
+
+def _term_hash(word: str) -> int:
+    """Python version of the vectorized hash, for looking up known words (stopwords)."""
+    h = 0
+    for b in word.encode("utf-8")[:MAX_TERM_BYTES]:
+        h = (h * int(_HASH_PRIME) + b) & 0xFFFFFFFFFFFFFFFF
+    return h >> int(_SENT_BITS)
+
+
+_STOP_HASHES = np.array(sorted({_term_hash(w) for w in STOPWORDS}), dtype=np.uint64)
+
+
+def sentence_spans(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Byte spans [start, end) of sentences: split after . ! ? followed by whitespace, and at blank lines."""
+    n = len(data)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    space = _SPACE[data]
+    ends = [np.flatnonzero(_END_PUNCT[data[:-1]] & space[1:]) + 1]
+
+    newlines = np.flatnonzero(data == 10)
+    if len(newlines) > 1:
+        # Lines holding nothing but whitespace between two newlines
+        solid = np.concatenate(([0], np.cumsum(~space)))
+        blank = solid[newlines[1:]] - solid[newlines[:-1] + 1] == 0
+        ends.append(newlines[:-1][blank])
+
+    ends = np.unique(np.concatenate(ends + [np.array([n])]))
+    starts = np.concatenate(([0], ends[:-1]))
+    return starts, ends
+
+
+def token_spans(data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Byte spans of words of two or more bytes."""
+    is_word = np.concatenate(([False], _WORD_BYTES[data], [False]))
+    edges = np.flatnonzero(is_word[1:] != is_word[:-1])
+    starts, ends = edges[0::2], edges[1::2]
+    longer = ends - starts >= 2
+    return starts[longer], ends[longer]
+
+
+def term_hashes(lowered: np.ndarray, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """40-bit polynomial hash of each token. Tokens are processed longest first so every pass is a slice."""
+    lengths = np.minimum(ends - starts, MAX_TERM_BYTES).astype(np.uint8)
+    order = np.argsort(np.uint8(MAX_TERM_BYTES) - lengths, kind="stable")
+    ordered_starts = starts[order]
+    at_least = np.cumsum(np.bincount(lengths, minlength=MAX_TERM_BYTES + 1)[::-1])[::-1]
+    h = np.zeros(len(starts), dtype=np.uint64)
+    for j in range(int(lengths.max(initial=0))):
+        k = int(at_least[j + 1])
+        head = h[:k]
+        head *= _HASH_PRIME
+        head += lowered[ordered_starts[:k] + j]
+    hashes = np.empty_like(h)
+    hashes[order] = h >> _SENT_BITS
+    return hashes
+
+
+def tfidf_matrix(
+    hashes: np.ndarray, token_sentence: np.ndarray, n_sentences: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Sparse (COO) TF-IDF matrix of sentences x terms with L2-normalized rows.
+    Returns (rows, cols, values, term_hash_per_col); stopwords are left out.
+    """
+    keys = np.sort((hashes << _SENT_BITS) | token_sentence.astype(np.uint64))
+    if len(keys) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), np.zeros(0, dtype=np.uint64)
+
+    # One entry per (term, sentence) with its count
+    pair_starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    counts = np.diff(np.append(pair_starts, len(keys)))
+    pairs = keys[pair_starts]
+    rows = (pairs & np.uint64(MAX_SENTENCES - 1)).astype(np.int64)
+    pair_hash = pairs >> _SENT_BITS
+
+    keep = ~np.isin(pair_hash, _STOP_HASHES)
+    rows, pair_hash, counts = rows[keep], pair_hash[keep], counts[keep]
+    if len(rows) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0), np.zeros(0, dtype=np.uint64)
+    new_term = np.concatenate(([True], pair_hash[1:] != pair_hash[:-1]))
+    cols = np.cumsum(new_term) - 1
+    vocab = pair_hash[new_term]
+
+    df = np.bincount(cols, minlength=len(vocab))
+    idf = np.log((1 + n_sentences) / (1 + df)) + 1.0
+    values = (1.0 + np.log(counts)) * idf[cols]
+    norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=n_sentences))
+    values /= norms[rows]
+    return rows, cols, values, vocab
+
+
+def textrank_scores(
+    rows: np.ndarray,
+    cols: np.ndarray,
+    values: np.ndarray,
+    n_sentences: int,
+    n_terms: int,
+    damping: float = 0.85,
+    max_iter: int = 50,
+    tol: float = 1e-4,
+) -> np.ndarray:
+    """
+    PageRank over the cosine-similarity graph W = X·Xᵀ (self loops removed).
+    W is never materialized: W·u is computed as X·(Xᵀ·u) from the sparse
+    entries, so each iteration is linear in the number of non-zeros.
+    """
+    if n_sentences == 0:
+        return np.zeros(0)
+    has_terms = np.bincount(rows, minlength=n_sentences) > 0
+
+    def w_dot(u: np.ndarray) -> np.ndarray:
+        y = np.bincount(cols, weights=values * u[rows], minlength=n_terms)
+        # Rows are unit length, so the self-similarity to subtract is u itself
+        return np.bincount(rows, weights=values * y[cols], minlength=n_sentences) - np.where(has_terms, u, 0.0)
+
+    degree = w_dot(np.ones(n_sentences))
+    dangling = degree <= 1e-12
+    inv_degree = np.where(dangling, 0.0, 1.0 / np.where(dangling, 1.0, degree))
+
+    scores = np.full(n_sentences, 1.0 / n_sentences)
+    for _ in range(max_iter):
+        updated = (1.0 - damping) / n_sentences + damping * (
+            w_dot(scores * inv_degree) + scores[dangling].sum() / n_sentences
+        )
+        delta = np.abs(updated - scores).sum()
+        scores = updated
+        if delta < tol:
+            break
+    return scores
+
+
+def textrank_summary(
+    content: str, title_hint: str = "", max_points: int = 6, summary_sentences: int = 5, min_words: int = 3,
+    max_chars: int = 1500,
+) -> Dict[str, Any]:
+    """Extractive summary in the summarize_text result shape; no network calls."""
+    raw = content.encode("utf-8", errors="ignore")
+    data = np.frombuffer(raw, dtype=np.uint8)
+    sent_starts, sent_ends = sentence_spans(data)
+    text = data
+    if len(sent_starts) > MAX_GRAPH_SENTENCES:
+        # Copy the sampled sentences into one buffer and rank only those
+        pick = np.unique(np.linspace(0, len(sent_starts) - 1, MAX_GRAPH_SENTENCES).astype(np.int64))
+        edges = np.bincount(sent_starts[pick], minlength=len(data) + 1) - np.bincount(
+            sent_ends[pick], minlength=len(data) + 1
+        )
+        text = data[np.cumsum(edges[:-1]) > 0]
+        sent_ends = np.cumsum(sent_ends[pick] - sent_starts[pick])
+        sent_starts = np.concatenate(([0], sent_ends[:-1]))
+    n = len(sent_starts)
+    sample = text.tobytes()
+
+    tok_starts, tok_ends = token_spans(text)
+    token_sentence = np.searchsorted(sent_ends, tok_starts, side="right")
+    hashes = term_hashes(_LOWER[text], tok_starts, tok_ends)
+    rows, cols, values, vocab = tfidf_matrix(hashes, token_sentence, n)
+    scores = textrank_scores(rows, cols, values, n, len(vocab))
+
+    def sentence(i: int) -> str:
+        return " ".join(sample[sent_starts[i]:sent_ends[i]].decode("utf-8", errors="ignore").split())
+
+    # Highest ranked sentences of at least min_words words (not all stopwords), presented in document order
+    eligible = np.flatnonzero(
+        (np.bincount(token_sentence, minlength=n) >= min_words) & (np.bincount(rows, minlength=n) > 0)
+    )
+    top = eligible[np.argsort(-scores[eligible], kind="stable")[: max(max_points, summary_sentences)]]
+    key_points = [sentence(i)[:200] for i in top[:max_points]] or ([content.strip()[:200]] if content.strip() else [])
+    # Too short to rank (e.g. under min_words words): the text is its own summary
+    summary = " ".join(sentence(i) for i in sorted(top[:summary_sentences])) or " ".join(content.split())
+
+    # Categories: terms carrying the most TF-IDF weight across the document
+    categories: List[str] = []
+    if len(vocab):
+        weight = np.bincount(cols, weights=values, minlength=len(vocab))
+        candidates = vocab[np.argsort(-weight)[:20]]
+        first = {}
+        for t in np.flatnonzero(np.isin(hashes, candidates)):
+            first.setdefault(hashes[t], t)
+            if len(first) == len(candidates):
+                break
+        for h in candidates:
+            word = sample[tok_starts[first[h]]:tok_ends[first[h]]].decode("utf-8", errors="ignore").lower()
+            if not word.isdigit() and len(word) > 3:
+                categories.append(word.capitalize())
+            if len(categories) == 3:
+                break
+
+    # Word count as whitespace-separated runs, without splitting the text in Python
+    solid = ~_SPACE[data]
+    words = int(np.count_nonzero(solid[1:] & ~solid[:-1])) + int(solid[:1].sum())
+    return {
+        "title": title_hint or "Document Summary",
+        "key_points": key_points,
+        "word_count": words,
+        "reading_time": f"{max(1, words // 250)} min",
+        "sentiment": "neutral",
+        "categories": categories or ["Document", "Analysis"],
+        "full_summary": summary[:max_chars] + ("..." if len(summary) > max_chars else ""),
+    }
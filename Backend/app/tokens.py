@@ -0,0 +1,85 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+try:  # Optional: exact BPE token counts; without it counts are estimated from characters
+    import tiktoken  # type: ignore
+except ImportError:  # pragma: no cover
+    tiktoken = None
+
+load_dotenv()
+
+CHARS_PER_TOKEN = 4  # estimate for English text when tiktoken is unavailable
+
+# (context window, max output tokens) per model; the longest matching name prefix wins
+MODEL_LIMITS: Dict[str, Tuple[int, int]] = {
+    "gpt-3.5-turbo": (16385, 4096),
+    "gpt-3.5-turbo-instruct": (4096, 4096),
+    "gpt-4": (8192, 8192),
+    "gpt-4-32k": (32768, 8192),
+    "gpt-4-turbo": (128000, 4096),
+    "gpt-4-1106": (128000, 4096),
+    "gpt-4-0125": (128000, 4096),
+    "gpt-4o": (128000, 16384),
+    "gpt-4o-mini": (128000, 16384),
+    "gpt-4.1": (1047576, 32768),
+}
+# Unknown models (e.g. behind a proxy) can be described with MODEL_CONTEXT_TOKENS / MODEL_MAX_OUTPUT_TOKENS
+DEFAULT_LIMITS = (
+    int(os.getenv("MODEL_CONTEXT_TOKENS", "8192")),
+    int(os.getenv("MODEL_MAX_OUTPUT_TOKENS", "4096")),
+)
+
+# Chat format overhead: tokens per message plus the reply primer
+TOKENS_PER_MESSAGE = 4
+REPLY_PRIMER_TOKENS = 3
+
+_encoders: Dict[str, Any] = {}
+_encoders_lock = threading.Lock()
+
+
+def model_limits(model: str) -> Tuple[int, int]:
+    """(context window, max output tokens) for a model name."""
+    best = ""
+    for prefix in MODEL_LIMITS:
+        if model.startswith(prefix) and len(prefix) > len(best):
+            best = prefix
+    return MODEL_LIMITS[best] if best else DEFAULT_LIMITS
+
+
+def _encoder(model: str) -> Optional[Any]:
+    """tiktoken encoding for `model`, or None (not installed, or its data could not be loaded)."""
+    if tiktoken is None:
+        return None
+    with _encoders_lock:
+        if model not in _encoders:
+            try:
+                try:
+                    enc = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    enc = tiktoken.get_encoding("o200k_base" if model.startswith(("gpt-4o", "gpt-4.1")) else "cl100k_base")
+            except Exception:
+                enc = None
+            _encoders[model] = enc
+        return _encoders[model]
+
+
+def count_tokens(text: str, model: str) -> int:
+    enc = _encoder(model)
+    if enc is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str) -> int:
+    """Prompt tokens of a chat request, including the per-message framing."""
+    return REPLY_PRIMER_TOKENS + sum(
+        TOKENS_PER_MESSAGE + count_tokens(m.get("content") or "", model) for m in messages
+    )
+
+
+def exact_counts(model: str) -> bool:
+    """Whether count_tokens is exact for `model` (False means estimated)."""
+    return _encoder(model) is not None
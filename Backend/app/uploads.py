@@ -0,0 +1,123 @@
+import hashlib
+import os
+import uuid
+from typing import Any, BinaryIO, Dict, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+
+from .concurrency import run_io
+from .repository import Blob, Repository
+
+load_dotenv()
+
+# Upload limits. The multipart parser already spools each file (to disk past
+# 1 MB); files up to UPLOAD_SPOOL_BYTES go to storage as bytes, larger ones are
+# streamed from that spool file, so memory per request is bounded by the chunk size.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(4 * 1024 * 1024)))
+# Whole request body of a batch upload; bodies are refused before the form is parsed
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(10 * MAX_UPLOAD_BYTES)))
+# Room for multipart boundaries and part headers around a single file
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+UPLOAD_BODY_LIMITS = {
+    "/api/upload": MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD_BYTES,
+    "/api/upload/batch": MAX_BATCH_UPLOAD_BYTES,
+}
+
+
+def _too_large(limit: int, what: str = "File") -> HTTPException:
+    return HTTPException(status_code=413, detail=f"{what} exceeds the maximum upload size of {limit} bytes")
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware refusing oversized upload bodies before the multipart form is
+    parsed (and spooled): 413 straight from Content-Length, or as soon as a body
+    without one has streamed past the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = UPLOAD_BODY_LIMITS.get(scope.get("path", "")) if scope["type"] == "http" else None
+        if limit is None or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        declared = Headers(scope=scope).get("content-length")
+        if declared is not None and declared.isdigit() and int(declared) > limit:
+            response = JSONResponse({"detail": _too_large(limit, "Request body").detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def _receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Re-raised by FastAPI's form parsing as the response
+                    raise _too_large(limit, "Request body")
+            return message
+
+        await self.app(scope, _receive, send)
+
+
+def _hash_upload(f: BinaryIO, max_bytes: int) -> Tuple[int, str]:
+    """Size and SHA-256 of a spooled upload, read in chunks; 413 as soon as max_bytes is exceeded."""
+    f.seek(0)
+    hasher = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = f.read(UPLOAD_CHUNK_BYTES)
+        if not chunk:
+            break
+        size += len(chunk)
+        if size > max_bytes:
+            raise _too_large(max_bytes)
+        hasher.update(chunk)
+    return size, hasher.hexdigest()
+
+
+def _upload_payload(f: BinaryIO, size: int) -> Blob:
+    """What to hand to the storage client: bytes when small, else a reader over the spool file (streamed from disk)."""
+    f.seek(0)
+    if size <= UPLOAD_SPOOL_BYTES:
+        return f.read()
+    # A second file object on the same descriptor, so the storage client gets a plain buffered reader
+    return open(os.dup(f.fileno()), "rb")
+
+
+async def store_upload(repo: Repository, user_id: str, file: UploadFile) -> Dict[str, Any]:
+    """Hash one parsed upload, push it to the documents bucket and return the row to insert into documents."""
+    size, content_hash = await run_io(_hash_upload, file.file, MAX_UPLOAD_BYTES)
+    payload = await run_io(_upload_payload, file.file, size)
+    try:
+        # Upload file to Supabase Storage (large files are streamed from the spool file)
+        file_path = f"{user_id}/{uuid.uuid4()}_{file.filename}"
+        await repo.upload("documents", file_path, payload, file.content_type)
+
+        # Get public URL
+        file_url = await repo.public_url("documents", file_path)
+    finally:
+        if not isinstance(payload, bytes):
+            payload.close()
+
+    return {
+        "user_id": user_id,
+        "name": file.filename,
+        "size_bytes": size,
+        "file_type": file.content_type or "application/octet-stream",
+        "status": "uploading",
+        "progress": 100,
+        "file_path": file_path,
+        "file_url": file_url,
+        "content_hash": content_hash
+    }
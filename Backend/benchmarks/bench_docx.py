@@ -0,0 +1,111 @@
+"""
+Benchmark: streaming DOCX extraction (_extract_docx) versus the previous
+python-docx object-model path, on large synthetic Word files with tables.
+Each run happens in a fresh process so peak RSS can be compared.
+
+Run from Backend/:  python -m benchmarks.bench_docx [--mb 20] [--budget-kb 1000]
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import threading
+import time
+
+from .fixtures import make_docx
+
+
+def legacy_extract_docx(file_bytes: bytes) -> str:
+    """The python-docx path _extract_docx used before streaming (body paragraphs only)."""
+    from docx import Document as DocxDocument  # type: ignore
+
+    doc = DocxDocument(io.BytesIO(file_bytes))
+    return "\n".join(p.text for p in doc.paragraphs if p.text)
+
+
+def streaming_extract_docx(file_bytes: bytes, max_chars=None) -> str:
+    from app.extractor import _extract_docx
+
+    return _extract_docx(file_bytes, max_chars)
+
+
+def _rss_kb() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:  # not Linux: peak so far, which only approximates the growth
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class _PeakRSS(threading.Thread):
+    """Samples resident memory every few milliseconds while running."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.peak = _rss_kb()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(0.002):
+            self.peak = max(self.peak, _rss_kb())
+
+    def stop(self) -> int:
+        self._stop_event.set()
+        self.join()
+        return max(self.peak, _rss_kb())
+
+
+def _measure(args):
+    """In a child process: (seconds, characters, peak RSS growth in MB)."""
+    name, file_bytes, max_chars = args
+    fn = legacy_extract_docx if name == "python-docx" else streaming_extract_docx
+    fn(make_docx(2000, seed=1))  # imports and warm-up outside the measurement
+    baseline = _rss_kb()
+    sampler = _PeakRSS()
+    sampler.start()
+    started = time.perf_counter()
+    text = fn(file_bytes) if max_chars is None else fn(file_bytes, max_chars)
+    elapsed = time.perf_counter() - started
+    return elapsed, len(text), (sampler.stop() - baseline) / 1024
+
+
+def _run(ctx, name, file_bytes, max_chars=None, repeat=3):
+    best = None
+    for _ in range(repeat):
+        with ctx.Pool(1) as pool:
+            result = pool.apply(_measure, ((name, file_bytes, max_chars),))
+        if best is None or result[0] < best[0]:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=float, default=20.0, help="text size of the document in MB")
+    parser.add_argument("--table-every", type=int, default=10, help="add a table every N paragraphs (0: none)")
+    parser.add_argument("--budget-kb", type=int, default=1000, help="character budget for the early-stop run")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    file_bytes = make_docx(int(args.mb * 1024 * 1024), table_every=args.table_every)
+    print(f"document: {len(file_bytes) / 1e6:.1f} MB docx, {args.mb:g} MB of text")
+
+    ctx = multiprocessing.get_context("spawn")
+    runs = [
+        ("python-docx", "python-docx", None),
+        ("streaming", "streaming", None),
+        (f"streaming, {args.budget_kb} KB budget", "streaming", args.budget_kb * 1024),
+    ]
+    results = {}
+    for label, name, max_chars in runs:
+        results[label] = _run(ctx, name, file_bytes, max_chars, args.repeat)
+        seconds, chars, rss_mb = results[label]
+        print(f"{label:28}: {seconds * 1000:9.1f} ms  {chars / 1e6:7.2f} M chars  peak RSS +{rss_mb:7.1f} MB")
+
+    legacy, streaming = results["python-docx"][0], results["streaming"][0]
+    print(f"{'speedup (full document)':28}: {legacy / streaming:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
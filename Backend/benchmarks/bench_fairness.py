@@ -0,0 +1,142 @@
+"""
+Benchmark: latency of light users' single-document processing while a heavy
+user runs a bulk import, with fair-share scheduling on and off (FIFO claims,
+no per-user limits). Light users alone give the baseline. Each scenario runs in
+a fresh process because the scheduler settings are read at import.
+
+Run from Backend/:  python -m benchmarks.bench_fairness [--bulk 96] [--light-users 4] [--out results.json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import time
+from typing import Any, Dict, List
+
+from .bench_suite import BENCH_JWT_SECRET, FORMATS, TERMINAL_JOB_STATUSES, _configure, _log, _percentiles
+from .fixtures import FakeOpenAI, make_document, mint_token
+
+SCENARIOS = {
+    "light users alone": {"bulk": False, "fair": True},
+    "with bulk import, FIFO": {"bulk": True, "fair": False},
+    "with bulk import, fair share": {"bulk": True, "fair": True},
+}
+
+
+async def _scenario(args, bulk: bool) -> Dict[str, Any]:
+    import httpx
+    from app import main
+
+    def headers(user: str) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {mint_token(user, BENCH_JWT_SECRET)}"}
+
+    async def upload(client, user: str, seed: int) -> str:
+        data, content_type, filename = make_document(FORMATS[seed % len(FORMATS)], args.doc_kb * 1024, seed=seed)
+        response = await client.post("/api/upload", files={"file": (filename, data, content_type)}, headers=headers(user))
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def wait(client, user: str, job: Dict[str, Any]) -> None:
+        while job["status"] not in TERMINAL_JOB_STATUSES:
+            await asyncio.sleep(args.poll_ms / 1000)
+            job = (await client.get(f"/api/jobs/{job['id']}", headers=headers(user))).json()
+        if job["status"] != "completed":
+            raise RuntimeError(job.get("error") or job["status"])
+
+    light_ms: List[float] = []
+    result: Dict[str, Any] = {}
+
+    async def light_user(client, index: int) -> None:
+        user = f"light-{index}"
+        for n in range(args.light_docs):
+            document_id = await upload(client, user, 1000 * (index + 1) + n)
+            started = time.perf_counter()
+            response = await client.post("/api/process", json={"document_id": document_id}, headers=headers(user))
+            response.raise_for_status()
+            await wait(client, user, response.json())
+            light_ms.append((time.perf_counter() - started) * 1000)
+            await asyncio.sleep(args.think_ms / 1000)
+
+    async def heavy_user(client, document_ids: List[str]) -> None:
+        started = time.perf_counter()
+        response = await client.post("/api/process/batch", json={"document_ids": document_ids}, headers=headers("heavy"))
+        response.raise_for_status()
+        for item in response.json()["items"]:
+            await wait(client, "heavy", item["job"])
+        result["bulk_seconds"] = round(time.perf_counter() - started, 2)
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Warm-up: extraction pool and import caches
+            for i, fmt in enumerate(FORMATS):
+                await wait(client, "warmup", (await client.post(
+                    "/api/process", json={"document_id": await upload(client, "warmup", i)}, headers=headers("warmup")
+                )).json())
+
+            tasks = []
+            if bulk:
+                bulk_ids = [await upload(client, "heavy", 100000 + n) for n in range(args.bulk)]
+                tasks.append(heavy_user(client, bulk_ids))
+            tasks += [light_user(client, i) for i in range(args.light_users)]
+            await asyncio.gather(*tasks)
+
+    result["light_total_ms"] = _percentiles(light_ms)
+    return result
+
+
+def _run(args, name: str, results) -> None:
+    """In a child process: configure, run one scenario and put its results on the queue."""
+    scenario = SCENARIOS[name]
+    llm = FakeOpenAI(latency=args.llm_latency_ms / 1000).start()
+    _configure(llm.url)
+    if not scenario["fair"]:
+        os.environ.update({"JOB_FAIR_SHARE": "false", "JOB_USER_MAX_RUNNING": "0", "LLM_USER_MAX_CONCURRENCY": "0"})
+    try:
+        results.put(asyncio.run(_scenario(args, scenario["bulk"])))
+    except Exception as e:
+        results.put({"error": f"{e.__class__.__name__}: {e}"})
+    finally:
+        llm.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bulk", type=int, default=96, help="documents in the heavy user's batch")
+    parser.add_argument("--light-users", type=int, default=4)
+    parser.add_argument("--light-docs", type=int, default=6, help="documents per light user, one after another")
+    parser.add_argument("--think-ms", type=float, default=100, help="pause between a light user's documents")
+    parser.add_argument("--doc-kb", type=int, default=16, help="text size of each document")
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="fake OpenAI time to first byte")
+    parser.add_argument("--poll-ms", type=float, default=10, help="job status polling interval")
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    results: Dict[str, Any] = {"benchmark": "fairness", "args": vars(args), "scenarios": {}}
+    for name in SCENARIOS:
+        # A plain (non-daemon) process: the app starts its own extraction pool
+        queue = ctx.Queue()
+        process = ctx.Process(target=_run, args=(args, name, queue))
+        process.start()
+        outcome = queue.get()
+        process.join()
+        if "error" in outcome:
+            raise SystemExit(f"{name}: {outcome['error']}")
+        results["scenarios"][name] = outcome
+        light = outcome["light_total_ms"]
+        bulk = f", bulk import {outcome['bulk_seconds']} s" if "bulk_seconds" in outcome else ""
+        _log(f"{name:30}: light p50 {light.get('p50')} ms, p99 {light.get('p99')} ms{bulk}")
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        _log(f"results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Micro-benchmark: key point grounding with the previous per-point substring loop
+versus GroundingIndex, on a synthetic ~1 MB document.
+
+Run from Backend/:  python -m benchmarks.bench_grounding [--mb 1] [--points 750]
+"""
+import argparse
+import random
+import time
+
+from app.grounding import GroundingIndex
+
+
+def legacy_validate(points, content):
+    """The validation loop summarize_text used before GroundingIndex (old citations format)."""
+    content_lower = content.lower()
+    kept = []
+    for kp, citations in points:
+        quote = None
+        for c in citations:
+            if str(c.get("point", "")).strip() == kp:
+                q = str(c.get("quote", "")).strip()
+                if q and q.lower() in content_lower:
+                    quote = q
+                    break
+        if not quote:
+            tokens = [t for t in kp.split() if len(t) > 3]
+            overlap = sum(1 for t in tokens if t.lower() in content_lower)
+            if overlap >= max(2, len(tokens) // 3):
+                kept.append(kp)
+            continue
+        kept.append(kp)
+    return kept
+
+
+def indexed_validate(points, content):
+    index = GroundingIndex(content)
+    kept = []
+    for kp, citations in points:
+        quote = next((c["quote"] for c in citations if c["point"] == kp), "")
+        keep, _ = index.ground(kp, quote)
+        if keep:
+            kept.append(kp)
+    return kept
+
+
+def _word(rng, syllables):
+    return "".join(rng.choice(syllables) for _ in range(rng.randint(1, 4)))
+
+
+def make_inputs(size_bytes, n_points, seed=7):
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ren", "tas", "vel", "qua", "dor", "sin", "ept", "ul", "bro"]
+    vocab = [_word(rng, syllables) for _ in range(20000)]
+    sentences, size = [], 0
+    while size < size_bytes:
+        sentence = " ".join(rng.choice(vocab) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    content = " ".join(sentences)
+
+    made_up = [_word(rng, ["zy", "xo", "fy", "gw", "jh"]) for _ in range(500)]
+    points = []
+    for i in range(n_points):
+        kind = i % 3
+        if kind == 0:  # quoted point, quote taken from the document
+            start = rng.randrange(0, len(content) - 200)
+            quote = content[start:start + rng.randint(30, 120)]
+            point = " ".join(quote.split()[1:8])
+        elif kind == 1:  # paraphrase without quote, words from the document
+            point = " ".join(rng.choice(vocab) for _ in range(8))
+            quote = ""
+        else:  # hallucinated point with a made-up quote
+            point = " ".join(rng.choice(made_up) for _ in range(8))
+            quote = " ".join(rng.choice(made_up) for _ in range(10))
+        points.append((point, [{"point": point, "quote": quote}] if quote else []))
+    return content, points
+
+
+def _time(fn, *args, repeat=3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mb", type=float, default=1.0, help="document size in MB")
+    parser.add_argument("--points", type=int, default=750, help="key points to validate (e.g. 125 chunks x 6)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    content, points = make_inputs(int(args.mb * 1024 * 1024), args.points)
+    print(f"document: {len(content) / 1e6:.2f} MB, key points: {len(points)}")
+
+    legacy_s, legacy_kept = _time(legacy_validate, points, content, repeat=args.repeat)
+    indexed_s, indexed_kept = _time(indexed_validate, points, content, repeat=args.repeat)
+    build_s, _ = _time(GroundingIndex, content, repeat=args.repeat)
+    assert legacy_kept == indexed_kept, "indexed validation disagrees with the legacy loop"
+
+    print(f"legacy loop     : {legacy_s * 1000:9.1f} ms")
+    print(f"grounding index : {indexed_s * 1000:9.1f} ms  (of which index build {build_s * 1000:.1f} ms)")
+    print(f"speedup         : {legacy_s / indexed_s:9.1f}x  ({len(indexed_kept)} of {len(points)} points kept)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark: encoding cost and bytes on the wire for the summary list endpoint.
+
+The first part times page encodings directly:
+- the original path: a SummaryResponse per row, then FastAPI's encoder;
+- the stdlib json.dumps pass-through used before this change;
+- orjson, with and without gzip/brotli;
+- NDJSON, timing the first chunk against the whole stream.
+
+The second part measures server CPU per GET /api/summaries request, and the
+raw response bytes, per Accept-Encoding. Rows come from memory, so the data
+backend does not dominate the numbers.
+
+Run from Backend/:  python -m benchmarks.bench_serialization [--rows 50,500] [--requests 200]
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from .bench_suite import BENCH_JWT_SECRET, _configure, _log
+from .fixtures import make_sentences, mint_token
+
+
+def make_summaries(n: int, user_id: str = "bench-user", seed: int = 3) -> List[Dict[str, Any]]:
+    """Summary rows shaped like document_summaries, newest first."""
+    rng = random.Random(seed)
+    sentences = make_sentences(400_000, seed=seed)
+    started = datetime(2024, 1, 1)
+    rows = []
+    for i in range(n):
+        pick = [sentences[rng.randrange(len(sentences))] for _ in range(16)]
+        rows.append({
+            "id": f"{i:08x}-0000-4000-8000-{rng.getrandbits(48):012x}",
+            "created_at": (started + timedelta(minutes=n - i)).isoformat(),
+            "document_id": f"{i:08x}-1111-4000-8000-{rng.getrandbits(48):012x}",
+            "title": pick[0][:60],
+            "key_points": pick[1:6],
+            "word_count": rng.randint(300, 20000),
+            "reading_time": f"{rng.randint(1, 60)} min",
+            "sentiment": rng.choice(["positive", "neutral", "negative"]),
+            "categories": rng.sample(["Finance", "Legal", "Research", "Report", "Policy", "Technical"], 2),
+            "full_summary": " ".join(pick[6:16]),
+            "user_id": user_id,
+        })
+    return rows
+
+
+def _cpu_ms(fn, repeat: int) -> float:
+    """Best-of-3 process CPU time per call, in milliseconds."""
+    best = float("inf")
+    for _ in range(3):
+        started = time.process_time()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.process_time() - started) / repeat)
+    return round(best * 1000, 3)
+
+
+def bench_encode(args) -> Dict[str, Any]:
+    import gzip
+
+    from fastapi.encoders import jsonable_encoder
+
+    from app import responses
+    from app.main import SummaryResponse
+
+    results: Dict[str, Any] = {}
+    for n in args.rows:
+        rows = [{k: v for k, v in r.items() if k != "user_id"} for r in make_summaries(n)]
+        repeat = max(5, 2000 // n)
+        stdlib = json.dumps(rows, separators=(",", ":"), default=str).encode("utf-8")
+        fast = responses.dumps(rows)
+        gzipped = gzip.compress(fast, responses.GZIP_LEVEL, mtime=0)
+        page: Dict[str, Any] = {
+            "identity_bytes": len(fast),
+            "gzip_bytes": len(gzipped),
+            "pydantic_models_ms": _cpu_ms(
+                lambda: json.dumps(jsonable_encoder([SummaryResponse(**r) for r in rows])).encode("utf-8"), repeat
+            ),
+            "stdlib_json_ms": _cpu_ms(
+                lambda: json.dumps(rows, separators=(",", ":"), default=str).encode("utf-8"), repeat
+            ),
+            "fast_json_ms": _cpu_ms(lambda: responses.dumps(rows), repeat),
+            "fast_json_gzip_ms": _cpu_ms(lambda: responses._compress(responses.dumps(rows), "gzip"), repeat),
+            "ndjson_first_chunk_ms": _cpu_ms(lambda: next(responses._ndjson_chunks(rows, None)), repeat),
+            "ndjson_all_ms": _cpu_ms(lambda: list(responses._ndjson_chunks(rows, None)), repeat),
+            "ndjson_gzip_bytes": sum(len(c) for c in responses._ndjson_chunks(rows, "gzip")),
+        }
+        assert json.loads(stdlib) == json.loads(fast)
+        if responses.brotli is not None:
+            page["br_bytes"] = len(responses._compress(fast, "br"))
+            page["fast_json_br_ms"] = _cpu_ms(lambda: responses._compress(responses.dumps(rows), "br"), repeat)
+        results[f"{n}_rows"] = page
+        _log(
+            f"encode {n:4} rows: pydantic {page['pydantic_models_ms']} ms, stdlib {page['stdlib_json_ms']} ms, "
+            f"fast {page['fast_json_ms']} ms (+gzip {page['fast_json_gzip_ms']} ms); "
+            f"{page['identity_bytes']} -> {page['gzip_bytes']} bytes gzip"
+        )
+    return results
+
+
+async def _bench_http(args) -> Dict[str, Any]:
+    import httpx
+
+    from app import main, responses
+    from app.repository import SQLiteRepository, set_repository
+
+    user_id = "bench-user"
+    stored = make_summaries(max(args.rows))
+
+    class _MemoryRows(SQLiteRepository):
+        async def list_page(self, table, user_id, columns, sort_key, limit, after=None):
+            return [{c: row.get(c) for c in columns} for row in stored[:limit]]
+
+    set_repository(_MemoryRows())
+    token = mint_token(user_id, BENCH_JWT_SECRET)
+    variants = {
+        "before (stdlib json, identity)": ({"Accept-Encoding": "identity"}, False),
+        "identity": ({"Accept-Encoding": "identity"}, True),
+        "gzip": ({"Accept-Encoding": "gzip"}, True),
+        "br": ({"Accept-Encoding": "br, gzip"}, True),
+        "ndjson + gzip": ({"Accept-Encoding": "gzip", "Accept": "application/x-ndjson"}, True),
+    }
+    if responses.brotli is None:
+        del variants["br"]
+    orjson = responses.orjson
+
+    results: Dict[str, Any] = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        for n in args.rows:
+            for name, (headers, fast) in variants.items():
+                # The pre-change encoder, for the baseline only
+                responses.orjson = orjson if fast else None
+                headers = {**headers, "Authorization": f"Bearer {token}"}
+                url = f"/api/summaries?limit={n}"
+
+                async def fetch() -> int:
+                    async with client.stream("GET", url, headers=headers) as response:
+                        response.raise_for_status()
+                        return sum([len(chunk) async for chunk in response.aiter_raw()])
+
+                wire = await fetch()
+                started = time.process_time()
+                for _ in range(args.requests):
+                    await fetch()
+                cpu_ms = (time.process_time() - started) / args.requests * 1000
+                results.setdefault(f"{n}_rows", {})[name] = {"cpu_ms_per_request": round(cpu_ms, 3), "bytes": wire}
+                _log(f"http {n:4} rows, {name:32}: {cpu_ms:7.3f} ms CPU/request, {wire:8} bytes")
+    responses.orjson = orjson
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=lambda s: [int(x) for x in s.split(",")], default=[50, 500])
+    parser.add_argument("--requests", type=int, default=200, help="requests per variant in the HTTP part")
+    args = parser.parse_args()
+
+    # No model calls are made; the URL only has to be well-formed
+    _configure("http://127.0.0.1:9/v1")
+    results = {"benchmark": "serialization", "args": vars(args)}
+    results["encode"] = bench_encode(args)
+    results["http"] = asyncio.run(_bench_http(args))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Backend benchmark suite: extraction throughput per format, summary
+post-processing cost, and end-to-end /api/upload -> /api/process latency under
+concurrent users. The app runs in-process on the SQLite data backend against a
+local fake OpenAI server, so runs are reproducible and need no credentials.
+
+Run from Backend/:  python -m benchmarks.bench_suite [--only extract,summarize,e2e] [--users 8] [--out results.json]
+
+Progress goes to stderr; the JSON results go to --out (or stdout), so runs on
+different commits can be diffed or compared by a script.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from .fixtures import FakeOpenAI, fake_summary, make_document, make_sentences, mint_token
+
+BENCH_JWT_SECRET = "bench-secret"
+SECTIONS = ("extract", "summarize", "e2e")
+FORMATS = ("pdf", "docx", "txt")
+TERMINAL_JOB_STATUSES = {"completed", "failed"}
+
+
+def _log(message: str) -> None:
+    print(message, file=sys.stderr, flush=True)
+
+
+def _configure(llm_url: str) -> None:
+    """Point the app at its local stand-ins; must run before any app module is imported."""
+    os.environ.update({
+        "DATA_BACKEND": "sqlite",
+        "DATA_SQLITE_PATH": ":memory:",
+        "JOB_QUEUE_DB": ":memory:",
+        "CACHE_DB": "",
+        "SUPABASE_JWT_SECRET": BENCH_JWT_SECRET,
+        "OPENAI_API_KEY": "sk-bench",
+        "OPENAI_BASE_URL": llm_url,
+        "SUMMARY_ENGINE": "openai",
+    })
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    """Nearest-rank percentiles in milliseconds."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, int(q * len(ordered) + 0.5) - 1))], 1)
+
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered), 1),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 1),
+    }
+
+
+def _best_ms(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def bench_extract(args) -> Dict[str, Any]:
+    from app.extractor import extract_text
+
+    results = {}
+    for fmt in FORMATS:
+        data, content_type, filename = make_document(fmt, args.extract_kb * 1024)
+        text = extract_text(data, content_type, filename)
+        ms = _best_ms(extract_text, data, content_type, filename, repeat=args.repeat)
+        results[fmt] = {
+            "input_bytes": len(data),
+            "output_chars": len(text),
+            "best_ms": round(ms, 2),
+            "input_mb_per_s": round(len(data) / 1e6 / (ms / 1000), 2),
+            "output_mchars_per_s": round(len(text) / 1e6 / (ms / 1000), 2),
+        }
+        _log(f"extract {fmt:5}: {len(data) / 1e6:7.2f} MB in {ms:9.1f} ms  ({results[fmt]['input_mb_per_s']} MB/s)")
+    return results
+
+
+def bench_summarize(args, llm: FakeOpenAI) -> Dict[str, Any]:
+    from app.summarizer_client import _merge_partials, _parse_response, summarize_text_async
+
+    results: Dict[str, Any] = {"parse_response": {}, "merge_partials": {}, "summarize_text": {}}
+    for kb in args.summary_kb:
+        content = " ".join(make_sentences(kb * 1024, seed=kb))
+        raw = json.dumps(fake_summary(content, "Bench"))
+        ms = _best_ms(_parse_response, raw, content, "Bench", repeat=args.repeat)
+        results["parse_response"][f"{kb}kb"] = round(ms, 3)
+        _log(f"parse_response  {kb:5} KB: {ms:9.3f} ms")
+
+    partials = [_parse_response(json.dumps(fake_summary(c, "Bench")), c, "Bench") for c in (
+        " ".join(make_sentences(4096, seed=i)) for i in range(16)
+    )]
+    content = "\n\n".join(p["full_summary"] for p in partials)
+    ms = _best_ms(_merge_partials, partials, content, "Bench", repeat=args.repeat)
+    results["merge_partials"]["16_chunks"] = round(ms, 3)
+    _log(f"merge_partials 16 chunks: {ms:9.3f} ms")
+
+    # Full client path against the fake server; fresh content per run so caches never hit
+    async def run(kb: int) -> Dict[str, Any]:
+        timings = []
+        requests_before = llm.requests
+        for i in range(args.repeat):
+            text = " ".join(make_sentences(kb * 1024, seed=1000 * kb + i))
+            started = time.perf_counter()
+            await summarize_text_async(text, "Bench")
+            timings.append((time.perf_counter() - started) * 1000)
+        return {
+            "best_ms": round(min(timings), 2),
+            "llm_requests_per_call": (llm.requests - requests_before) / args.repeat,
+        }
+
+    for kb in args.summary_kb:
+        results["summarize_text"][f"{kb}kb"] = asyncio.run(run(kb))
+        _log(f"summarize_text  {kb:5} KB: {results['summarize_text'][f'{kb}kb']}")
+    return results
+
+
+async def _e2e(args, llm: FakeOpenAI) -> Dict[str, Any]:
+    import httpx
+    from app import jobs, main
+
+    documents = {
+        (user, n): make_document(FORMATS[(user + n) % len(FORMATS)], args.doc_kb * 1024, seed=10000 + user * 1000 + n)
+        for user in range(args.users) for n in range(args.docs)
+    }
+    samples: List[Dict[str, Any]] = []
+    failures: List[str] = []
+
+    async def process_one(client, headers, document) -> Dict[str, float]:
+        data, content_type, filename = document
+        started = time.perf_counter()
+        response = await client.post("/api/upload", files={"file": (filename, data, content_type)}, headers=headers)
+        response.raise_for_status()
+        uploaded = time.perf_counter()
+        response = await client.post("/api/process", json={"document_id": response.json()["id"]}, headers=headers)
+        response.raise_for_status()
+        job = response.json()
+        queued = time.perf_counter()
+        while job["status"] not in TERMINAL_JOB_STATUSES:
+            await asyncio.sleep(args.poll_ms / 1000)
+            job = (await client.get(f"/api/jobs/{job['id']}", headers=headers)).json()
+        finished = time.perf_counter()
+        if job["status"] != "completed":
+            raise RuntimeError(job.get("error") or job["status"])
+        return {
+            "upload_ms": (uploaded - started) * 1000,
+            "enqueue_ms": (queued - uploaded) * 1000,
+            "processing_ms": (finished - queued) * 1000,
+            "total_ms": (finished - started) * 1000,
+        }
+
+    async def user(client, index: int) -> None:
+        headers = {"Authorization": f"Bearer {mint_token(f'bench-user-{index}', BENCH_JWT_SECRET)}"}
+        for n in range(args.docs):
+            try:
+                samples.append(await process_one(client, headers, documents[(index, n)]))
+            except Exception as e:
+                failures.append(str(e))
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Warm-up: starts the extraction process pool and fills import caches
+            warmup_headers = {"Authorization": f"Bearer {mint_token('bench-warmup', BENCH_JWT_SECRET)}"}
+            for i, fmt in enumerate(FORMATS):
+                await process_one(client, warmup_headers, make_document(fmt, args.doc_kb * 1024, seed=i))
+
+            requests_before = llm.requests
+            started = time.perf_counter()
+            await asyncio.gather(*(user(client, i) for i in range(args.users)))
+            elapsed = time.perf_counter() - started
+
+    return {
+        "users": args.users,
+        "documents_per_user": args.docs,
+        "document_kb": args.doc_kb,
+        "llm_latency_ms": args.llm_latency_ms,
+        "job_workers": jobs.JOB_WORKERS,
+        "completed": len(samples),
+        "failed": len(failures),
+        "errors": sorted(set(failures))[:10],
+        "elapsed_s": round(elapsed, 3),
+        "documents_per_s": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "llm_requests": llm.requests - requests_before,
+        "latency_ms": {key: _percentiles([s[key] for s in samples]) for key in (
+            "upload_ms", "enqueue_ms", "processing_ms", "total_ms"
+        )},
+    }
+
+
+def bench_e2e(args, llm: FakeOpenAI) -> Dict[str, Any]:
+    results = asyncio.run(_e2e(args, llm))
+    total = results["latency_ms"]["total_ms"]
+    _log(
+        f"e2e {args.users} users x {args.docs} docs: {results['completed']} ok, {results['failed']} failed, "
+        f"{results['documents_per_s']} docs/s, total p50 {total.get('p50')} ms, p99 {total.get('p99')} ms"
+    )
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", default=",".join(SECTIONS), help=f"comma-separated sections ({', '.join(SECTIONS)})")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--extract-kb", type=int, default=1024, help="text size of each extraction input")
+    parser.add_argument("--summary-kb", type=lambda s: [int(x) for x in s.split(",")], default=[4, 64, 512])
+    parser.add_argument("--users", type=int, default=8, help="concurrent users in the end-to-end run")
+    parser.add_argument("--docs", type=int, default=4, help="documents per user, uploaded one after another")
+    parser.add_argument("--doc-kb", type=int, default=32, help="text size of each end-to-end document")
+    parser.add_argument("--llm-latency-ms", type=float, default=50, help="fake OpenAI time to first byte")
+    parser.add_argument("--poll-ms", type=float, default=10, help="job status polling interval")
+    parser.add_argument("--out", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+    sections = [s.strip() for s in args.only.split(",") if s.strip()]
+    unknown = set(sections) - set(SECTIONS)
+    if unknown:
+        parser.error(f"unknown sections: {', '.join(sorted(unknown))}")
+
+    llm = FakeOpenAI(latency=args.llm_latency_ms / 1000).start()
+    _configure(llm.url)
+    try:
+        results: Dict[str, Any] = {
+            "suite": "backend",
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        }
+        if "extract" in sections:
+            results["extract"] = bench_extract(args)
+        if "summarize" in sections:
+            llm.latency = 0.0  # client-side cost only
+            results["summarize"] = bench_summarize(args, llm)
+            llm.latency = args.llm_latency_ms / 1000
+        if "e2e" in sections:
+            results["e2e"] = bench_e2e(args, llm)
+    finally:
+        llm.stop()
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        _log(f"results written to {args.out}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
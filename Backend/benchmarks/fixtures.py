@@ -0,0 +1,221 @@
+"""
+Shared benchmark fixtures: synthetic PDF/DOCX/text documents, HS256 tokens the
+app verifies locally, and a fake OpenAI server that streams grounded summaries.
+"""
+import base64
+import hashlib
+import hmac
+import io
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from docx import Document as DocxDocument  # type: ignore
+
+SYLLABLES = ["ka", "lo", "mi", "ren", "tas", "vel", "qua", "dor", "sin", "ept", "ul", "bro"]
+
+
+def make_sentences(n_chars: int, seed: int = 7) -> List[str]:
+    """Pseudo-random sentences totalling about n_chars characters."""
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(5000)]
+    sentences, size = [], 0
+    while size < n_chars:
+        sentence = " ".join(rng.choice(vocab) for _ in range(rng.randint(8, 20))).capitalize() + "."
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return sentences
+
+
+def make_text(n_chars: int, seed: int = 7) -> bytes:
+    sentences = make_sentences(n_chars, seed)
+    paragraphs = [" ".join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+    return "\n\n".join(paragraphs).encode("utf-8")
+
+
+def make_docx(n_chars: int, seed: int = 7, table_every: int = 0) -> bytes:
+    """DOCX with one paragraph per ~5 sentences; table_every > 0 adds a 3x4 table every N paragraphs."""
+    sentences = make_sentences(n_chars, seed)
+    doc = DocxDocument()
+    for n, i in enumerate(range(0, len(sentences), 5)):
+        doc.add_paragraph(" ".join(sentences[i:i + 5]))
+        if table_every and n % table_every == table_every - 1:
+            table = doc.add_table(rows=3, cols=4)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"{r * 4 + c + n}"
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+def _pdf_escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(n_chars: int, seed: int = 7, chars_per_page: int = 3000) -> bytes:
+    """Uncompressed text PDF (Helvetica, ~90 characters per line) with about n_chars of text."""
+    words = " ".join(make_sentences(n_chars, seed)).split()
+    lines, line = [], ""
+    for word in words:
+        if line and len(line) + len(word) + 1 > 90:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    per_page = max(1, chars_per_page // 90)
+    pages = [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[""]]
+
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page_lines in pages:
+        stream = "BT /F1 9 Tf 11 TL 40 800 Td " + " ".join(f"({_pdf_escape(l)}) Tj T*" for l in page_lines) + " ET"
+        data = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(data), data))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % len(objects)
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), len(kids)
+    )
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+DOCUMENT_TYPES = {
+    "pdf": ("application/pdf", make_pdf),
+    "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", make_docx),
+    "txt": ("text/plain", make_text),
+}
+
+
+def make_document(fmt: str, n_chars: int, seed: int = 7):
+    """(bytes, content type, filename) for fmt in DOCUMENT_TYPES."""
+    content_type, make = DOCUMENT_TYPES[fmt]
+    return make(n_chars, seed), content_type, f"bench-{seed}.{fmt}"
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def mint_token(user_id: str, secret: str, ttl: int = 3600) -> str:
+    """HS256 access token in the shape Supabase issues, verifiable with SUPABASE_JWT_SECRET."""
+    header = _b64(json.dumps({"alg": "HS256", "typ": "JWT"}).encode())
+    payload = _b64(json.dumps({
+        "sub": user_id, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + ttl,
+    }).encode())
+    signature = hmac.new(secret.encode("utf-8"), f"{header}.{payload}".encode("ascii"), hashlib.sha256).digest()
+    return f"{header}.{payload}.{_b64(signature)}"
+
+
+def fake_summary(content: str, title_hint: str = "") -> Dict[str, Any]:
+    """A summary the grounding check accepts: every key point quotes a sentence of the content."""
+    sentences = [s.strip() for s in re.split(r"(?<=[.!?])\s+", content) if len(s.strip()) > 30]
+    key_points = [{"point": " ".join(s.split()[:8]), "quote": s} for s in sentences[:5]]
+    words = len(content.split())
+    return {
+        "title": title_hint or "Benchmark document",
+        "key_points": key_points,
+        "word_count": words,
+        "reading_time": f"{max(1, words // 250)} min",
+        "sentiment": "neutral",
+        "categories": ["Benchmark", "Synthetic"],
+        "full_summary": " ".join(sentences[:3]),
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeOpenAI"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        self.server.count_request()
+        prompt = (body.get("messages") or [{}])[-1].get("content") or ""
+        hint = prompt.split("\n", 1)[0].replace("Title hint:", "").strip()
+        content = prompt.split("CONTENT:\n", 1)[-1]
+        reply = json.dumps(fake_summary(content, hint))
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        base = {"id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": int(time.time()), "model": body.get("model")}
+        step = self.server.delta_chars
+        for i in range(0, len(reply), step):
+            event = dict(base, choices=[{"index": 0, "delta": {"content": reply[i:i + step]}, "finish_reason": None}])
+            self._write_chunk(b"data: " + json.dumps(event).encode() + b"\n\n")
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(reply) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        self._write_chunk(b"data: " + json.dumps(dict(base, choices=[], usage=usage)).encode() + b"\n\n")
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """
+    Local stand-in for the chat completions API (streaming only). `latency` is
+    the delay before the first byte of each response, in seconds.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, delta_chars: int = 64):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.delta_chars = delta_chars
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+    def count_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def start(self) -> "FakeOpenAI":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
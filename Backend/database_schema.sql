@@ -1,3 +1,6 @@
+-- Schema for a fresh install. To upgrade an existing database, run the scripts
+-- in migrations/ instead.
+
 -- Enable Row Level Security
 ALTER DATABASE postgres SET "app.jwt_secret" TO 'your-jwt-secret';
 
@@ -29,6 +32,10 @@ CREATE TABLE public.documents (
     processing_completed_at TIMESTAMP WITH TIME ZONE,
     file_path TEXT,
     file_url TEXT,
+    content_hash TEXT, -- SHA-256 of the uploaded bytes
+    extracted_text_path TEXT, -- object in the 'extracted' bucket holding the normalized text
+    minhash BIGINT[], -- MinHash signature of the extracted text (near-duplicate detection)
+    lsh_buckets TEXT[], -- LSH band keys of minhash; documents sharing a key are candidates
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -45,6 +52,9 @@ CREATE TABLE public.document_summaries (
     sentiment summary_sentiment DEFAULT 'neutral',
     categories TEXT[] DEFAULT '{}',
     full_summary TEXT,
+    summary_version TEXT, -- engine and settings that produced it; NULL for degraded summaries (never reused)
+    search_vector TSVECTOR, -- weighted full-text index, maintained by a trigger
+    embedding REAL[], -- local reranking vector written by the backend (app/search.py)
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
@@ -52,11 +62,14 @@ CREATE TABLE public.document_summaries (
 -- Analytics table for tracking user metrics
 CREATE TABLE public.user_analytics (
     id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
-    user_id UUID REFERENCES auth.users(id) NOT NULL,
+    user_id UUID REFERENCES auth.users(id) NOT NULL UNIQUE,
     total_documents INTEGER DEFAULT 0,
     total_summaries INTEGER DEFAULT 0,
     total_time_saved INTEGER DEFAULT 0, -- in minutes
     documents_today INTEGER DEFAULT 0,
+    documents_today_date DATE DEFAULT CURRENT_DATE, -- day documents_today counts for
+    completed_documents INTEGER DEFAULT 0, -- from processing_logs
+    failed_documents INTEGER DEFAULT 0, -- from processing_logs
     success_rate DECIMAL(5,2) DEFAULT 100.00,
     last_updated TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
@@ -70,6 +83,14 @@ CREATE TABLE public.processing_logs (
     status document_status NOT NULL,
     message TEXT,
     processing_time_ms INTEGER,
+    -- Model accounting: totals over the document's completion requests, plus one entry per request
+    model TEXT,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    llm_latency_ms INTEGER,
+    llm_calls JSONB,
+    -- Milliseconds per processing stage (download, extract_*, near_duplicate, summarize, llm, grounding, db_write)
+    stages JSONB,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -137,10 +158,13 @@ CREATE POLICY "Users can insert their own processing logs" ON public.processing_
 CREATE INDEX idx_documents_user_id ON public.documents(user_id);
 CREATE INDEX idx_documents_status ON public.documents(status);
 CREATE INDEX idx_documents_upload_date ON public.documents(upload_date);
+CREATE INDEX idx_documents_content_hash ON public.documents(user_id, content_hash);
+CREATE INDEX idx_documents_lsh_buckets ON public.documents USING GIN (lsh_buckets);
 CREATE INDEX idx_document_summaries_document_id ON public.document_summaries(document_id);
 CREATE INDEX idx_document_summaries_user_id ON public.document_summaries(user_id);
 CREATE INDEX idx_processing_logs_document_id ON public.processing_logs(document_id);
 CREATE INDEX idx_processing_logs_user_id ON public.processing_logs(user_id);
+CREATE INDEX idx_document_summaries_document_created ON public.document_summaries(document_id, created_at DESC);
 
 -- Create functions for updating timestamps
 CREATE OR REPLACE FUNCTION update_updated_at_column()
@@ -178,48 +202,204 @@ BEGIN
     
     RETURN NEW;
 END;
-$$ LANGUAGE plpgsql SECURITY DEFINER;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
 
 -- Trigger to create user profile on signup
 CREATE TRIGGER on_auth_user_created
     AFTER INSERT ON auth.users
     FOR EACH ROW EXECUTE FUNCTION public.handle_new_user();
 
--- Function to update analytics when documents change
-CREATE OR REPLACE FUNCTION update_user_analytics()
-RETURNS TRIGGER AS $$
+-- Analytics are maintained incrementally: each trigger applies a delta to the
+-- user's row instead of recounting all of the user's documents and summaries.
+-- Status/progress updates on documents do not touch the counters.
+
+-- Apply deltas to a user's analytics row (creating it if needed)
+CREATE OR REPLACE FUNCTION public.bump_user_analytics(
+    p_user_id UUID,
+    d_documents INTEGER DEFAULT 0,
+    d_summaries INTEGER DEFAULT 0,
+    d_today INTEGER DEFAULT 0,
+    d_completed INTEGER DEFAULT 0,
+    d_failed INTEGER DEFAULT 0,
+    d_time_saved INTEGER DEFAULT 0
+)
+RETURNS VOID AS $$
 BEGIN
-    -- Update analytics for the user
-    INSERT INTO public.user_analytics (user_id, total_documents, total_summaries, last_updated)
+    INSERT INTO public.user_analytics AS ua (
+        user_id, total_documents, total_summaries, documents_today, documents_today_date,
+        completed_documents, failed_documents, total_time_saved, success_rate, last_updated
+    )
     VALUES (
-        COALESCE(NEW.user_id, OLD.user_id),
-        (SELECT COUNT(*) FROM public.documents WHERE user_id = COALESCE(NEW.user_id, OLD.user_id)),
-        (SELECT COUNT(*) FROM public.document_summaries WHERE user_id = COALESCE(NEW.user_id, OLD.user_id)),
+        p_user_id, GREATEST(d_documents, 0), GREATEST(d_summaries, 0), GREATEST(d_today, 0), CURRENT_DATE,
+        d_completed, d_failed, d_time_saved,
+        CASE WHEN d_completed + d_failed > 0 THEN ROUND(100.0 * d_completed / (d_completed + d_failed), 2) ELSE 100.00 END,
         NOW()
     )
     ON CONFLICT (user_id) DO UPDATE SET
-        total_documents = (SELECT COUNT(*) FROM public.documents WHERE user_id = COALESCE(NEW.user_id, OLD.user_id)),
-        total_summaries = (SELECT COUNT(*) FROM public.document_summaries WHERE user_id = COALESCE(NEW.user_id, OLD.user_id)),
+        total_documents = GREATEST(ua.total_documents + d_documents, 0),
+        total_summaries = GREATEST(ua.total_summaries + d_summaries, 0),
+        -- documents_today restarts from the delta on the first change of a new day
+        documents_today = GREATEST(
+            CASE WHEN ua.documents_today_date = CURRENT_DATE THEN ua.documents_today ELSE 0 END + d_today, 0),
+        documents_today_date = CURRENT_DATE,
+        completed_documents = ua.completed_documents + d_completed,
+        failed_documents = ua.failed_documents + d_failed,
+        total_time_saved = ua.total_time_saved + d_time_saved,
+        success_rate = CASE
+            WHEN ua.completed_documents + d_completed + ua.failed_documents + d_failed > 0
+            THEN ROUND(100.0 * (ua.completed_documents + d_completed)
+                       / (ua.completed_documents + d_completed + ua.failed_documents + d_failed), 2)
+            ELSE 100.00 END,
         last_updated = NOW();
-    
-    RETURN COALESCE(NEW, OLD);
 END;
-$$ LANGUAGE plpgsql SECURITY DEFINER;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+CREATE OR REPLACE FUNCTION public.analytics_on_document_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM public.bump_user_analytics(NEW.user_id, d_documents => 1,
+            d_today => CASE WHEN NEW.upload_date::date = CURRENT_DATE THEN 1 ELSE 0 END);
+        RETURN NEW;
+    ELSE
+        PERFORM public.bump_user_analytics(OLD.user_id, d_documents => -1,
+            d_today => CASE WHEN OLD.upload_date::date = CURRENT_DATE THEN -1 ELSE 0 END);
+        RETURN OLD;
+    END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+CREATE OR REPLACE FUNCTION public.analytics_on_summary_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM public.bump_user_analytics(NEW.user_id, d_summaries => 1);
+        RETURN NEW;
+    ELSE
+        PERFORM public.bump_user_analytics(OLD.user_id, d_summaries => -1);
+        RETURN OLD;
+    END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Terminal processing log rows drive success_rate and total_time_saved.
+-- Time saved = estimated reading time of the document (250 wpm) minus the time
+-- spent processing it.
+CREATE OR REPLACE FUNCTION public.analytics_on_processing_log()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_words INTEGER;
+    v_saved INTEGER := 0;
+BEGIN
+    IF NEW.status = 'completed' THEN
+        SELECT word_count INTO v_words FROM public.document_summaries
+        WHERE document_id = NEW.document_id ORDER BY created_at DESC LIMIT 1;
+        v_saved := GREATEST(CEIL(COALESCE(v_words, 0) / 250.0) - COALESCE(NEW.processing_time_ms, 0) / 60000, 0);
+        PERFORM public.bump_user_analytics(NEW.user_id, d_completed => 1, d_time_saved => v_saved);
+    ELSIF NEW.status = 'failed' THEN
+        PERFORM public.bump_user_analytics(NEW.user_id, d_failed => 1);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- The analytics functions run as their owner, so only the triggers may call them:
+-- through PostgREST (/rpc/...) any user could otherwise rewrite anyone's counters
+REVOKE EXECUTE ON FUNCTION public.bump_user_analytics(UUID, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER)
+    FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.analytics_on_document_change() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.analytics_on_summary_change() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.analytics_on_processing_log() FROM PUBLIC, anon, authenticated;
 
--- Triggers to update analytics
+-- Triggers to update analytics (no UPDATE triggers: status changes don't move counters)
 CREATE TRIGGER update_analytics_on_document_change
-    AFTER INSERT OR UPDATE OR DELETE ON public.documents
-    FOR EACH ROW EXECUTE FUNCTION update_user_analytics();
+    AFTER INSERT OR DELETE ON public.documents
+    FOR EACH ROW EXECUTE FUNCTION public.analytics_on_document_change();
 
 CREATE TRIGGER update_analytics_on_summary_change
-    AFTER INSERT OR UPDATE OR DELETE ON public.document_summaries
-    FOR EACH ROW EXECUTE FUNCTION update_user_analytics();
+    AFTER INSERT OR DELETE ON public.document_summaries
+    FOR EACH ROW EXECUTE FUNCTION public.analytics_on_summary_change();
+
+CREATE TRIGGER update_analytics_on_processing_log
+    AFTER INSERT ON public.processing_logs
+    FOR EACH ROW EXECUTE FUNCTION public.analytics_on_processing_log();
+
+-- Full-text search over summaries. The weighted tsvector is maintained by a
+-- trigger, so a summary is indexed in the same statement that inserts it.
+
+CREATE OR REPLACE FUNCTION public.document_summaries_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', array_to_string(COALESCE(NEW.categories, '{}'), ' ')), 'B') ||
+        setweight(to_tsvector('english', array_to_string(COALESCE(NEW.key_points, '{}'), ' ')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(NEW.full_summary, '')), 'C');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER update_document_summaries_search_vector
+    BEFORE INSERT OR UPDATE OF title, key_points, categories, full_summary ON public.document_summaries
+    FOR EACH ROW EXECUTE FUNCTION public.document_summaries_search_vector();
+
+CREATE INDEX idx_document_summaries_search ON public.document_summaries USING GIN (search_vector);
+
+CREATE OR REPLACE FUNCTION public.html_escape(p_text TEXT)
+RETURNS TEXT AS $$
+    SELECT replace(replace(replace(p_text, '&', '&amp;'), '<', '&lt;'), '>', '&gt;');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Ranked, paginated search for one user. Highlights (HTML-escaped text with
+-- <mark> around matches) are only computed for the rows of the requested page.
+CREATE OR REPLACE FUNCTION public.search_summaries(
+    p_user_id UUID,
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    id UUID,
+    document_id UUID,
+    title TEXT,
+    categories TEXT[],
+    key_points TEXT[],
+    created_at TIMESTAMP WITH TIME ZONE,
+    rank REAL,
+    embedding REAL[],
+    title_highlight TEXT,
+    summary_highlight TEXT
+) AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', p_query) AS query
+    ),
+    hits AS (
+        SELECT s.id, s.document_id, s.title, s.categories, s.key_points, s.full_summary, s.created_at, s.embedding,
+               ts_rank_cd(s.search_vector, q.query, 32) AS rank
+        FROM public.document_summaries s, q
+        WHERE s.user_id = p_user_id AND s.search_vector @@ q.query
+        ORDER BY rank DESC, s.created_at DESC, s.id DESC
+        LIMIT p_limit OFFSET p_offset
+    )
+    SELECT h.id, h.document_id, h.title, h.categories, h.key_points, h.created_at, h.rank, h.embedding,
+           ts_headline('english', public.html_escape(h.title), q.query,
+                       'StartSel=<mark>, StopSel=</mark>, HighlightAll=true'),
+           ts_headline('english', public.html_escape(COALESCE(h.full_summary, '') || ' ' || array_to_string(COALESCE(h.key_points, '{}'), ' ')), q.query,
+                       'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10, FragmentDelimiter=" ... "')
+    FROM hits h, q
+    ORDER BY h.rank DESC, h.created_at DESC, h.id DESC;
+$$ LANGUAGE sql STABLE;
 
 -- Create Supabase Storage bucket for documents (id must be lowercase)
 INSERT INTO storage.buckets (id, name, public)
 VALUES ('documents', 'documents', true)
 ON CONFLICT (id) DO NOTHING;
 
+-- Private bucket for extracted text (gzip JSON with page offsets), written and read by the backend only
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('extracted', 'extracted', false)
+ON CONFLICT (id) DO NOTHING;
+
 -- Storage RLS policies for objects in 'documents' bucket
 -- Allow anyone to read public files in this bucket
 CREATE POLICY "Public read for documents bucket" ON storage.objects
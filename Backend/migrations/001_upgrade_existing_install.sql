@@ -0,0 +1,294 @@
+-- Upgrades a database created from an earlier database_schema.sql to the
+-- current one. Fresh installs only need database_schema.sql. Safe to re-run.
+BEGIN;
+
+-- New columns
+ALTER TABLE public.documents ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE public.documents ADD COLUMN IF NOT EXISTS extracted_text_path TEXT;
+ALTER TABLE public.documents ADD COLUMN IF NOT EXISTS minhash BIGINT[];
+ALTER TABLE public.documents ADD COLUMN IF NOT EXISTS lsh_buckets TEXT[];
+
+ALTER TABLE public.document_summaries ADD COLUMN IF NOT EXISTS summary_version TEXT;
+ALTER TABLE public.document_summaries ADD COLUMN IF NOT EXISTS search_vector TSVECTOR;
+ALTER TABLE public.document_summaries ADD COLUMN IF NOT EXISTS embedding REAL[];
+
+ALTER TABLE public.user_analytics ADD COLUMN IF NOT EXISTS documents_today_date DATE DEFAULT CURRENT_DATE;
+ALTER TABLE public.user_analytics ADD COLUMN IF NOT EXISTS completed_documents INTEGER DEFAULT 0;
+ALTER TABLE public.user_analytics ADD COLUMN IF NOT EXISTS failed_documents INTEGER DEFAULT 0;
+
+ALTER TABLE public.processing_logs ADD COLUMN IF NOT EXISTS model TEXT;
+ALTER TABLE public.processing_logs ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER;
+ALTER TABLE public.processing_logs ADD COLUMN IF NOT EXISTS completion_tokens INTEGER;
+ALTER TABLE public.processing_logs ADD COLUMN IF NOT EXISTS llm_latency_ms INTEGER;
+ALTER TABLE public.processing_logs ADD COLUMN IF NOT EXISTS llm_calls JSONB;
+ALTER TABLE public.processing_logs ADD COLUMN IF NOT EXISTS stages JSONB;
+
+-- bump_user_analytics upserts ON CONFLICT (user_id)
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'public.user_analytics'::regclass AND conname = 'user_analytics_user_id_key'
+    ) THEN
+        ALTER TABLE public.user_analytics ADD CONSTRAINT user_analytics_user_id_key UNIQUE (user_id);
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON public.documents(user_id, content_hash);
+CREATE INDEX IF NOT EXISTS idx_documents_lsh_buckets ON public.documents USING GIN (lsh_buckets);
+CREATE INDEX IF NOT EXISTS idx_document_summaries_document_created ON public.document_summaries(document_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_document_summaries_search ON public.document_summaries USING GIN (search_vector);
+
+-- Signup handler with a pinned search_path
+CREATE OR REPLACE FUNCTION public.handle_new_user()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO public.user_profiles (id, username, full_name, avatar_url)
+    VALUES (
+        NEW.id,
+        COALESCE(NEW.raw_user_meta_data->>'username', NEW.email),
+        COALESCE(NEW.raw_user_meta_data->>'full_name', ''),
+        COALESCE(NEW.raw_user_meta_data->>'avatar_url', '')
+    );
+    
+    INSERT INTO public.user_analytics (user_id)
+    VALUES (NEW.id);
+    
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- The recounting analytics trigger is replaced by incremental ones
+DROP TRIGGER IF EXISTS update_analytics_on_document_change ON public.documents;
+DROP TRIGGER IF EXISTS update_analytics_on_summary_change ON public.document_summaries;
+DROP FUNCTION IF EXISTS update_user_analytics();
+
+-- Apply deltas to a user's analytics row (creating it if needed)
+CREATE OR REPLACE FUNCTION public.bump_user_analytics(
+    p_user_id UUID,
+    d_documents INTEGER DEFAULT 0,
+    d_summaries INTEGER DEFAULT 0,
+    d_today INTEGER DEFAULT 0,
+    d_completed INTEGER DEFAULT 0,
+    d_failed INTEGER DEFAULT 0,
+    d_time_saved INTEGER DEFAULT 0
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO public.user_analytics AS ua (
+        user_id, total_documents, total_summaries, documents_today, documents_today_date,
+        completed_documents, failed_documents, total_time_saved, success_rate, last_updated
+    )
+    VALUES (
+        p_user_id, GREATEST(d_documents, 0), GREATEST(d_summaries, 0), GREATEST(d_today, 0), CURRENT_DATE,
+        d_completed, d_failed, d_time_saved,
+        CASE WHEN d_completed + d_failed > 0 THEN ROUND(100.0 * d_completed / (d_completed + d_failed), 2) ELSE 100.00 END,
+        NOW()
+    )
+    ON CONFLICT (user_id) DO UPDATE SET
+        total_documents = GREATEST(ua.total_documents + d_documents, 0),
+        total_summaries = GREATEST(ua.total_summaries + d_summaries, 0),
+        -- documents_today restarts from the delta on the first change of a new day
+        documents_today = GREATEST(
+            CASE WHEN ua.documents_today_date = CURRENT_DATE THEN ua.documents_today ELSE 0 END + d_today, 0),
+        documents_today_date = CURRENT_DATE,
+        completed_documents = ua.completed_documents + d_completed,
+        failed_documents = ua.failed_documents + d_failed,
+        total_time_saved = ua.total_time_saved + d_time_saved,
+        success_rate = CASE
+            WHEN ua.completed_documents + d_completed + ua.failed_documents + d_failed > 0
+            THEN ROUND(100.0 * (ua.completed_documents + d_completed)
+                       / (ua.completed_documents + d_completed + ua.failed_documents + d_failed), 2)
+            ELSE 100.00 END,
+        last_updated = NOW();
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+CREATE OR REPLACE FUNCTION public.analytics_on_document_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM public.bump_user_analytics(NEW.user_id, d_documents => 1,
+            d_today => CASE WHEN NEW.upload_date::date = CURRENT_DATE THEN 1 ELSE 0 END);
+        RETURN NEW;
+    ELSE
+        PERFORM public.bump_user_analytics(OLD.user_id, d_documents => -1,
+            d_today => CASE WHEN OLD.upload_date::date = CURRENT_DATE THEN -1 ELSE 0 END);
+        RETURN OLD;
+    END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+CREATE OR REPLACE FUNCTION public.analytics_on_summary_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM public.bump_user_analytics(NEW.user_id, d_summaries => 1);
+        RETURN NEW;
+    ELSE
+        PERFORM public.bump_user_analytics(OLD.user_id, d_summaries => -1);
+        RETURN OLD;
+    END IF;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- Terminal processing log rows drive success_rate and total_time_saved.
+-- Time saved = estimated reading time of the document (250 wpm) minus the time
+-- spent processing it.
+CREATE OR REPLACE FUNCTION public.analytics_on_processing_log()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_words INTEGER;
+    v_saved INTEGER := 0;
+BEGIN
+    IF NEW.status = 'completed' THEN
+        SELECT word_count INTO v_words FROM public.document_summaries
+        WHERE document_id = NEW.document_id ORDER BY created_at DESC LIMIT 1;
+        v_saved := GREATEST(CEIL(COALESCE(v_words, 0) / 250.0) - COALESCE(NEW.processing_time_ms, 0) / 60000, 0);
+        PERFORM public.bump_user_analytics(NEW.user_id, d_completed => 1, d_time_saved => v_saved);
+    ELSIF NEW.status = 'failed' THEN
+        PERFORM public.bump_user_analytics(NEW.user_id, d_failed => 1);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_temp;
+
+-- The analytics functions run as their owner, so only the triggers may call them:
+-- through PostgREST (/rpc/...) any user could otherwise rewrite anyone's counters
+REVOKE EXECUTE ON FUNCTION public.bump_user_analytics(UUID, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER)
+    FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.analytics_on_document_change() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.analytics_on_summary_change() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.analytics_on_processing_log() FROM PUBLIC, anon, authenticated;
+
+-- Triggers to update analytics (no UPDATE triggers: status changes don't move counters)
+DROP TRIGGER IF EXISTS update_analytics_on_processing_log ON public.processing_logs;
+
+CREATE TRIGGER update_analytics_on_document_change
+    AFTER INSERT OR DELETE ON public.documents
+    FOR EACH ROW EXECUTE FUNCTION public.analytics_on_document_change();
+
+CREATE TRIGGER update_analytics_on_summary_change
+    AFTER INSERT OR DELETE ON public.document_summaries
+    FOR EACH ROW EXECUTE FUNCTION public.analytics_on_summary_change();
+
+CREATE TRIGGER update_analytics_on_processing_log
+    AFTER INSERT ON public.processing_logs
+    FOR EACH ROW EXECUTE FUNCTION public.analytics_on_processing_log();
+
+-- One-off backfill of the incremental counters for existing data
+INSERT INTO public.user_analytics (user_id, total_documents, total_summaries, documents_today, documents_today_date, last_updated)
+SELECT d.user_id,
+       COUNT(*),
+       (SELECT COUNT(*) FROM public.document_summaries s WHERE s.user_id = d.user_id),
+       COUNT(*) FILTER (WHERE d.upload_date::date = CURRENT_DATE),
+       CURRENT_DATE,
+       NOW()
+FROM public.documents d
+GROUP BY d.user_id
+ON CONFLICT (user_id) DO UPDATE SET
+    total_documents = EXCLUDED.total_documents,
+    total_summaries = EXCLUDED.total_summaries,
+    documents_today = EXCLUDED.documents_today,
+    documents_today_date = EXCLUDED.documents_today_date,
+    last_updated = NOW();
+
+-- ... and of the processing_logs-driven counters, with the same time-saved
+-- estimate as analytics_on_processing_log()
+INSERT INTO public.user_analytics (user_id, completed_documents, failed_documents, total_time_saved, success_rate, last_updated)
+SELECT l.user_id, l.completed, l.failed, l.time_saved,
+       CASE WHEN l.completed + l.failed > 0 THEN ROUND(100.0 * l.completed / (l.completed + l.failed), 2) ELSE 100.00 END,
+       NOW()
+FROM (
+    SELECT pl.user_id,
+           COUNT(*) FILTER (WHERE pl.status = 'completed') AS completed,
+           COUNT(*) FILTER (WHERE pl.status = 'failed') AS failed,
+           COALESCE(SUM(GREATEST(CEIL(COALESCE(s.word_count, 0) / 250.0) - COALESCE(pl.processing_time_ms, 0) / 60000, 0))
+                    FILTER (WHERE pl.status = 'completed'), 0) AS time_saved
+    FROM public.processing_logs pl
+    LEFT JOIN LATERAL (
+        SELECT word_count FROM public.document_summaries
+        WHERE document_id = pl.document_id ORDER BY created_at DESC LIMIT 1
+    ) s ON TRUE
+    GROUP BY pl.user_id
+) l
+ON CONFLICT (user_id) DO UPDATE SET
+    completed_documents = EXCLUDED.completed_documents,
+    failed_documents = EXCLUDED.failed_documents,
+    total_time_saved = EXCLUDED.total_time_saved,
+    success_rate = EXCLUDED.success_rate,
+    last_updated = NOW();
+
+-- Full-text search
+CREATE OR REPLACE FUNCTION public.document_summaries_search_vector()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', array_to_string(COALESCE(NEW.categories, '{}'), ' ')), 'B') ||
+        setweight(to_tsvector('english', array_to_string(COALESCE(NEW.key_points, '{}'), ' ')), 'B') ||
+        setweight(to_tsvector('english', COALESCE(NEW.full_summary, '')), 'C');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS update_document_summaries_search_vector ON public.document_summaries;
+
+CREATE TRIGGER update_document_summaries_search_vector
+    BEFORE INSERT OR UPDATE OF title, key_points, categories, full_summary ON public.document_summaries
+    FOR EACH ROW EXECUTE FUNCTION public.document_summaries_search_vector();
+
+-- Index summaries written before the trigger existed
+UPDATE public.document_summaries SET title = title WHERE search_vector IS NULL;
+
+CREATE OR REPLACE FUNCTION public.html_escape(p_text TEXT)
+RETURNS TEXT AS $$
+    SELECT replace(replace(replace(p_text, '&', '&amp;'), '<', '&lt;'), '>', '&gt;');
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Ranked, paginated search for one user. Highlights (HTML-escaped text with
+-- <mark> around matches) are only computed for the rows of the requested page.
+CREATE OR REPLACE FUNCTION public.search_summaries(
+    p_user_id UUID,
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+    id UUID,
+    document_id UUID,
+    title TEXT,
+    categories TEXT[],
+    key_points TEXT[],
+    created_at TIMESTAMP WITH TIME ZONE,
+    rank REAL,
+    embedding REAL[],
+    title_highlight TEXT,
+    summary_highlight TEXT
+) AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('english', p_query) AS query
+    ),
+    hits AS (
+        SELECT s.id, s.document_id, s.title, s.categories, s.key_points, s.full_summary, s.created_at, s.embedding,
+               ts_rank_cd(s.search_vector, q.query, 32) AS rank
+        FROM public.document_summaries s, q
+        WHERE s.user_id = p_user_id AND s.search_vector @@ q.query
+        ORDER BY rank DESC, s.created_at DESC, s.id DESC
+        LIMIT p_limit OFFSET p_offset
+    )
+    SELECT h.id, h.document_id, h.title, h.categories, h.key_points, h.created_at, h.rank, h.embedding,
+           ts_headline('english', public.html_escape(h.title), q.query,
+                       'StartSel=<mark>, StopSel=</mark>, HighlightAll=true'),
+           ts_headline('english', public.html_escape(COALESCE(h.full_summary, '') || ' ' || array_to_string(COALESCE(h.key_points, '{}'), ' ')), q.query,
+                       'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=30, MinWords=10, FragmentDelimiter=" ... "')
+    FROM hits h, q
+    ORDER BY h.rank DESC, h.created_at DESC, h.id DESC;
+$$ LANGUAGE sql STABLE;
+
+-- Private bucket for extracted text (gzip JSON with page offsets), written and read by the backend only
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('extracted', 'extracted', false)
+ON CONFLICT (id) DO NOTHING;
+
+COMMIT;
@@ -0,0 +1,93 @@
+import random
+
+import pytest
+
+from app.grounding import GroundingIndex
+
+CONTENT = (
+    "The Board approved the 2024 budget on Monday.\n\n"
+    "Revenue grew by 12%   year-over-year, driven by  CLOUD services;\tcosts fell.\n"
+    "Straße works and Café openings were delayed. İstanbul office: 40 staff.\n"
+    "A re-organisation (phase II) starts in Q3 -- see appendix B.\n"
+)
+
+
+def _baseline(point, quote, content):
+    """The check GroundingIndex replaced."""
+    content_lower = content.lower()
+    if not point:
+        return False, None
+    if quote and quote.lower() in content_lower:
+        return True, quote
+    tokens = [t for t in point.split() if len(t) > 3]
+    overlap = sum(1 for t in tokens if t.lower() in content_lower)
+    return overlap >= max(2, len(tokens) // 3), None
+
+
+QUOTES = [
+    "approved the 2024 budget",
+    "APPROVED THE 2024 BUDGET",
+    "the board approved",
+    "Revenue grew by 12%   year-over-year",
+    "Revenue grew by 12% year-over-year",  # whitespace differs: not a substring
+    "driven by  CLOUD services;\tcosts",
+    "driven by CLOUD services; costs",
+    "budget on Monday.\n\nRevenue grew",
+    "budget on Monday. Revenue grew",
+    "STRASSE works",
+    "straße works and café openings",
+    "İSTANBUL OFFICE: 40",
+    "istanbul office",
+    "(phase II) starts in",
+    "phase ii starts",
+    "see appendix b.",
+    "ee appendi",
+    "grew by 13%",
+    "budget",
+    "",
+    "x",
+]
+
+POINTS = [
+    "The board approved the budget",
+    "Revenue growth came from cloud services",
+    "Costs rose sharply in Europe",
+    "Openings of the café were delayed",
+    "Staff moved offices",
+    "",
+    "a b c",
+    "organisation phase appendix",
+    "BUDGET MONDAY REVENUE",
+]
+
+
+@pytest.mark.parametrize("quote", QUOTES)
+def test_contains_matches_substring_check(quote):
+    assert GroundingIndex(CONTENT).contains(quote) == (quote.lower() in CONTENT.lower())
+
+
+@pytest.mark.parametrize("point", POINTS)
+@pytest.mark.parametrize("quote", QUOTES[:6] + ["", "not in the text at all"])
+def test_ground_matches_baseline(point, quote):
+    assert GroundingIndex(CONTENT).ground(point, quote) == _baseline(point, quote, CONTENT)
+
+
+def test_random_fragments_match_baseline():
+    rng = random.Random(13)
+    words = ["Alpha", "beta", "GAMMA", "delta", "Café", "straße", "re-run", "x1", "42", "über"]
+    separators = [" ", "  ", "\n", "\t", ", ", ". ", "-"]
+    content = "".join(rng.choice(words) + rng.choice(separators) for _ in range(2000))
+    index = GroundingIndex(content)
+    for _ in range(2000):
+        start = rng.randrange(len(content))
+        fragment = content[start:start + rng.randint(1, 60)]
+        if rng.random() < 0.5:
+            fragment = fragment.upper() if rng.random() < 0.5 else fragment.swapcase()
+        if rng.random() < 0.3:
+            # Near misses: collapse or change whitespace, or replace a character
+            fragment = " ".join(fragment.split()) if rng.random() < 0.5 else fragment.replace("a", "o", 1)
+        assert index.contains(fragment) == (fragment.lower() in content.lower()), fragment
+        point = " ".join(rng.choice(words + ["missing", "absent"]) for _ in range(rng.randint(0, 8)))
+        assert index.ground(point, fragment) == _baseline(point, fragment, content), (point, fragment)
+        token = fragment.strip()
+        assert index.has_token(token) == (token.lower() in content.lower()), token
@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import pytest
+
+from app import jobs
+from app.jobs import JobQueue, QuotaExceeded, WorkerPool
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_FAIR_SHARE", True)
+    monkeypatch.setattr(jobs, "JOB_USER_MAX_RUNNING", 0)
+    monkeypatch.setattr(jobs, "JOB_USER_MAX_ACTIVE", 0)
+    monkeypatch.setattr(jobs, "JOB_USER_MAX_INTERACTIVE", 0)
+    return JobQueue(":memory:")
+
+
+def _claim_users(queue, n):
+    return [queue.claim()["user_id"] for _ in range(n)]
+
+
+def test_expired_lease_is_requeued_and_claimed_again(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.db")
+    first, second = JobQueue(path), JobQueue(path)
+    job = first.enqueue("doc-1", "u1")
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.05)
+    assert first.claim()["id"] == job["id"]
+
+    # Another live process's job is left alone
+    assert second.requeue_running() == 0
+    assert first.renew_leases() == 1
+
+    time.sleep(0.1)
+    assert second.requeue_running() == 1
+    reclaimed = second.claim()
+    assert reclaimed["id"] == job["id"]
+    assert reclaimed["attempts"] == 2
+    assert reclaimed["lease_owner"] == second.owner
+    # The first process lost the job, so it has nothing left to renew
+    assert first.renew_leases() == 0
+
+
+def test_own_jobs_are_requeued_on_shutdown(queue):
+    queue.enqueue("doc-1", "u1")
+    queue.claim()
+    assert queue.requeue_running(own=True) == 1
+    assert queue.counts() == {"queued": 1}
+
+
+def test_purge_finished_only_removes_old_terminal_jobs(queue):
+    done, failed, retrying, waiting = (queue.enqueue(f"doc-{i}", "u1") for i in range(4))
+    for _ in range(3):
+        queue.claim()
+    queue.complete(done["id"], {"summary_id": "s1"})
+    queue.fail(failed["id"], "boom", retry=False)
+    queue.fail(retrying["id"], "flaky")
+
+    assert queue.purge_finished(older_than=3600) == 0
+    time.sleep(0.01)
+    assert queue.purge_finished(older_than=0) == 2
+    assert queue.get(done["id"]) is None and queue.get(failed["id"]) is None
+    assert queue.get(retrying["id"])["status"] == "retrying"
+    assert queue.get(waiting["id"])["status"] == "queued"
+
+
+def test_heartbeat_purges_finished_jobs(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_LEASE_SECONDS", 0.03)
+    monkeypatch.setattr(jobs, "JOB_RETENTION_SECONDS", 0.01)
+
+    async def handler(job):
+        return {}
+
+    async def scenario():
+        pool = WorkerPool(queue, handler, size=1)
+        await pool.start()
+        job = queue.enqueue("doc-1", "u1")
+        pool.notify()
+        try:
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if queue.get(job["id"]) is None:
+                    return True
+            return False
+        finally:
+            await pool.stop()
+
+    assert asyncio.run(scenario())
+
+
+def test_quota_rejects_with_retry_after(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_USER_MAX_ACTIVE", 2)
+    monkeypatch.setattr(jobs, "JOB_USER_MAX_RUNNING", 2)
+    queue.enqueue("doc-1", "u1")
+    queue.enqueue("doc-2", "u1")
+    queue.check_quota("u2")
+
+    with pytest.raises(QuotaExceeded) as error:
+        queue.check_quota("u1", 3)
+    # 3 jobs over the limit, 10 s each on average, 2 running at a time
+    assert error.value.retry_after == pytest.approx(15.0)
+
+    with pytest.raises(QuotaExceeded) as error:
+        queue.check_quota("u1")
+    assert error.value.retry_after == pytest.approx(5.0)
+
+
+def test_many_single_enqueues_are_demoted_to_bulk(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_USER_MAX_INTERACTIVE", 2)
+    classes = [queue.enqueue(f"doc-{i}", "u1")["job_class"] for i in range(4)]
+    assert classes == ["interactive", "interactive", "bulk", "bulk"]
+    # Other users keep their interactive slots
+    assert queue.enqueue("doc-x", "u2")["job_class"] == "interactive"
+
+
+def test_fair_share_alternates_between_users(queue):
+    for i in range(4):
+        queue.enqueue(f"heavy-{i}", "heavy", job_class="bulk")
+    for i in range(2):
+        queue.enqueue(f"light-{i}", "light", job_class="bulk")
+    assert _claim_users(queue, 6) == ["heavy", "light", "heavy", "light", "heavy", "heavy"]
+
+
+def test_interactive_work_is_charged_less_than_bulk(queue):
+    for i in range(6):
+        queue.enqueue(f"bulk-{i}", "bulk-user", job_class="bulk")
+    for i in range(4):
+        queue.enqueue(f"one-{i}", "interactive-user")
+    # An interactive job costs 1/4 of a bulk one, so four of them fit in one bulk turn
+    order = _claim_users(queue, 6)
+    assert order.count("interactive-user") == 4
+    assert order[:2] == ["interactive-user", "bulk-user"]
+
+
+def test_fifo_serves_in_arrival_order(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_FAIR_SHARE", False)
+    for i in range(3):
+        queue.enqueue(f"heavy-{i}", "heavy", job_class="bulk")
+    queue.enqueue("light-0", "light")
+    assert _claim_users(queue, 4) == ["heavy", "heavy", "heavy", "light"]
+
+
+def test_running_cap_only_applies_while_others_wait(queue, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_USER_MAX_RUNNING", 1)
+    for i in range(3):
+        queue.enqueue(f"heavy-{i}", "heavy", job_class="bulk")
+    # Alone on the queue, the user gets every worker
+    assert _claim_users(queue, 2) == ["heavy", "heavy"]
+
+    queue.enqueue("light-0", "light", job_class="bulk")
+    queue.enqueue("light-1", "light", job_class="bulk")
+    # heavy is over the cap while light waits; light then hits the cap too, so both are eligible again
+    assert _claim_users(queue, 2) == ["light", "heavy"]
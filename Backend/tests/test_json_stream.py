@@ -0,0 +1,76 @@
+import json
+import random
+
+import pytest
+
+from app.json_stream import IncrementalJSONParser
+
+DOCUMENTS = [
+    '{}',
+    '{"title": "Quarterly report"}',
+    '{"title": "Q3", "key_points": [], "word_count": 0}',
+    '{"key_points": [{"point": "Revenue grew", "quote": "grew 10%"}, {"point": "Costs fell", "quote": "fell"}]}',
+    '{"a": [1, 2.5, -3e2, true, false, null], "b": {"nested": [1, {"x": "]"}]}, "c": "tail"}',
+    '{"escapes": "quote \\" backslash \\\\ slash \\/ newline \\n tab \\t", "after": 1}',
+    '{"unicode": "caf\\u00e9 \\ud83d\\ude00 \\u2028", "raw": "naïve 😀 日本語"}',
+    '{"brackets": "{[,:]}", "list": ["a,b", "c]d", "{e}"], "end": "}"}',
+    '{ "spaced" :\n [ 1 ,\r\n 2 ] ,\t"x" : { } }',
+    '{"empty_string": "", "empty_list": [], "empty_object": {}, "list_of_lists": [[1], [], [[2]]]}',
+]
+
+
+def _expected(document: str):
+    events = []
+    for key, value in json.loads(document).items():
+        if isinstance(value, list):
+            events += [("item", key, item) for item in value]
+        events.append(("member", key, value))
+    return events
+
+
+def _feed(parser: IncrementalJSONParser, text: str, rng: random.Random, max_piece: int):
+    events = []
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, max_piece)
+        events += parser.feed(text[i:i + size])
+        i += size
+    return events
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("max_piece", [1, 2, 3, 7, 1000])
+def test_random_splits_match_json_loads(document, max_piece):
+    rng = random.Random(f"{document}{max_piece}")
+    for _ in range(20):
+        parser = IncrementalJSONParser()
+        events = _feed(parser, document, rng, max_piece)
+        assert events == _expected(document)
+        assert parser.done
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_prose_and_code_fences_around_the_object_are_ignored(document):
+    parser = IncrementalJSONParser()
+    text = "Here is the summary:\n```json\n" + document + "\n```\nAnything after is ignored {\"x\": 1}"
+    events = _feed(parser, text, random.Random(1), 5)
+    assert events == _expected(document)
+    assert parser.done
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+def test_truncated_streams_report_only_finished_values(document):
+    expected = _expected(document)
+    for cut in range(len(document)):
+        parser = IncrementalJSONParser()
+        events = parser.feed(document[:cut])
+        # Whatever was reported is a prefix of the full event list, and the object is not done
+        assert events == expected[:len(events)]
+        assert not parser.done
+
+
+def test_split_escape_and_surrogate_pair():
+    parser = IncrementalJSONParser()
+    pieces = ['{"t": "a\\', '"b\\u', 'd83d\\', 'ude00', '"}']
+    events = [event for piece in pieces for event in parser.feed(piece)]
+    assert events == [("member", "t", 'a"b\U0001F600')]
@@ -0,0 +1,125 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+import openai
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from app.llm_gateway import CircuitBreaker, LLMGateway, LLMRequestError, LLMUnavailableError  # noqa: E402
+
+REQUEST = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": "hi"}], "max_tokens": 10}
+
+
+class _Completions:
+    """Stand-in for client.chat.completions; `behaviour` decides what each create() does."""
+
+    def __init__(self):
+        self.behaviour = "connection_error"
+        self.calls = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        http_request = httpx.Request("POST", "https://api.test/v1/chat/completions")
+        if self.behaviour == "connection_error":
+            raise openai.APIConnectionError(request=http_request)
+        if self.behaviour == "bad_request":
+            raise openai.BadRequestError(
+                "bad request", response=httpx.Response(400, request=http_request), body=None
+            )
+        if self.behaviour == "hang":
+            await asyncio.sleep(60)
+        return _stream()
+
+
+async def _stream():
+    class _Part:
+        usage = None
+        choices = []
+
+    yield _Part()
+
+
+class _Client:
+    def __init__(self):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = _Completions()
+
+
+def _gateway():
+    client = _Client()
+    gateway = LLMGateway(client, max_retries=0, max_user_concurrency=0)
+    gateway.breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    return gateway, client.chat.completions
+
+
+async def _open_circuit(gateway, completions):
+    completions.behaviour = "connection_error"
+    for _ in range(2):
+        try:
+            await gateway.stream_chat(REQUEST, lambda delta: None)
+        except LLMUnavailableError:
+            pass
+    assert gateway.breaker.state == "open"
+    time.sleep(0.06)
+
+
+def test_trial_with_bad_request_does_not_leave_circuit_half_open():
+    async def run():
+        gateway, completions = _gateway()
+        await _open_circuit(gateway, completions)
+        completions.behaviour = "bad_request"
+        try:
+            await gateway.stream_chat(REQUEST, lambda delta: None)
+        except LLMRequestError:
+            pass
+        assert gateway.breaker.state == "closed"
+        assert gateway.breaker._trial_running is False
+
+        completions.behaviour = "ok"
+        await gateway.stream_chat(REQUEST, lambda delta: None)
+
+    asyncio.run(run())
+
+
+def test_cancelled_trial_reopens_circuit_and_allows_a_new_trial():
+    async def run():
+        gateway, completions = _gateway()
+        await _open_circuit(gateway, completions)
+        completions.behaviour = "hang"
+        task = asyncio.create_task(gateway.stream_chat(REQUEST, lambda delta: None))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        assert gateway.breaker.state == "open"
+        assert gateway.breaker._trial_running is False
+
+        time.sleep(0.06)
+        completions.behaviour = "ok"
+        await gateway.stream_chat(REQUEST, lambda delta: None)
+        assert gateway.breaker.state == "closed"
+
+    asyncio.run(run())
+
+
+def test_app_starts_without_an_api_key_and_summarizes_locally():
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    env.update(DATA_BACKEND="sqlite", SUMMARY_ENGINE="openai")
+    code = (
+        "import app.main\n"
+        "from app.summarizer_client import choose_engine, summarize_text\n"
+        "assert choose_engine() == 'textrank'\n"
+        "print(summarize_text('The board met on Monday. It approved the plan.', 'minutes')['title'])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "minutes"
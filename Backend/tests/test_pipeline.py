@@ -0,0 +1,22 @@
+import asyncio
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from app import concurrency  # noqa: E402
+from app.pipeline import _extract_on_pool  # noqa: E402
+
+
+def test_extraction_replaces_a_broken_process_pool():
+    broken = concurrency.get_cpu_executor()
+    # A worker that dies takes the whole pool down with it
+    try:
+        broken.submit(os._exit, 1).result()
+    except Exception:
+        pass
+
+    text, offsets = asyncio.run(_extract_on_pool(b"hello\n  world", "text/plain", "a.txt"))
+
+    assert text == "hello\nworld"
+    assert concurrency.get_cpu_executor() is not broken
+    concurrency.shutdown()
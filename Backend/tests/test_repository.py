@@ -0,0 +1,137 @@
+import asyncio
+import io
+
+import pytest
+
+from app.repository import Repository, SQLiteRepository
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def repo():
+    return SQLiteRepository(":memory:")
+
+
+def test_repository_is_abstract():
+    class Partial(Repository):
+        async def insert_documents(self, rows):
+            return rows
+
+    with pytest.raises(TypeError):
+        Repository()
+    with pytest.raises(TypeError):
+        Partial()
+    assert isinstance(SQLiteRepository(":memory:"), Repository)
+
+
+def test_insert_fills_defaults_and_reads_are_scoped_to_the_owner(repo):
+    [doc] = run(repo.insert_documents([{"user_id": "u1", "name": "a.pdf", "file_hash": "h1"}]))
+
+    assert doc["status"] == "uploading" and doc["progress"] == 0
+    assert doc["id"] and doc["created_at"] == doc["upload_date"]
+    assert run(repo.get_document(doc["id"], "u1", ["name", "status"])) == {"name": "a.pdf", "status": "uploading"}
+    assert run(repo.get_document(doc["id"], "u2", ["name"])) is None
+    assert run(repo.owned_document_ids("u1", [doc["id"], "other"])) == {doc["id"]}
+    assert run(repo.owned_document_ids("u2", [doc["id"]])) == set()
+    assert run(repo.has_document("u1", file_hash="h1"))
+    assert not run(repo.has_document("u1", file_hash="h2"))
+    assert not run(repo.has_document("u2", file_hash="h1"))
+
+
+def test_update_documents(repo):
+    docs = run(repo.insert_documents([{"user_id": "u1", "name": f"{i}.txt"} for i in range(3)]))
+
+    run(repo.update_document(docs[0]["id"], {"status": "completed", "progress": 100}))
+    run(repo.update_documents([d["id"] for d in docs[1:]], {"status": "queued"}))
+
+    statuses = [run(repo.get_document(d["id"], "u1", ["status"]))["status"] for d in docs]
+    assert statuses == ["completed", "queued", "queued"]
+
+
+def test_delete_cascades_to_summaries_and_logs(repo):
+    [doc] = run(repo.insert_documents([{"user_id": "u1", "name": "a.txt"}]))
+    run(repo.insert_summary({"user_id": "u1", "document_id": doc["id"], "title": "A"}))
+    run(repo.insert_logs([{"user_id": "u1", "document_id": doc["id"], "status": "completed"}]))
+
+    run(repo.delete_document(doc["id"]))
+
+    assert run(repo.get_document(doc["id"], "u1", ["id"])) is None
+    assert run(repo.latest_summary(doc["id"], ["title"])) is None
+    assert run(repo.list_page("processing_logs", "u1", ["id"], "created_at", 10)) == []
+
+
+def test_list_page_walks_the_keyset(repo):
+    rows = [{"user_id": "u1", "name": f"{i}.txt", "upload_date": f"2024-01-{i + 1:02d}"} for i in range(5)]
+    run(repo.insert_documents(rows + [{"user_id": "u2", "name": "x.txt"}]))
+
+    first = run(repo.list_page("documents", "u1", ["id", "name", "upload_date"], "upload_date", 2))
+    after = (first[-1]["upload_date"], first[-1]["id"])
+    second = run(repo.list_page("documents", "u1", ["id", "name", "upload_date"], "upload_date", 10, after))
+
+    assert [r["name"] for r in first] == ["4.txt", "3.txt"]
+    assert [r["name"] for r in second] == ["2.txt", "1.txt", "0.txt"]
+
+
+def test_documents_in_buckets(repo):
+    run(repo.insert_documents([
+        {"user_id": "u1", "name": "a", "lsh_buckets": ["b1", "b2"]},
+        {"user_id": "u1", "name": "b", "lsh_buckets": ["b3"]},
+        {"user_id": "u2", "name": "c", "lsh_buckets": ["b1"]},
+    ]))
+
+    assert run(repo.documents_in_buckets("u1", ["b2", "b9"], ["name"], 10)) == [{"name": "a"}]
+    assert run(repo.documents_in_buckets("u1", [], ["name"], 10)) == []
+
+
+def test_latest_summary_and_search(repo):
+    run(repo.insert_summary({"user_id": "u1", "document_id": "d1", "title": "Old", "created_at": "2024-01-01"}))
+    run(repo.insert_summary({
+        "user_id": "u1", "document_id": "d1", "title": "Budget <review>", "created_at": "2024-02-01",
+        "full_summary": "The budget grew.", "key_points": ["Budget approved"], "categories": ["Finance"],
+    }))
+    run(repo.insert_summary({"user_id": "u2", "document_id": "d2", "title": "Budget", "full_summary": "budget"}))
+
+    assert run(repo.latest_summary("d1", ["title"])) == {"title": "Budget <review>"}
+
+    [hit] = run(repo.search_summaries("u1", "BUDGET", 10, 0))
+    assert hit["document_id"] == "d1"
+    assert hit["title_highlight"] == "<mark>Budget</mark> &lt;review&gt;"
+    assert 0 < hit["rank"] < 1
+    assert run(repo.search_summaries("u1", "budget missing", 10, 0)) == []
+    assert run(repo.search_summaries("u1", "  ", 10, 0)) == []
+    assert run(repo.search_summaries("u1", "budget", 10, 1)) == []
+
+
+def test_analytics_counts(repo):
+    assert run(repo.get_analytics("u1", ["*"])) is None
+
+    [doc] = run(repo.insert_documents([{"user_id": "u1", "name": "a.txt"}]))
+    run(repo.insert_summary({"user_id": "u1", "document_id": doc["id"], "word_count": 1000}))
+    run(repo.insert_logs([
+        {"user_id": "u1", "document_id": doc["id"], "status": "completed", "processing_time_ms": 1000},
+        {"user_id": "u1", "document_id": doc["id"], "status": "failed"},
+    ]))
+
+    stats = run(repo.get_analytics("u1", ["total_documents", "total_summaries", "total_time_saved",
+                                          "documents_today", "success_rate"]))
+    assert stats == {"total_documents": 1, "total_summaries": 1, "total_time_saved": 4,
+                     "documents_today": 1, "success_rate": 50.0}
+
+
+def test_storage_round_trip(repo, tmp_path):
+    run(repo.upload("documents", "u1/a.txt", b"hello"))
+    with pytest.raises(RuntimeError):
+        run(repo.upload("documents", "u1/a.txt", b"again"))
+    run(repo.upload("documents", "u1/a.txt", io.BytesIO(b"stream"), upsert=True))
+    path = tmp_path / "b.txt"
+    path.write_bytes(b"from disk")
+    run(repo.upload("documents", "u1/b.txt", str(path)))
+
+    assert run(repo.download("documents", "u1/a.txt")) == b"stream"
+    assert run(repo.download("documents", "u1/b.txt")) == b"from disk"
+    run(repo.remove("documents", ["u1/a.txt"]))
+    assert run(repo.download("documents", "u1/a.txt")) is None
+    assert run(repo.public_url("documents", "u1/b.txt")).endswith("/documents/u1/b.txt")
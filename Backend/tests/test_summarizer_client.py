@@ -0,0 +1,23 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from app.summarizer_client import get_cached_summary, summarize_text  # noqa: E402
+
+CONTENT = (
+    "The committee approved the annual budget after a long debate. "
+    "Spending on public transport rises by twelve percent next year. "
+    "Several members asked for an independent audit of the housing fund. "
+    "The audit report is expected before the end of the spring session."
+)
+
+
+def test_summary_cache_does_not_share_titles_between_names():
+    first = summarize_text(CONTENT, "bench-1", doc_hash="same-bytes", engine="textrank")
+    second = summarize_text(CONTENT, "other-name", doc_hash="same-bytes", engine="textrank")
+
+    assert first["title"] == "bench-1"
+    assert second["title"] == "other-name"
+    assert get_cached_summary("same-bytes", "textrank", "bench-1")["title"] == "bench-1"
+    assert get_cached_summary("same-bytes", "textrank", "other-name")["title"] == "other-name"
+    assert get_cached_summary("same-bytes", "textrank", "third-name") is None
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app import textrank
+from app.textrank import textrank_summary
+
+
+def test_empty_input():
+    result = textrank_summary("")
+
+    assert result["key_points"] == []
+    assert result["full_summary"] == ""
+    assert result["word_count"] == 0
+    assert result["title"] == "Document Summary"
+
+
+@pytest.mark.parametrize("content", ["Hello", "  Budget   approved  ", "Yes.", "Two words."])
+def test_input_under_min_words_is_its_own_summary(content):
+    result = textrank_summary(content)
+
+    assert result["full_summary"] == " ".join(content.split())
+    assert result["key_points"] == [content.strip()]
+
+
+def test_single_sentence():
+    content = "The council approved the harbour renovation budget on Monday."
+    result = textrank_summary(content, "minutes")
+
+    assert result["title"] == "minutes"
+    assert result["key_points"] == [content]
+    assert result["full_summary"] == content
+    assert result["word_count"] == 9
+
+
+def test_summary_sentences_follow_document_order():
+    sentences = [
+        "Harbour traffic doubled last year.",
+        "Ferry operators asked for a new harbour pier.",
+        "The council approved the harbour pier budget.",
+        "Weather was mild.",
+    ]
+    result = textrank_summary(" ".join(sentences), summary_sentences=2)
+
+    picked = [s for s in sentences if s in result["full_summary"]]
+    assert len(picked) == 2
+    assert result["full_summary"] == " ".join(picked)
+
+
+def test_long_input_is_ranked_on_a_sample(monkeypatch):
+    monkeypatch.setattr(textrank, "MAX_GRAPH_SENTENCES", 50)
+    sentences = [f"Section {i} reviews topic{i % 7} spending and topic{i % 5} staffing." for i in range(1000)]
+    content = " ".join(sentences)
+    result = textrank_summary(content)
+
+    assert result["word_count"] == len(content.split())
+    assert result["key_points"]
+    # Only sentences spread evenly through the document are ranked
+    sampled = {sentences[i] for i in np.linspace(0, 999, 50).astype(int)}
+    assert set(result["key_points"]) <= sampled
+    assert result["full_summary"].split(". ")[0] + "." in sampled
@@ -57,6 +57,125 @@ export interface SummaryResponse {
   created_at: string
 }
 
+export type ProcessingPriority = 'normal' | 'low'
+
+// Single processDocument calls are interactive; batches are scheduled as bulk.
+// Over-quota enqueues fail with 429 and a Retry-After header (seconds).
+export type JobClass = 'interactive' | 'bulk'
+
+export interface JobResponse {
+  id: string
+  document_id: string
+  status: 'queued' | 'running' | 'retrying' | 'completed' | 'failed'
+  priority: ProcessingPriority
+  job_class: JobClass
+  attempts: number
+  max_attempts: number
+  error?: string
+  summary_id?: string
+  created_at: string
+  updated_at: string
+}
+
+export interface BatchUploadResponse {
+  uploaded: number
+  failed: number
+  items: { filename?: string; status: 'uploaded' | 'failed'; document?: DocumentResponse; error?: string }[]
+}
+
+export interface BatchProcessResponse {
+  queued: number
+  not_found: number
+  items: { document_id: string; status: 'queued' | 'not_found'; job?: JobResponse }[]
+}
+
+export interface ProgressEvent {
+  document_id: string
+  stage: string
+  status: 'queued' | 'processing' | 'completed' | 'failed' | string
+  progress: number
+  detail?: string | null
+  timestamp?: number
+}
+
+export interface SummaryPartialEvent {
+  document_id: string
+  event: 'title' | 'key_point'
+  title?: string
+  point?: string
+  quote?: string | null
+}
+
+export interface SearchResult {
+  id: string
+  document_id: string
+  title: string
+  categories: string[]
+  key_points: string[]
+  created_at: string
+  rank: number
+  // HTML-escaped text with <mark> around matched terms
+  title_highlight: string
+  summary_highlight: string
+}
+
+export interface SearchResponse {
+  query: string
+  results: SearchResult[]
+  next_cursor?: string | null
+}
+
+export interface DocumentTextResponse {
+  document_id: string
+  page_count: number
+  page?: number | null
+  text: string
+}
+
+export interface SimilarDocument {
+  id: string
+  name: string
+  status: string
+  upload_date: string
+  similarity: number
+}
+
+export interface SimilarDocumentsResponse {
+  document_id: string
+  results: SimilarDocument[]
+}
+
+// One keyset page of a list endpoint; pass next_cursor back to get the following page
+export interface ListPage<T> {
+  items: T[]
+  next_cursor: string | null
+}
+
+export interface ListOptions {
+  limit?: number
+  cursor?: string
+}
+
+// Largest page the list endpoints serve (MAX_PAGE_SIZE on the backend)
+const MAX_PAGE_SIZE = 500
+
+async function getPage<T>(path: string, options: ListOptions = {}): Promise<ListPage<T>> {
+  const response = await api.get(path, { params: options })
+  return { items: response.data, next_cursor: response.headers['x-next-cursor'] ?? null }
+}
+
+// Every row of a list endpoint, following X-Next-Cursor page by page
+async function getAllPages<T>(path: string): Promise<T[]> {
+  const items: T[] = []
+  let cursor: string | undefined
+  do {
+    const page = await getPage<T>(path, { limit: MAX_PAGE_SIZE, cursor })
+    items.push(...page.items)
+    cursor = page.next_cursor ?? undefined
+  } while (cursor)
+  return items
+}
+
 export interface AnalyticsResponse {
   total_documents: number
   total_summaries: number
@@ -81,24 +200,94 @@ export const apiService = {
     return response.data
   },
 
-  // Process document
-  async processDocument(documentId: string): Promise<SummaryResponse> {
+  // Upload many documents in one request
+  async uploadDocuments(files: File[]): Promise<BatchUploadResponse> {
+    const formData = new FormData()
+    files.forEach((file) => formData.append('files', file))
+    
+    const response = await api.post('/api/upload/batch', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    })
+    
+    return response.data
+  },
+
+  // Queue document for processing
+  async processDocument(documentId: string, priority: ProcessingPriority = 'normal'): Promise<JobResponse> {
     const response = await api.post('/api/process', {
       document_id: documentId,
+      priority,
     })
     
     return response.data
   },
 
-  // Get user documents
-  async getDocuments(): Promise<DocumentResponse[]> {
-    const response = await api.get('/api/documents')
+  // Queue many documents for processing
+  async processDocuments(documentIds: string[], priority: ProcessingPriority = 'normal'): Promise<BatchProcessResponse> {
+    const response = await api.post('/api/process/batch', {
+      document_ids: documentIds,
+      priority,
+    })
+    
+    return response.data
+  },
+
+  // Get processing job status
+  async getJob(jobId: string): Promise<JobResponse> {
+    const response = await api.get(`/api/jobs/${jobId}`)
     return response.data
   },
 
-  // Get summaries
+  // Subscribe to processing progress (server-sent events); returns a function that closes the stream
+  // onPartial receives the summary title and each key point while the model is still writing
+  async subscribeToProgress(
+    documentId: string,
+    onEvent: (event: ProgressEvent) => void,
+    onPartial?: (event: SummaryPartialEvent) => void,
+  ): Promise<() => void> {
+    const { data: { session } } = await supabase.auth.getSession()
+    const params = session?.access_token ? `?access_token=${encodeURIComponent(session.access_token)}` : ''
+    const source = new EventSource(`${API_BASE_URL}/api/documents/${documentId}/events${params}`)
+    source.addEventListener('progress', (message) => {
+      const event: ProgressEvent = JSON.parse((message as MessageEvent).data)
+      onEvent(event)
+      if (event.status === 'completed' || event.status === 'failed') {
+        source.close()
+      }
+    })
+    if (onPartial) {
+      for (const name of ['title', 'key_point']) {
+        source.addEventListener(name, (message) => onPartial(JSON.parse((message as MessageEvent).data)))
+      }
+    }
+    return () => source.close()
+  },
+
+  // Get all user documents (every page)
+  async getDocuments(): Promise<DocumentResponse[]> {
+    return getAllPages<DocumentResponse>('/api/documents')
+  },
+
+  // Get one page of user documents, newest first
+  async getDocumentsPage(options: ListOptions = {}): Promise<ListPage<DocumentResponse>> {
+    return getPage<DocumentResponse>('/api/documents', options)
+  },
+
+  // Get all summaries (every page)
   async getSummaries(): Promise<SummaryResponse[]> {
-    const response = await api.get('/api/summaries')
+    return getAllPages<SummaryResponse>('/api/summaries')
+  },
+
+  // Get one page of summaries, newest first
+  async getSummariesPage(options: ListOptions = {}): Promise<ListPage<SummaryResponse>> {
+    return getPage<SummaryResponse>('/api/summaries', options)
+  },
+
+  // Server-side full-text search over summaries; pass next_cursor to get the next page
+  async searchSummaries(query: string, options: { limit?: number; cursor?: string; rerank?: boolean } = {}): Promise<SearchResponse> {
+    const response = await api.get('/api/search', { params: { q: query, ...options } })
     return response.data
   },
 
@@ -108,6 +297,20 @@ export const apiService = {
     return response.data
   },
 
+  // Get extracted text (whole document, or one 1-based page)
+  async getDocumentText(documentId: string, page?: number): Promise<DocumentTextResponse> {
+    const response = await api.get(`/api/documents/${documentId}/text`, { params: page ? { page } : {} })
+    return response.data
+  },
+
+  // Near-duplicates of a processed document (estimated similarity 0-1)
+  async getSimilarDocuments(documentId: string, minSimilarity?: number): Promise<SimilarDocumentsResponse> {
+    const response = await api.get(`/api/documents/${documentId}/similar`, {
+      params: minSimilarity !== undefined ? { min_similarity: minSimilarity } : {},
+    })
+    return response.data
+  },
+
   // Delete document
   async deleteDocument(documentId: string): Promise<void> {
     await api.delete(`/api/documents/${documentId}`)